@@ -1 +1 @@
-from .benchmarks import render, run 
\ No newline at end of file
+from .benchmarks import render, run, run_scc, run_reachability 
\ No newline at end of file
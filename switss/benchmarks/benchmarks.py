@@ -1,5 +1,6 @@
 from ..model import ReachabilityForm
 from ..problem import ProblemFormulation
+from ..utils import PhaseTimer
 
 #from timeit import default_timer as timer
 import time as time
@@ -9,6 +10,8 @@ import matplotlib.ticker as tkr
 from collections.abc import Iterable
 import json as json
 from pathlib import Path
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 
 def run(reachability_form, 
         method, 
@@ -18,7 +21,9 @@ def run(reachability_form,
         step=1e-3, 
         debug=False, 
         json_dir=None, 
-        timeout=None):
+        timeout=None,
+        workers=None,
+        trace_memory=False):
     """Runs a benchmark on a given reachability form. The benchmark consists of running the method on the 
     reachability form for varying thresholds. Returns a dictionary which contains result of the specified test. 
     `from_thr` and `to_thr` specify the smallest and greatest  threshold respectively. `step` specifies the 
@@ -36,13 +41,26 @@ def run(reachability_form,
           "run" : [ { "threshold" : threshold,
                       "statecounts" : [statecount1, statecount2,..., statecountN ],
                       "wall_times"  : [wall_time1,  wall_time2, ...,  wall_timeN ],
-                      "proc_times"  : [proc_time1,  proc_time2, ...,  wall_timeN ] }, ...] }
+                      "proc_times"  : [proc_time1,  proc_time2, ...,  wall_timeN ],
+                      "phases" : { phase : { "wall_time" : ..., "proc_time" : ..., ... }, ... } }, ...] }
     
     where "method" contains information about the used method (see problem.ProblemUtils.details) and
     "run" contains a list of results for different thresholds. If we pick an element from "run", 
     "statecounts" will contain the number of states for each found subsystem while running the method 
     on that particular instance. For example, if QSHeur with iterations=5 was choosen, statecounts will
-    have N=5 entries (ditto for wall_times and proc_times).
+    have N=5 entries (ditto for wall_times and proc_times). "phases" contains the times (and memory usage) of 
+    the phases of the method for that threshold, summed up over all results (see `utils.PhaseTimer.results`).
+
+    The benchmark stops at the first threshold for which the method fails (e.g. because the threshold is 
+    infeasible or a timeout occurred), i.e. "run" only contains the thresholds below it.
+
+    If `workers` is greater than 1, the thresholds are distributed over a pool of `workers` processes. The system of
+    the reachability form is copied once into shared memory (see `model.AbstractMDP.share_memory`), which is used by
+    every process. 
+    Every element of "run" then additionally contains the index of the process that computed it ("worker"), and
+    thresholds above the first failing one are cancelled. The results are the same as in a sequential run, except
+    that each process keeps its own copy of the method (so e.g. `problem.MILPExact` reuses MILPs only within 
+    a process).
 
     :param reachability_form: The given reachability form.
     :type reachability_form: model.ReachabilityForm
@@ -60,6 +78,11 @@ def run(reachability_form,
     :type debug: bool, optional
     :param json_dir: Resulting json files will be printed into the directory json_dir
     :type json_dir: Path, optional
+    :param workers: Number of processes that are used. If None, thresholds are evaluated sequentially, defaults to None
+    :type workers: int, optional
+    :param trace_memory: If True, the peak memory usage of every phase is recorded, which slows down the method
+        (see `utils.PhaseTimer`), defaults to False
+    :type trace_memory: bool, optional
     :return: The generated data.
     :rtype: Dict or List
     """    
@@ -75,11 +98,14 @@ def run(reachability_form,
                        me, mo, from_thr, 
                        to_thr, step, 
                        debug, json_dir,
-                       timeout=timeout)
+                       timeout=timeout,
+                       workers=workers,
+                       trace_memory=trace_memory)
             ret.append(data)
         return ret
 
     assert isinstance(method, ProblemFormulation)
+    assert workers is None or workers >= 1
 
     thresholds = np.arange(from_thr, min(1,to_thr+step), step)
     data = { "method" : method.details , "run" : [] }
@@ -96,34 +122,183 @@ def run(reachability_form,
             with open(json_path,"w") as json_file:
                 json.dump(data,json_file)
 
-    for idx,thr in enumerate(thresholds):
-        p = (idx+1)/len(thresholds)
-        starttime_wall = time.perf_counter()
-        starttime_proc = time.process_time()
-        wall_times, proc_times, statecounts = [], [], []
-        for result in method.solveiter(reachability_form, thr, mode, timeout=timeout):
-            if result.status != "success":
-                if debug:
-                    print("threshold %d infeasible or method timeout. result status =%s" % (thr,result.status))
-                print_json(json_dir,data)
-                return data
-            wall_time = time.perf_counter() - starttime_wall
-            proc_time = time.process_time() - starttime_proc
-            wall_times.append(wall_time)
-            proc_times.append(proc_time)
-            if result.status == "success":
-                statecount = np.sum(result.subsystem.subsystem_mask)
-                statecounts.append(int(statecount))
-            else:
-                statecounts.append(-1)
+    if workers is None or workers == 1:
+        results = ( _run_threshold(reachability_form, method, thr, mode, timeout, trace_memory) for thr in thresholds )
+    else:
+        results = _run_parallel(reachability_form, method, thresholds, mode, timeout, workers, trace_memory)
+
+    for idx,(thr,(status,els)) in enumerate(zip(thresholds,results)):
+        if status != "success":
+            if debug:
+                print("threshold %d infeasible or method timeout. result status =%s" % (thr,status))
+            break
         if debug:
+            p = (idx+1)/len(thresholds)
             print("\tp={:.3f} threshold={:.3f} statecount={} time={:.3f}".\
-                  format(p,thr,statecounts[-1], wall_times[-1]) )
-        els = { "threshold" : thr, "statecounts" : statecounts, "wall_times" : wall_times, "proc_times" : proc_times }
+                  format(p,thr,els["statecounts"][-1], els["wall_times"][-1]) )
         data["run"].append(els)
+    # stops the evaluation of the remaining thresholds
+    results.close()
     print_json(json_dir,data)
     return data
 
+def _run_threshold(reachability_form, method, thr, mode, timeout, trace_memory):
+    # runs the method for a single threshold. returns the status of the first failed result (or "success") 
+    # and the statecounts, times and phases of all results
+    starttime_wall = time.perf_counter()
+    starttime_proc = time.process_time()
+    wall_times, proc_times, statecounts = [], [], []
+    with PhaseTimer(memory=trace_memory) as timer:
+        for result in method.solveiter(reachability_form, thr, mode, timeout=timeout):
+            if result.status != "success":
+                return result.status, None
+            wall_times.append(time.perf_counter() - starttime_wall)
+            proc_times.append(time.process_time() - starttime_proc)
+            statecounts.append(int(np.sum(result.subsystem.subsystem_mask)))
+    return "success", { "threshold" : thr, "statecounts" : statecounts, "wall_times" : wall_times, "proc_times" : proc_times,
+                        "phases" : timer.results }
+
+# state of a worker process of `_run_parallel`
+_worker = {}
+
+def _init_worker(system, labels, method, trace_memory, worker_count, cutoff):
+    with worker_count.get_lock():
+        _worker["index"] = worker_count.value
+        worker_count.value += 1
+    initial_label, target_label, fail_label = labels
+    _worker["reach_form"] = ReachabilityForm(system, initial_label, target_label, fail_label, ignore_consistency_checks=True)
+    _worker["method"] = method
+    _worker["trace_memory"] = trace_memory
+    _worker["cutoff"] = cutoff
+
+def _run_worker(idx, thr, mode, timeout):
+    # thresholds above the first failed one are skipped
+    if idx > _worker["cutoff"].value:
+        return "cancelled", None
+    status, els = _run_threshold(_worker["reach_form"], _worker["method"], thr, mode, timeout, _worker["trace_memory"])
+    if status != "success":
+        with _worker["cutoff"].get_lock():
+            _worker["cutoff"].value = min(_worker["cutoff"].value, idx)
+    else:
+        els["worker"] = _worker["index"]
+    return status, els
+
+def _run_parallel(reachability_form, method, thresholds, mode, timeout, workers, trace_memory):
+    # yields the results of `_run_threshold` in the order of the thresholds
+    labels = (reachability_form.initial_label, reachability_form.target_label, reachability_form.fail_label)
+    worker_count = mp.Value("i", 0)
+    cutoff = mp.Value("q", len(thresholds))
+    system = reachability_form.system.share_memory()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, 
+                                 initializer=_init_worker, 
+                                 initargs=(system, labels, method, trace_memory, worker_count, cutoff)) as executor:
+            futures = [ executor.submit(_run_worker, idx, thr, mode, timeout) for idx, thr in enumerate(thresholds) ]
+            for idx, future in enumerate(futures):
+                status, els = future.result()
+                if status != "success":
+                    for later_future in futures[idx+1:]:
+                        later_future.cancel()
+                yield status, els
+                if status != "success":
+                    return
+    finally:
+        system.unlink_shared_memory()
+
+def run_scc(models, repeat=5):
+    """Benchmarks the computation of strongly connected components (SCCs) on the given models. For every model,
+    the iterative implementation (`utils.Graph.strongly_connected_components`) is compared to the recursive
+    one it replaced (`utils.Graph.strongly_connected_components_recursive`). Both are run `repeat` times and 
+    the best wall time is reported. The result is a dictionary of the form
+
+    .. code-block::
+
+        { name : { "states" : N, "transitions" : nnz, "components" : sccount,
+                   "iterative" : time, "recursive" : time, "speedup" : recursive/iterative }, ... }
+
+    For example, all models in `examples/datasets` can be benchmarked via
+
+    .. code-block::
+
+        models = { path.stem : MDP.from_file(str(path.with_suffix(".lab")), str(path)) 
+                   for path in Path("examples/datasets").glob("*.tra") }
+        run_scc(models)
+
+    :param models: Mapping from names to models.
+    :type models: Dict[str, model.AbstractMDP]
+    :param repeat: Number of repetitions, defaults to 5
+    :type repeat: int, optional
+    :return: The generated data.
+    :rtype: Dict[str, Dict]
+    """
+    def best_time(f):
+        times = []
+        for _ in range(repeat):
+            starttime = time.perf_counter()
+            f()
+            times.append(time.perf_counter() - starttime)
+        return min(times)
+
+    data = {}
+    for name, model in models.items():
+        graph = model._graph
+        components, sccount = graph.strongly_connected_components()
+        components_rec, sccount_rec = graph.strongly_connected_components_recursive()
+        assert sccount == sccount_rec and (components == components_rec).all()
+        iterative = best_time(graph.strongly_connected_components)
+        recursive = best_time(graph.strongly_connected_components_recursive)
+        data[name] = {  "states" : model.N, 
+                        "transitions" : model.P.nnz,
+                        "components" : sccount,
+                        "iterative" : iterative, 
+                        "recursive" : recursive,
+                        "speedup" : recursive / iterative }
+    return data
+
+def run_reachability(reach_forms, methods=["lp", "vi", "topological"], solver="cbc", repeat=3):
+    """Benchmarks the computation of minimal and maximal reachability probabilities (see 
+    `model.ReachabilityForm.pr_min` and `model.ReachabilityForm.pr_max`) with different methods on the given RFs.
+    Every computation is run `repeat` times (with an empty result cache) and the best wall time is reported. 
+    The result is a dictionary of the form
+
+    .. code-block::
+
+        { name : { "states" : N, "components" : sccount,
+                   "pr_min" : { method : { "time" : time, "error" : error }, ... },
+                   "pr_max" : { ... } }, ... }
+
+    where "error" is the maximal difference to the result of the first method.
+
+    :param reach_forms: Mapping from names to RFs.
+    :type reach_forms: Dict[str, model.ReachabilityForm]
+    :param methods: Methods that are compared (see `model.ReachabilityForm.max_z_state`), defaults to ["lp", "vi", "topological"]
+    :type methods: List[str], optional
+    :param solver: Solver that is used by the "lp"-method, defaults to "cbc"
+    :type solver: str, optional
+    :param repeat: Number of repetitions, defaults to 3
+    :type repeat: int, optional
+    :return: The generated data.
+    :rtype: Dict[str, Dict]
+    """
+    data = {}
+    for name, reach_form in reach_forms.items():
+        data[name] = {  "states" : reach_form.system.N,
+                        "components" : reach_form.strongly_connected_components()[1] }
+        for analysis in ["pr_min", "pr_max"]:
+            results, data[name][analysis] = [], {}
+            for method in methods:
+                times = []
+                for _ in range(repeat):
+                    reach_form.clear_cache()
+                    starttime = time.perf_counter()
+                    result = getattr(reach_form, analysis)(solver=solver, method=method)
+                    times.append(time.perf_counter() - starttime)
+                results.append(result)
+                data[name][analysis][method] = { "time" : min(times), 
+                                                 "error" : float(np.abs(result - results[0]).max(initial=0)) }
+        reach_form.clear_cache()
+    return data
+
 def render(run, 
            mode="laststates-thr", 
            ax=None, 
@@ -138,7 +313,10 @@ def render(run,
     """Renders a benchmark run via matplotlib. `mode` specifies the type of the
     resulting plot, i.e. statecount vs. threshold ('states-thr', plots all intermediate results), only
     the last resulting statecount vs. threshold ('laststates-thr', plots only the last result), time
-    vs. threshold ('wall_time-thr'/'proc_time-thr'). If no axis is specified, a new subplot is generated.
+    vs. threshold ('wall_time-thr'/'proc_time-thr') or the time spent in the phases of the method vs. threshold
+    as stacked plot ('phases_wall_time-thr'/'phases_proc_time-thr', see the "phases" entry of `run`). Phases are 
+    stacked without the time of their nested phases, so the stack shows how the total time is split up. 
+    If no axis is specified, a new subplot is generated.
 
     :param run: Result of a `run`-call.
     :param mode: Type of plot, defaults to "states-thr"
@@ -160,7 +338,7 @@ def render(run,
     :type plot_no: int, optional    :return: The axis-object that is created or specified in the method-call.
     :rtype: matplotlib.axes.Axes
     """    
-    assert mode in ["proc_time-thr","wall_time-thr", "states-thr", "laststates-thr"]
+    assert mode in ["proc_time-thr","wall_time-thr", "states-thr", "laststates-thr", "phases_wall_time-thr", "phases_proc_time-thr"]
     if ax is None:
         ax = plt.subplot()
 
@@ -204,6 +382,16 @@ def render(run,
         thr = [el["threshold"] for el in run["run"]]
         label = r"%s" % custom_label
         ax.plot(thr, tim, linestyle="dashed", marker="x",  label=label, markersize=markersize, linewidth=linewidth)
+    elif mode == "phases_wall_time-thr" or mode == "phases_proc_time-thr":
+        times = { "phases_wall_time-thr" : "self_wall_time", "phases_proc_time-thr" : "self_proc_time" }[mode]
+        ax.set_ylabel("time [s]")
+        thr = [el["threshold"] for el in run["run"]]
+        phases = []
+        for el in run["run"]:
+            phases.extend(phase for phase in el["phases"] if phase not in phases)
+        tim = [[el["phases"][phase][times] if phase in el["phases"] else 0 for el in run["run"]] for phase in phases]
+        labels = [r"%s: %s" % (custom_label, phase) for phase in phases]
+        ax.stackplot(thr, *tim, labels=labels)
 
     ax.set_xlabel(r"threshold $\lambda$")
     if title is not None:
@@ -1,5 +1,5 @@
 from switss.solver import LP
-from scipy.sparse import dok_matrix, identity
+from scipy.sparse import dok_matrix, identity, hstack
 import numpy as np
 
 def find_interior_point(A, b, xgeq0=False, solver="cbc"):
@@ -35,8 +35,8 @@ def find_interior_point(A, b, xgeq0=False, solver="cbc"):
 
     lp = LP.from_coefficients(A_, b_, opt,"<=","min")
     if xgeq0:
-        for idx in range(A.shape[1]):
-            lp.add_constraint([(idx,1),(A.shape[1],1)],">=",0)
+        # x_i + s >= 0 for all i
+        lp.add_constraints_matrix(hstack((identity(A.shape[1]), np.ones((A.shape[1],1)))),">=",0)
 
     result = lp.solve(solver)
     sres = result.result_vector[-1]
@@ -2,3 +2,4 @@ from .amdp import AbstractMDP
 from .dtmc import DTMC
 from .mdp import MDP
 from .reachability_form import ReachabilityForm
+from .bisimulation import bisimulation_partition, bisimulation_quotient, lift_certificate
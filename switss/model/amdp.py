@@ -1,24 +1,33 @@
 from abc import ABC, abstractclassmethod, abstractmethod
 import numpy as np
-from scipy.sparse import dok_matrix
+from scipy.sparse import dok_matrix, csr_matrix
 from collections import defaultdict
 from graphviz import Digraph
-from bidict import bidict
 import os.path
 import tempfile
+import json
 
 from switss.utils import Graph
 from ..prism import parse_label_file, prism_to_tra
-from ..utils import InvertibleDict, cast_dok_matrix
+from ..utils import InvertibleDict, TransitionMatrix, LazyViewCache, StateActionIndex, SharedArrays
 
 
+# version of the directory layout written by `AbstractMDP.save_binary`. Increase whenever the layout changes.
+BINARY_FORMAT_VERSION = 1
+
 class AbstractMDP(ABC):
     """Abstract superclass for Markov Decision Processes (MDPs) and Discrete Time Markov Chains (DTMCs)
     that supports labeling for states and actions, getting successors/predecessors, computing 
     reachability sets, rendering of MDPs/DTMCs as graphviz digraphs, loading from .pm-files and 
     loading/storing from/to .lab,.tra files. 
+
+    The transition matrix is stored once, in CSR format. Other representations (i.e. a CSC matrix for fast column slicing 
+    and a graph for successor/predecessor queries) are built lazily when some operation needs them. If `view_memory_budget`
+    is set (in bytes), the least recently used of these representations are freed whenever they use more memory than that.
     """    
-    def __init__(self, P, index_by_state_action, label_to_actions={}, label_to_states={}, vis_config=None):
+    view_memory_budget = None
+
+    def __init__(self, P, index_by_state_action, label_to_actions={}, label_to_states={}, vis_config=None, ignore_consistency_checks=False):
         """Instantiates an AbstractMDP from a transition matrix, a bidirectional
         mapping from state-action pairs to corresponding transition matrix entries and labelings for states and actions.
 
@@ -26,22 +35,24 @@ class AbstractMDP(ABC):
         :type P: Either 2d-list, numpy.matrix, numpy.array or scipy.sparse.spmatrix
         :param index_by_state_action: A bijection of state-action pairs :math:`(s,a) \in \mathcal{M}_{S_{\\text{all}}}` 
             to indices :math:`i=0,\dots,C_{S_{\\text{all}}}-1` and vice versa.
-        :type index_by_state_action: Dict[Tuple[int,int],int]
+        :type index_by_state_action: Dict[Tuple[int,int],int] or utils.StateActionIndex
         :param label_to_actions: Mapping from labels to sets of state-action pairs.
         :type label_to_actions: Dict[str,Set[Tuple[int,int]]]
         :param label_to_states: Mapping from labels to sets of states.
         :type label_to_states: Dict[str,Set[int]]
         :param vis_config: Used to configure how model is visualized.
         :type vis_config: VisualizationConfig
+        :param ignore_consistency_checks: If set to True, the transition matrix is not checked for being stochastic,
+            defaults to False
+        :type ignore_consistency_checks: bool, optional
         """        
-        # transform P into dok_matrix if neccessary
-        self.P = cast_dok_matrix(P)
-        # for fast column & row slicing
-        self.__P_csc = self.P.tocsc()
-        self.__P_csr = self.P.tocsr()
-        self.C, self.N = self.P.shape
-        # transform mapping into bidict if neccessary (applying bidict to bidict doesn't change anything)
-        self.index_by_state_action = bidict(index_by_state_action)
+        # transform P into a (read-only) csr_matrix if neccessary
+        self.__P = TransitionMatrix(P)
+        self.C, self.N = self.__P.shape
+        # transform mapping into an array-based index if neccessary. The arrays are shared but never written to,
+        # so the new index is independent of the given one.
+        index_by_state_action = StateActionIndex.from_dict(index_by_state_action)
+        self.index_by_state_action = StateActionIndex(index_by_state_action.row_state, index_by_state_action.row_action)
         if isinstance(label_to_actions,InvertibleDict):
             self.__label_to_actions_invertible = label_to_actions
         else:
@@ -50,9 +61,11 @@ class AbstractMDP(ABC):
             self.__label_to_states_invertible = label_to_states
         else:
             self.__label_to_states_invertible = InvertibleDict(label_to_states, is_default=True)
-        self.__check_correctness()
+        if not ignore_consistency_checks:
+            self.__check_correctness()
         self.__available_actions = None
-        self.__graph = Graph(self.P, self.index_by_state_action)
+        self.__views = LazyViewCache(budget=self.view_memory_budget)
+        self.__shared_arrays = None
         self.visualization = vis_config
 
     def __check_correctness(self):
@@ -64,11 +77,46 @@ class AbstractMDP(ABC):
         
         """
         # make sure all rows of P sum to one
-        for idx,s in enumerate(self.P.sum(axis=1)):  
-            assert np.round(s,9) == 1, "Sum of row %d of P is %f but should be 1." % (idx, s)
+        rowsums = np.asarray(self.P.sum(axis=1)).ravel()
+        faulty_rows = np.nonzero(np.round(rowsums,9) != 1)[0]
+        assert len(faulty_rows) == 0, "Sum of row %d of P is %f but should be 1." % (faulty_rows[0], rowsums[faulty_rows[0]])
         # make sure that all values x are 0<=x<=1
-        for (i,j), p in self.P.items():
-            assert p >= 0 and p <= 1, "P[%d,%d]=%f, violating 0<=%f<=1." % (i,j,p,p)
+        faulty_entries = np.nonzero((self.P.data < 0) | (self.P.data > 1))[0]
+        if len(faulty_entries) > 0:
+            k = faulty_entries[0]
+            i, j, p = np.searchsorted(self.P.indptr, k, side="right")-1, self.P.indices[k], self.P.data[k]
+            assert False, "P[%d,%d]=%f, violating 0<=%f<=1." % (i,j,p,p)
+
+    @property
+    def P(self):
+        """The :math:`C_{S_{\\text{all}}} \\times N_{S_{\\text{all}}}` transition matrix (read-only).
+
+        :rtype: utils.TransitionMatrix
+        """
+        return self.__P
+
+    @property
+    def P_csc(self):
+        """The transition matrix in CSC format, which allows for fast column slicing. Built lazily.
+
+        :rtype: scipy.sparse.csc_matrix
+        """
+        return self.__views.get("csc", self.__P.tocsc)
+
+    @property
+    def _graph(self):
+        """The underlying graph that is used for successor/predecessor queries. Built lazily.
+
+        :rtype: utils.Graph
+        """
+        index = self.index_by_state_action
+        return self.__views.get("graph", lambda: Graph.from_csr(
+            self.N, self.__P.indptr, self.__P.indices, self.__P.data, index.row_state, index.row_action))
+
+    def release_views(self):
+        """Frees all lazily built representations of the transition matrix (see `P_csc`). They 
+        are rebuilt the next time they are needed."""
+        self.__views.release()
 
     @property
     def states_by_label(self):
@@ -114,10 +162,12 @@ class AbstractMDP(ABC):
         :rtype: Dict[int, Set[int]]
         """        
         if self.__available_actions is None:
-            self.__available_actions = InvertibleDict({})
-            for idx in range(self.C):
-                state,action = self.index_by_state_action.inv[idx]
-                self.__available_actions.add(state, action)
+            index = self.index_by_state_action
+            offsets = index.state_row_offsets
+            actions = index.row_action[index.state_rows].tolist()
+            states = np.nonzero(np.diff(offsets))[0].tolist()
+            self.__available_actions = InvertibleDict({ 
+                state : set(actions[offsets[state]:offsets[state+1]]) for state in states })
         return self.__available_actions
 
     def reachable_mask(self, from_set, mode, blocklist=set()):
@@ -133,7 +183,38 @@ class AbstractMDP(ABC):
         :return: Resulting vector.
         :rtype: np.ndarray[bool]
         """
-        return self.__graph.reachable(from_set, mode, blocklist)
+        return self._graph.reachable(from_set, mode, blocklist)
+
+    def prob0_mask(self, target_set, mode):
+        """Computes an :math:`N_{S_{\\text{all}}}`-dimensional vector which has a True-entry for every state that reaches
+        the target states with probability 0, i.e. :math:`\\mathbf{Pr}^{\\text{min}}_s(\\diamond T) = 0` ("min", Prob0E) or
+        :math:`\\mathbf{Pr}^{\\text{max}}_s(\\diamond T) = 0` ("max", Prob0A). Only the graph of the model is used.
+
+        :param target_set: The set of target states :math:`T`.
+        :type target_set: Set[int]
+        :param mode: Either "min" or "max".
+        :type mode: str
+        :return: Resulting vector.
+        :rtype: np.ndarray[bool]
+        """
+        assert mode in ["min", "max"]
+        return self._graph.prob0e(target_set) if mode == "min" else self._graph.prob0a(target_set)
+
+    def prob1_mask(self, target_set, mode):
+        """Computes an :math:`N_{S_{\\text{all}}}`-dimensional vector which has a True-entry for every state that reaches
+        the target states with probability 1, i.e. :math:`\\mathbf{Pr}^{\\text{min}}_s(\\diamond T) = 1` ("min", Prob1A) or
+        :math:`\\mathbf{Pr}^{\\text{max}}_s(\\diamond T) = 1` ("max", Prob1E). Only the graph of the model is used, which
+        is why the probabilities of every state-action pair need to sum up to 1.
+
+        :param target_set: The set of target states :math:`T`.
+        :type target_set: Set[int]
+        :param mode: Either "min" or "max".
+        :type mode: str
+        :return: Resulting vector.
+        :rtype: np.ndarray[bool]
+        """
+        assert mode in ["min", "max"]
+        return self._graph.prob1a(target_set) if mode == "min" else self._graph.prob1e(target_set)
 
     def predecessors(self, fromidx):
         """Yields an iterator that computes state-action-pairs (s,a) such that
@@ -144,7 +225,7 @@ class AbstractMDP(ABC):
         :yield: A state-action-probability-pair (s,a,p)
         :rtype: Iterator[Tuple[int, int, float]]
         """       
-        return self.__graph.predecessors(fromidx)
+        return self._graph.predecessors(fromidx)
 
     def successors(self, fromidx):
         """Yields an iterator that computes state-action-pairs (d,a) where applying action a to
@@ -155,7 +236,7 @@ class AbstractMDP(ABC):
         :yield: A state-action-probability-pair (d,a,p)
         :rtype: Iterator[Tuple[int,int,float]]
         """        
-        return self.__graph.successors(fromidx)
+        return self._graph.successors(fromidx)
 
     def strongly_connected_components(self):
         """Returns the strongly connected components (SCCs) of the underlying graph of this model using Tarjan's Algorithm. The underlying graph is defined as math:`G=(V,E)` with 
@@ -167,31 +248,42 @@ class AbstractMDP(ABC):
         :return: A :math:`N_{S_{\\text{all}}}`-dimensional vector containing the index of the SCC every state belongs to and the number of SCCs.
         :rtype: Tuple[np.ndarray[int],int]
         """        
-        return self.__graph.strongly_connected_components()
+        return self._graph.strongly_connected_components()
 
-    def maximal_end_components(self):
-        """Returns the Maximal End Components (MECs) of this model.
+    def maximal_end_components(self, with_actions=False):
+        """Returns the Maximal End Components (MECs) of this model. They are computed by iteratively refining 
+        SCCs on the underlying graph, where only actions that stay inside the current candidate set are considered.
 
+        :param with_actions: If True, additionally returns a :math:`C_{S_{\\text{all}}}`-dimensional boolean vector
+            that has a True-entry for every state-action pair that belongs to a MEC (i.e. its state is in a MEC and 
+            all of its successors are in the same MEC), defaults to False
+        :type with_actions: bool, optional
         :return: A :math:`N_{S_{\\text{all}}}`-dimensional vector containing the index of the MEC every state belongs to and the number of MECs. If a state has a 0-entry, then it does not belong to any MEC.
-        :rtype: Tuple[np.ndarry[int],int]
+        :rtype: Tuple[np.ndarry[int],int] or Tuple[np.ndarray[int],int,np.ndarray[bool]]
         """        
-        return self.__graph.maximal_end_components()
+        return self._graph.maximal_end_components(with_actions=with_actions)
 
     @classmethod
-    def from_file(cls, label_file_path, tra_file_path):
+    def from_file(cls, label_file_path, tra_file_path, legacy_parser=False):
         """Computes an instance of this model from a given .lab and .tra file.
         
         :param label_file_path: Path of .lab-file.
         :type label_file_path: str
         :param tra_file_path: Path of .tra-file.
         :type tra_file_path: str
+        :param legacy_parser: If True, the .tra-file is parsed line by line into a `dok_matrix` (which is slow, but
+            may be used for checking results of the vectorized loader), defaults to False
+        :type legacy_parser: bool, optional
         :return: Instance of given class.
         :rtype: cls
         """        
         # identify all states
         states_by_label, _, _ = parse_label_file(label_file_path)
         # then load the transition matrix
-        res = cls._load_transition_matrix(tra_file_path)
+        if legacy_parser:
+            res = cls._load_transition_matrix_legacy(tra_file_path)
+        else:
+            res = cls._load_transition_matrix(tra_file_path)
         return cls(**res, label_to_states=states_by_label)
         
     @classmethod
@@ -218,6 +310,177 @@ class AbstractMDP(ABC):
             else:
                 assert False, "Prism call to create model failed."
         
+    def _to_arrays(self):
+        # meta information and arrays that describe this model (see `save_binary`)
+        index = self.index_by_state_action
+        state_labels = list(self.states_by_label.keys())
+        action_labels = list(self.actions_by_label.keys())
+
+        def incidence(sets):
+            counts = [len(elements) for elements in sets]
+            offsets = np.zeros(len(counts)+1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            elements = np.fromiter((el for elements in sets for el in sorted(elements)), dtype=np.int64, count=offsets[-1])
+            return offsets, elements
+
+        state_label_offsets, state_label_states = incidence(
+            [self.states_by_label[label] for label in state_labels])
+        action_label_offsets, action_label_rows = incidence(
+            [[index[sap] for sap in self.actions_by_label[label]] for label in action_labels])
+
+        arrays = {  "data" : self.P.data, 
+                    "indices" : self.P.indices, 
+                    "indptr" : self.P.indptr,
+                    "row_state" : index.row_state, 
+                    "row_action" : index.row_action,
+                    "state_label_offsets" : state_label_offsets,
+                    "state_label_states" : state_label_states,
+                    "action_label_offsets" : action_label_offsets,
+                    "action_label_rows" : action_label_rows }
+        meta = {"format" : "switss", 
+                "version" : BINARY_FORMAT_VERSION,
+                "modeltype" : type(self).__name__,
+                "C" : self.C, 
+                "N" : self.N,
+                "state_labels" : state_labels,
+                "action_labels" : action_labels }
+        return meta, arrays
+
+    @classmethod
+    def _from_arrays(cls, meta, arrays, shared_arrays=None):
+        # inverse of `_to_arrays`. `arrays` maps names to arrays (or anything that returns an array for a name)
+        P = csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=(meta["C"], meta["N"]))
+        index = StateActionIndex(arrays["row_state"], arrays["row_action"])
+
+        state_label_offsets, state_label_states = arrays["state_label_offsets"], arrays["state_label_states"]
+        label_to_states = { label : set(state_label_states[state_label_offsets[i]:state_label_offsets[i+1]].tolist())
+                            for i, label in enumerate(meta["state_labels"]) }
+        action_label_offsets, action_label_rows = arrays["action_label_offsets"], arrays["action_label_rows"]
+        label_to_actions = {}
+        for i, label in enumerate(meta["action_labels"]):
+            rows = action_label_rows[action_label_offsets[i]:action_label_offsets[i+1]]
+            label_to_actions[label] = set(zip(index.row_state[rows].tolist(), index.row_action[rows].tolist()))
+
+        model = cls(P=P, 
+                    index_by_state_action=index, 
+                    label_to_actions=label_to_actions, 
+                    label_to_states=label_to_states, 
+                    ignore_consistency_checks=True)
+        model.__shared_arrays = shared_arrays
+        return model
+
+    def __reduce__(self):
+        # only the transition matrix, the state-action index and the labels are pickled. Everything else 
+        # (e.g. the graph) is rebuilt lazily, and the visualization config is not kept.
+        meta, arrays = self._to_arrays()
+        if self.__shared_arrays is not None:
+            # only the name of the shared memory block is pickled
+            arrays = self.__shared_arrays
+        return (type(self)._from_arrays, (meta, arrays, self.__shared_arrays))
+
+    def share_memory(self):
+        """Returns a copy of this model whose transition matrix, state-action index and labels are stored in shared 
+        memory (see `utils.SharedArrays`). Pickling the copy (e.g. when it is sent to a `multiprocessing` worker)
+        then only pickles the name of the shared memory block, and all unpickled models use the same memory instead
+        of copies of the arrays. The shared memory has to be freed via `unlink_shared_memory` as soon as it is not
+        needed by any process anymore.
+
+        .. code-block::
+
+            shared_mdp = mdp.share_memory()
+            with multiprocessing.Pool(4) as pool:
+                pool.map(analyse, [shared_mdp]*100)
+            shared_mdp.unlink_shared_memory()
+
+        :return: The copy.
+        :rtype: [This Class]
+        """
+        meta, arrays = self._to_arrays()
+        shared_arrays = SharedArrays(arrays)
+        return type(self)._from_arrays(meta, shared_arrays, shared_arrays)
+
+    @property
+    def shared_memory(self):
+        """The shared memory block of this model if it was created by `share_memory` (or unpickled from such a
+        model), otherwise None.
+
+        :rtype: utils.SharedArrays
+        """
+        return self.__shared_arrays
+
+    def unlink_shared_memory(self):
+        """Frees the shared memory block that was created by `share_memory`. Models that use it stay valid,
+        but it can't be attached to anymore, i.e. these models can't be unpickled anymore."""
+        assert self.__shared_arrays is not None and self.__shared_arrays.owner, "This model does not own shared memory."
+        self.__shared_arrays.unlink()
+
+    def save_binary(self, dirpath):
+        """Saves this model in a binary format, which is a directory containing a `meta.json` file (model type, 
+        format version and label names) and one .npy-file for each of the following arrays:
+
+        - `data`, `indices`, `indptr`: the transition matrix in CSR format,
+        - `row_state`, `row_action`: the state-action index (see `utils.StateActionIndex`),
+        - `state_label_offsets`, `state_label_states`: the states of the i-th label are
+          `state_label_states[state_label_offsets[i]:state_label_offsets[i+1]]`,
+        - `action_label_offsets`, `action_label_rows`: the same for the rows of actions.
+
+        In contrast to .tra and .lab-files, this format doesn't need to be parsed and can be loaded 
+        using memory-mapping (see `load_binary`).
+
+        :param dirpath: Path of the directory. Is created if it does not exist.
+        :type dirpath: str
+        :return: The path of the directory.
+        :rtype: str
+        """
+        os.makedirs(dirpath, exist_ok=True)
+        meta, arrays = self._to_arrays()
+        for name, arr in arrays.items():
+            np.save(os.path.join(dirpath, name + ".npy"), np.asarray(arr))
+        # meta.json is written last, so incompletely written directories are not recognized as models
+        with open(os.path.join(dirpath, "meta.json"), "w") as meta_file:
+            json.dump(meta, meta_file)
+        return dirpath
+
+    @staticmethod
+    def is_binary(path):
+        """Checks whether a path points to a model that was stored via `save_binary`.
+
+        :param path: The path.
+        :type path: str
+        :rtype: bool
+        """
+        return os.path.isfile(os.path.join(path, "meta.json"))
+
+    @classmethod
+    def load_binary(cls, dirpath, mmap=True):
+        """Loads a model that was stored via `save_binary`. If `mmap` is True, the arrays are memory-mapped (read-only)
+        instead of being read into memory, which makes loading large models almost instantaneous and allows 
+        multiple processes to share the same pages. Since the model was checked for consistency when it was
+        created, these checks are skipped.
+
+        If called on `AbstractMDP`, the type of the model is taken from the stored meta information.
+
+        :param dirpath: Path of the directory.
+        :type dirpath: str
+        :param mmap: Whether the arrays should be memory-mapped, defaults to True
+        :type mmap: bool, optional
+        :return: Instance of the stored model type.
+        :rtype: cls
+        """
+        with open(os.path.join(dirpath, "meta.json")) as meta_file:
+            meta = json.load(meta_file)
+        assert meta.get("format") == "switss", "%s does not contain a binary model." % dirpath
+        assert meta["version"] <= BINARY_FORMAT_VERSION, "Binary format version %d of %s is not supported (at most %d)." % (
+            meta["version"], dirpath, BINARY_FORMAT_VERSION)
+        if cls is AbstractMDP:
+            cls = { subcls.__name__ : subcls for subcls in AbstractMDP.__subclasses__() }[meta["modeltype"]]
+        
+        mmap_mode = "r" if mmap else None
+        arrays = { name : np.load(os.path.join(dirpath, name + ".npy"), mmap_mode=mmap_mode) 
+                   for name in ["data", "indices", "indptr", "row_state", "row_action", "state_label_offsets", 
+                                "state_label_states", "action_label_offsets", "action_label_rows"] }
+        return cls._from_arrays(meta, arrays)
+
     @abstractmethod
     def save(self, filepath):
         """Saves the .tra and .lab-file according to the given filepath.
@@ -239,6 +502,10 @@ class AbstractMDP(ABC):
     def _load_transition_matrix(cls, filepath):
         pass
 
+    @abstractclassmethod
+    def _load_transition_matrix_legacy(cls, filepath):
+        pass
+
     def __repr__(self):
         return "%s(C=%s, N=%s, labels={%s})" % (
                         type(self).__name__, 
@@ -0,0 +1,212 @@
+from . import AbstractMDP, ReachabilityForm
+from ..utils import StateActionIndex, phase
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+def _sequence_ids(offsets, values):
+    """Assigns an id to every sequence `values[offsets[i]:offsets[i+1]]` such that two sequences get the same
+    id iff they are equal. Sequences of the same length are compared at once as rows of a matrix.
+
+    :return: Vector of ids and the number of distinct sequences.
+    :rtype: Tuple[np.ndarray[int], int]
+    """
+    lengths = np.diff(offsets)
+    ids = np.empty(len(lengths), dtype=np.int64)
+    id_count = 0
+    for length in np.unique(lengths).tolist():
+        seqs = np.nonzero(lengths == length)[0]
+        if length == 0:
+            ids[seqs] = id_count
+            id_count += 1
+            continue
+        matr = values[offsets[seqs][:,None] + np.arange(length)]
+        # sort the sequences lexicographically and number the distinct ones
+        order = np.lexsort(matr.T[::-1])
+        matr = matr[order]
+        inverse = np.zeros(len(seqs), dtype=np.int64)
+        np.cumsum((matr[1:] != matr[:-1]).any(axis=1), out=inverse[1:])
+        ids[seqs[order]] = id_count + inverse
+        id_count += int(inverse[-1]) + 1
+    return ids, id_count
+
+def _row_signatures(P, blocks, block_count, decimals):
+    """Computes for every row of P the distribution over blocks (as a CSR matrix with sorted indices) and an id
+    such that two rows get the same id iff their distributions over blocks are equal."""
+    C = P.shape[0]
+    rows = np.repeat(np.arange(C), np.diff(P.indptr))
+    dists = csr_matrix((P.data, (rows, blocks[P.indices])), shape=(C, block_count))
+    dists.sum_duplicates()
+    _, prob_ids = np.unique(np.round(dists.data, decimals), return_inverse=True)
+    keys = dists.indices.astype(np.int64) * (int(prob_ids.max(initial=-1)) + 1) + prob_ids.ravel()
+    row_ids, row_id_count = _sequence_ids(dists.indptr, keys)
+    return dists, row_ids, row_id_count
+
+def bisimulation_partition(system, labels=None, decimals=12):
+    """Computes the coarsest strong probabilistic bisimulation of a DTMC or MDP by signature-based partition
+    refinement. Two states :math:`s,t` are bisimilar iff they have the same labels (of those in `labels`) and
+    for every action of :math:`s` there is an action of :math:`t` with the same probability to move into every
+    block of bisimilar states and vice versa (actions are not distinguished by their labels).
+
+    Starting with the partition of the states by their labels, every round computes the signature of every state,
+    i.e. the set of its distributions over the current blocks, and splits all blocks whose states have different
+    signatures. Every round runs in time :math:`O(m \\log m)` where :math:`m` is the number of nonzero entries
+    of the transition matrix.
+
+    :param system: The system.
+    :type system: model.AbstractMDP
+    :param labels: Labels that need to be respected, i.e. bisimilar states have the same of these labels.
+        If None, no labels are respected, defaults to None
+    :type labels: Iterable[str], optional
+    :param decimals: Probabilities are compared after rounding them to this number of decimals, defaults to 12
+    :type decimals: int, optional
+    :return: A :math:`N` vector containing the block of every state and the number of blocks.
+    :rtype: Tuple[np.ndarray[int], int]
+    """
+    assert isinstance(system, AbstractMDP)
+    labels = [] if labels is None else list(labels)
+    P = csr_matrix(system.P)
+    index = system.index_by_state_action
+
+    # initial partition by the labels of every state
+    label_matr = np.zeros((system.N, len(labels)+1), dtype=np.int64)
+    for col, label in enumerate(labels):
+        states = system.states_by_label[label] if label in system.states_by_label else set()
+        label_matr[np.fromiter(states, dtype=np.int64, count=len(states)), col] = 1
+    _, blocks = np.unique(label_matr, axis=0, return_inverse=True)
+    blocks = blocks.ravel()
+    block_count = int(blocks.max(initial=-1)) + 1
+
+    while True:
+        _, row_ids, row_id_count = _row_signatures(P, blocks, block_count, decimals)
+        # the signature of a state is the (sorted) set of distributions of its actions
+        state_sigs = np.unique(index.row_state * row_id_count + row_ids)
+        sig_states, sig_rows = state_sigs // row_id_count, state_sigs % row_id_count
+        offsets = np.zeros(system.N+1, dtype=np.int64)
+        np.cumsum(np.bincount(sig_states, minlength=system.N), out=offsets[1:])
+        sig_ids, sig_id_count = _sequence_ids(offsets, sig_rows)
+        # blocks are only split, never merged
+        _, new_blocks = np.unique(blocks * sig_id_count + sig_ids, return_inverse=True)
+        new_blocks = new_blocks.ravel()
+        new_block_count = int(new_blocks.max(initial=-1)) + 1
+        if new_block_count == block_count:
+            return blocks, block_count
+        blocks, block_count = new_blocks, new_block_count
+
+@phase("bisimulation")
+def bisimulation_quotient(reach_form, labels=None, decimals=12):
+    """Computes the quotient of a RF under strong probabilistic bisimulation (see `bisimulation_partition`), i.e.
+    a RF with one state for every block of bisimilar states. The quotient has the same minimal and maximal
+    reachability probabilities. Minimal witnesses for "min"-mode (Farkas certificates of the states) can be computed
+    on the (smaller) quotient and be lifted back to the RF (see `lift_certificate`). Every quotient state keeps the actions of one state of its block
+    (the one with the smallest index) and the labels of all states of its block. Thus, the labels that are respected
+    by the quotient (see `labels`) should contain every label that is used for label-based minimization.
+
+    .. code-block::
+
+        quotient, block_map, row_map = bisimulation_quotient(rf)
+        result = MILPExact().solve(quotient, 0.5, "min")
+        certificate = lift_certificate(rf, result.farkas_cert, block_map, "min")
+        witness = Subsystem(rf, certificate, "min")
+
+    :param reach_form: The RF.
+    :type reach_form: model.ReachabilityForm
+    :param labels: Labels that need to be respected (target and fail state are always kept apart), defaults to None
+    :type labels: Iterable[str], optional
+    :param decimals: Probabilities are compared after rounding them to this number of decimals, defaults to 12
+    :type decimals: int, optional
+    :return: A triple (quotient, block_map, row_map) where block_map is a :math:`N_{S_{\\text{all}}}` vector that
+        contains the quotient state of every state of the RF, and row_map is a :math:`C_{S_{\\text{all}}}` vector that
+        contains for every row (state-action pair) of the RF a row of the quotient with the same distribution over blocks.
+    :rtype: Tuple[model.ReachabilityForm, np.ndarray[int], np.ndarray[int]]
+    """
+    assert isinstance(reach_form, ReachabilityForm)
+    system = reach_form.system
+    C,N = system.P.shape
+    labels = [] if labels is None else list(labels)
+    blocks, block_count = bisimulation_partition(
+        system, labels + [reach_form.target_label, reach_form.fail_label], decimals=decimals)
+
+    # number the blocks by their smallest state, such that target and fail block come last
+    first_states = np.unique(blocks, return_index=True)[1]
+    target_block, fail_block = blocks[N-2], blocks[N-1]
+    order = np.argsort(first_states, kind="stable")
+    order = np.concatenate((order[(order != target_block) & (order != fail_block)], [target_block, fail_block]))
+    block_map = np.empty(block_count, dtype=np.int64)
+    block_map[order] = np.arange(block_count)
+    block_map = block_map[blocks]
+
+    # every quotient state keeps the actions of the first state of its block
+    dists, row_ids, row_id_count = _row_signatures(csr_matrix(system.P), block_map, block_count, decimals)
+    is_representative = np.zeros(N, dtype=bool)
+    is_representative[first_states] = True
+    is_representative[[N-2, N-1]] = False
+    row_state, row_action = system.index_by_state_action.row_state, system.index_by_state_action.row_action
+    rows = np.nonzero(is_representative[row_state])[0]
+    new_C = len(rows)
+
+    state_action_map = np.full(C, -1)
+    state_action_map[rows] = np.arange(new_C)
+    # new rows of target and fail state are appended by `_initialize_system`
+    quotient_rows = np.concatenate((rows, [C-2, C-1]))
+    keys = block_map[row_state] * row_id_count + row_ids
+    quotient_keys = keys[quotient_rows]
+    key_order = np.argsort(quotient_keys, kind="stable")
+    row_map = key_order[np.searchsorted(quotient_keys, keys, sorter=key_order)]
+    assert (quotient_keys[row_map] == keys).all(), "Partition is not a bisimulation."
+    row_map[quotient_rows] = np.arange(new_C+2)
+
+    quotient_P = dists[rows]
+    new_index_by_state_action = StateActionIndex(block_map[row_state[rows]], row_action[rows])
+    state_map = np.where(block_map < block_count-2, block_map, -1)
+    quotient_system = ReachabilityForm._initialize_system(
+        quotient_P[:, :block_count-2],
+        new_index_by_state_action,
+        quotient_P[:, block_count-2].toarray().ravel(),
+        state_map,
+        state_action_map,
+        system,
+        reach_form.target_label,
+        reach_form.fail_label,
+        # the probabilities to fail are recomputed from sums of merged entries
+        fail_tolerance="rounding")
+
+    quotient = ReachabilityForm(
+        quotient_system,
+        reach_form.initial_label,
+        target_label=reach_form.target_label,
+        fail_label=reach_form.fail_label,
+        ignore_consistency_checks=True)
+    return quotient, block_map, row_map
+
+def lift_certificate(reach_form, certificate, block_map, mode):
+    """Lifts a "min"-mode certificate of a quotient (see `bisimulation_quotient`) to the original RF, i.e. every
+    state gets the value of its block. Afterwards, all entries of states that are not reachable from the initial
+    state via states with nonzero entries are set to 0, such that the lifted witness (see `problem.Subsystem`) is
+    a RF again. The lifted vector is a Farkas certificate for the same threshold if the given one is, since bisimilar
+    states have the same distributions over blocks.
+
+    "max"-mode certificates are not supported: they contain expected visiting frequencies of state-action pairs,
+    which depend on how the frequency of a block is split among its states, so copying them to all states of a
+    block does not give a Farkas certificate in general.
+
+    :param reach_form: The RF the quotient was computed from.
+    :type reach_form: model.ReachabilityForm
+    :param certificate: Certificate of the quotient (without entries for target and fail).
+    :type certificate: np.ndarray[float]
+    :param block_map: Block map returned by `bisimulation_quotient`.
+    :type block_map: np.ndarray[int]
+    :param mode: The mode of the certificate, which must be "min".
+    :type mode: str
+    :return: Certificate of the RF (without entries for target and fail).
+    :rtype: np.ndarray[float]
+    """
+    assert mode in ["min", "max"]
+    assert mode == "min", "only 'min'-mode certificates can be lifted to the RF"
+    certificate = np.asarray(certificate)
+    N = reach_form.system.N
+    lifted = certificate[block_map[:N-2]]
+
+    blocklist = set(np.nonzero(lifted <= 0)[0].tolist())
+    reachable = reach_form.system.reachable_mask({reach_form.initial}, "forward", blocklist=blocklist)[:N-2]
+    return np.where(reachable, lifted, 0)
@@ -1,13 +1,13 @@
-from bidict import bidict
 from graphviz import Digraph
 from scipy.sparse import dok_matrix
+import numpy as np
 
 from . import AbstractMDP
-from ..utils import color_from_hash, cast_dok_matrix, DTMCVisualizationConfig
-from ..prism import prism
+from ..utils import color_from_hash, cast_csr_matrix, DTMCVisualizationConfig, StateActionIndex
+from ..prism import prism, parse_transition_file, transition_matrix_from_entries
 
 class DTMC(AbstractMDP):
-    def __init__(self, P, label_to_states={}, index_by_state_action=None, vis_config=None, **kwargs):
+    def __init__(self, P, label_to_states={}, index_by_state_action=None, vis_config=None, ignore_consistency_checks=False, **kwargs):
         """Instantiates a DTMC from a transition matrix and labelings for states.
 
         :param P: :math:`N_{S_{\\text{all}}} \\times N_{S_{\\text{all}}}` transition matrix.
@@ -15,27 +15,30 @@ class DTMC(AbstractMDP):
         :param index_by_state_action: Mapping from states to their corresponding row-entries. Every
             key must have 0 for its action value. If None, then every row-index corresponds to the
             same column-index.
-        :type index_by_state_action: Dict[Tuple[int,int],int]
+        :type index_by_state_action: Dict[Tuple[int,int],int] or utils.StateActionIndex
         :param label_to_states: Mapping from labels to sets of states.
         :type label_to_states: Dict[str,Set[int]]
         :param vis_config: Used to configure how model is visualized.
         :type vis_config: VisualizationConfig
+        :param ignore_consistency_checks: If set to True, the transition matrix is not checked for being stochastic,
+            defaults to False
+        :type ignore_consistency_checks: bool, optional
         """
-        # transform P into dok_matrix if neccessary
-        P =  cast_dok_matrix(P)  
+        # transform P into csr_matrix if neccessary
+        P = cast_csr_matrix(P)
         assert P.shape[0] == P.shape[1], "P must be a (NxN)-matrix but has shape %s" % P.shape
         if index_by_state_action is None:
-            index_by_state_action = bidict()
-            for i in range(P.shape[0]):
-                index_by_state_action[(i,0)] = i
+            index_by_state_action = StateActionIndex.identity(P.shape[0])
         else:
-            for s,a in index_by_state_action.keys():
-                assert a == 0, "If state-actions are specified, DTMCs must have all 0-entries for actions: (%s,%s)" % (s,a)
+            index_by_state_action = StateActionIndex.from_dict(index_by_state_action)
+            faulty_rows = np.nonzero(index_by_state_action.row_action != 0)[0]
+            assert len(faulty_rows) == 0, "If state-actions are specified, DTMCs must have all 0-entries for actions: (%s,%s)" % \
+                index_by_state_action.inv[faulty_rows[0]]
 
         if vis_config is None:
             vis_config = DTMCVisualizationConfig()
 
-        super().__init__(P, index_by_state_action, {}, label_to_states, vis_config)
+        super().__init__(P, index_by_state_action, {}, label_to_states, vis_config, ignore_consistency_checks)
 
     def digraph(self, state_map = None, trans_map = None, **kwargs):
         """Creates a `graphviz.Digraph` object from this instance. When a digraph object is created, 
@@ -81,9 +84,10 @@ class DTMC(AbstractMDP):
         # connect nodes between each other
         existing_nodes = set({})
 
+        row_state = self.index_by_state_action.row_state.tolist()
         for (rowidx, dest), p in self.P.items():
             # transition from source to dest w/ probability p
-            source,_ = self.index_by_state_action.inv[rowidx]
+            source = row_state[rowidx]
             for node in [source, dest]:
                 if node not in existing_nodes:
                     state_setting = state_map(node, self.labels_by_state[node])
@@ -102,9 +106,9 @@ class DTMC(AbstractMDP):
 
         with open(tra_path, "w") as tra_file:
             tra_file.write("%d %d\n" % (self.N, self.P.nnz))
-            for (rowidx,dest), p in self.P.items():
-                source,_ = self.index_by_state_action.inv[rowidx]
-                tra_file.write("%d %d %f\n" % (source, dest, p))
+            rows = np.repeat(np.arange(self.C), np.diff(self.P.indptr))
+            source = self.index_by_state_action.row_state[rows]
+            np.savetxt(tra_file, np.column_stack((source, self.P.indices, self.P.data)), fmt="%d %d %f")
 
         with open(lab_path, "w") as lab_file:
             unique_labels_list = list(self.states_by_label.keys())
@@ -120,6 +124,34 @@ class DTMC(AbstractMDP):
 
     @classmethod
     def _load_transition_matrix(cls, filepath):
+        """Loads a transition matrix from a .tra-file. The file is read into NumPy columns at once
+        and the transition matrix is built directly in CSR format.
+
+        :param filepath: filepath to .tra-file
+        :type filepath: str
+        :return: the transition matrix
+        :rtype: Dict[str, scipy.sparse.csr_matrix]
+        """
+        # the first line has format "#states #transitions"
+        # all other lines have format "from to prob"
+        header, columns, _, _ = parse_transition_file(filepath, 3)
+        N = int(header[0])
+        source = columns[:,0].astype(np.int64)
+        dest = columns[:,1].astype(np.int64)
+        # duplicate transitions are overwritten by later lines, as in `_load_transition_matrix_legacy`
+        P = transition_matrix_from_entries(source, dest, columns[:,2], (N,N))
+        return { "P" : P }
+
+    @classmethod
+    def _load_transition_matrix_legacy(cls, filepath):
+        """Loads a transition matrix from a .tra-file by parsing the file line by line. This is slow for larger
+        models, but may be used for checking results of `_load_transition_matrix`.
+
+        :param filepath: filepath to .tra-file
+        :type filepath: str
+        :return: the transition matrix
+        :rtype: Dict[str, scipy.sparse.dok_matrix]
+        """
         P = dok_matrix((1,1))
         N = 0
 
@@ -0,0 +1,44 @@
+import numpy as np
+import inspect
+from scipy.sparse import csc_matrix
+from scipy.sparse.linalg import spsolve, spilu, bicgstab, LinearOperator
+
+# systems with at most this many variables are solved directly
+DIRECT_SOLVE_LIMIT = 10**5
+
+# scipy 1.12 renamed the relative tolerance of its iterative solvers from `tol` to `rtol` and 1.14 removed `tol`
+_RTOL_KEYWORD = "rtol" if "rtol" in inspect.signature(bicgstab).parameters else "tol"
+
+def solve_linear_system(A, b, method="auto", tol=1e-12):
+    """Solves a sparse linear equation system :math:`\\mathbf{A} \\mathbf{x} = \\mathbf{b}`. Systems that arise from
+    DTMCs in reachability form (i.e. :math:`\\mathbf{A} = \\mathbf{I} - \\mathbf{P}` for a substochastic
+    matrix :math:`\\mathbf{P}` where every state reaches goal or fail) are non-singular.
+
+    :param A: :math:`N \\times N` matrix.
+    :type A: scipy.sparse.spmatrix
+    :param b: :math:`N` vector.
+    :type b: np.ndarray[float]
+    :param method: Either "direct" (sparse LU decomposition via `scipy.sparse.linalg.spsolve`), "iterative"
+        (BiCGSTAB with an incomplete LU decomposition as preconditioner; falls back to "direct" if it does not converge) or
+        "auto" ("direct" for systems with at most `DIRECT_SOLVE_LIMIT` variables, "iterative" otherwise), defaults to "auto"
+    :type method: str, optional
+    :param tol: Relative tolerance of the iterative solver, defaults to 1e-12
+    :type tol: float, optional
+    :return: The solution :math:`\\mathbf{x}`.
+    :rtype: np.ndarray[float]
+    """
+    assert method in ["auto", "direct", "iterative"], "method must be 'auto', 'direct' or 'iterative', but is %s" % method
+    A = csc_matrix(A)
+    b = np.asarray(b, dtype=float).ravel()
+    assert A.shape[0] == A.shape[1] == len(b), "A must be a (NxN)-matrix and b a N-vector, but shapes are %s and %s" % (A.shape, b.shape)
+    if method == "auto":
+        method = "direct" if A.shape[0] <= DIRECT_SOLVE_LIMIT else "iterative"
+
+    if method == "iterative":
+        ilu = spilu(A)
+        preconditioner = LinearOperator(A.shape, ilu.solve)
+        x, info = bicgstab(A, b, atol=0., M=preconditioner, **{ _RTOL_KEYWORD : tol })
+        if info == 0:
+            return x
+
+    return np.asarray(spsolve(A, b)).ravel()
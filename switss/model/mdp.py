@@ -2,13 +2,14 @@ from graphviz import Digraph
 from scipy.sparse import dok_matrix
 from bidict import bidict
 from collections import defaultdict
+import numpy as np
 
 from . import AbstractMDP
-from ..prism import prism
-from ..utils import color_from_hash, VisualizationConfig
+from ..prism import prism, parse_transition_file, transition_matrix_from_entries
+from ..utils import color_from_hash, VisualizationConfig, StateActionIndex
 
 class MDP(AbstractMDP):
-    def __init__(self, P, index_by_state_action, label_to_actions={}, label_to_states={}, vis_config=None):
+    def __init__(self, P, index_by_state_action, label_to_actions={}, label_to_states={}, vis_config=None, ignore_consistency_checks=False):
         """Instantiates a MDP from a transition matrix, a bidirectional
         mapping from state-action pairs to corresponding transition matrix entries and labelings for states and actions.
 
@@ -23,12 +24,15 @@ class MDP(AbstractMDP):
         :type label_to_states: Dict[str,Set[int]]
         :param vis_config: Used to configure how model is visualized.
         :type vis_config: VisualizationConfig
+        :param ignore_consistency_checks: If set to True, the transition matrix is not checked for being stochastic,
+            defaults to False
+        :type ignore_consistency_checks: bool, optional
         """
 
         if vis_config is None:
             vis_config = VisualizationConfig()
 
-        super().__init__(P, index_by_state_action, label_to_actions, label_to_states,vis_config)
+        super().__init__(P, index_by_state_action, label_to_actions, label_to_states, vis_config, ignore_consistency_checks)
 
 
     def digraph(self, state_map = None, trans_map = None, action_map = None):
@@ -87,8 +91,10 @@ class MDP(AbstractMDP):
         existing_nodes = set({})
         existing_state_action_pairs = set({})
 
+        row_state = self.index_by_state_action.row_state.tolist()
+        row_action = self.index_by_state_action.row_action.tolist()
         for (idx, dest), p in self.P.items():
-            source, action = self.index_by_state_action.inv[idx]
+            source, action = row_state[idx], row_action[idx]
 
             # transition from source to dest w/ probability p
             for node in [source, dest]:
@@ -118,10 +124,11 @@ class MDP(AbstractMDP):
 
         with open(tra_path, "w") as tra_file:
             tra_file.write("%d %d %d\n" % (self.N, self.C, self.P.nnz))
-            for (index,dest), p in self.P.items():
-                if p > 0:
-                    source,action = self.index_by_state_action.inv[index]
-                    tra_file.write("%d %d %d %f\n" % (source, action, dest, p))
+            rows = np.repeat(np.arange(self.C), np.diff(self.P.indptr))
+            positive = self.P.data > 0
+            rows, dest, p = rows[positive], self.P.indices[positive], self.P.data[positive]
+            source, action = self.index_by_state_action.row_state[rows], self.index_by_state_action.row_action[rows]
+            np.savetxt(tra_file, np.column_stack((source, action, dest, p)), fmt="%d %d %d %f")
 
         with open(lab_path, "w") as lab_file:
             unique_labels_list = list(self.states_by_label.keys())
@@ -137,12 +144,57 @@ class MDP(AbstractMDP):
 
     @classmethod
     def _load_transition_matrix(cls, filepath):
-        """Loads a transition matrix from a .tra-file
+        """Loads a transition matrix from a .tra-file. The file is read into NumPy columns at once, 
+        the row index of every state-action pair is computed by vectorized operations and the 
+        transition matrix is built directly in CSR format. State-action pairs are indexed in the order
+        of their first occurrence in the file, i.e. the same way as in `_load_transition_matrix_legacy`. 
         
-        :param tra_file_path: filepath to .tra-file
-        :type tra_file_path: str
-        :return: a bidict that contains mappings from state-action pairs to an index set :math:`\{0,\dots,C\}` and a transition matrix  
-        :rtype: Tuple[scipy.sparse.dok_matrix, bidict.bidict]
+        :param filepath: filepath to .tra-file
+        :type filepath: str
+        :return: a dictionary containing the transition matrix ("P"), an index that maps state-action pairs to an index set
+            :math:`\{0,\dots,C\}` ("index_by_state_action") and the state-action pairs of every action label ("label_to_actions")
+        :rtype: Dict[str, Union[scipy.sparse.csr_matrix, utils.StateActionIndex, Dict[str, Set[Tuple[int,int]]]]]
+        """
+        # the first line should have format "#states #choices #transitions"
+        # the number of choices is the number of active state-action pairs
+        # all other lines have format "source action dest prob [actionlabel]"
+        header, columns, labeled_lines, actionlabels = parse_transition_file(filepath, 4)
+        N, C = int(header[0]), int(header[1])
+        source = columns[:,0].astype(np.int64)
+        action = columns[:,1].astype(np.int64)
+        dest = columns[:,2].astype(np.int64)
+        prob = columns[:,3]
+
+        # give every state-action pair a unique key, then index the keys by their first occurrence
+        keys = source * (action.max(initial=0) + 1) + action
+        _, first_occurrence, key_index = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first_occurrence)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        rows = rank[key_index]
+
+        # duplicate transitions are overwritten by later lines, as in `_load_transition_matrix_legacy`
+        P = transition_matrix_from_entries(rows, dest, prob, (C,N))
+        index_by_state_action = StateActionIndex(source[first_occurrence[order]], action[first_occurrence[order]])
+
+        label_to_actions = defaultdict(set)
+        unique_labels, label_index = np.unique(actionlabels, return_inverse=True)
+        for idx, actionlabel in enumerate(unique_labels):
+            lines = labeled_lines[label_index == idx]
+            label_to_actions[str(actionlabel)] = set(zip(source[lines].tolist(), action[lines].tolist()))
+
+        return { "P" : P, "index_by_state_action" : index_by_state_action, "label_to_actions" : label_to_actions }
+
+    @classmethod
+    def _load_transition_matrix_legacy(cls, filepath):
+        """Loads a transition matrix from a .tra-file by parsing the file line by line. This is slow for larger
+        models, but may be used for checking results of `_load_transition_matrix`.
+        
+        :param filepath: filepath to .tra-file
+        :type filepath: str
+        :return: a dictionary containing the transition matrix ("P"), a bidict that maps state-action pairs to an index set
+            :math:`\{0,\dots,C\}` ("index_by_state_action") and the state-action pairs of every action label ("label_to_actions")
+        :rtype: Dict[str, Union[scipy.sparse.dok_matrix, bidict.bidict, Dict[str, Set[Tuple[int,int]]]]]
         """
         P = dok_matrix((1,1))
         index_by_state_action = bidict()
@@ -1,12 +1,13 @@
-from . import AbstractMDP,MDP
-from ..utils import InvertibleDict, cast_dok_matrix, DTMCVisualizationConfig, VisualizationConfig
+from . import AbstractMDP,MDP,DTMC
+from ..utils import InvertibleDict, cast_dok_matrix, DTMCVisualizationConfig, VisualizationConfig, StateActionIndex, ResultCache, content_hash, phase, Graph
 from ..solver.milp import LP
+from .value_iteration import interval_iteration, topological_iteration
+from .linear_equations import solve_linear_system
 
-from collections import defaultdict
 from bidict import bidict
 import copy as copy
 import numpy as np
-from scipy.sparse import dok_matrix,hstack,vstack
+from scipy.sparse import dok_matrix,csr_matrix,hstack,vstack,diags
 
 class ReachabilityForm:
     """ 
@@ -19,7 +20,12 @@ class ReachabilityForm:
     - every state is reachable from the initial state (fail doesn't need to be reachable) and
     - every state reaches the goal state (except the fail state)
 
+    Results of analyses that don't depend on a threshold (e.g. `max_z_state`, `pr_max` or the MECs of the system) are
+    cached per solver/method, so they are computed only once. If `cache_directory` is set, the results are also 
+    stored on disk (keyed by a hash of the RF, see `content_hash`) and are reused by every RF with the same content.
     """
+    cache_directory = None
+
     def __init__(self, system, initial_label, target_label="rf_target", fail_label="rf_fail", ignore_consistency_checks=False):
         """Instantiates a RF.
 
@@ -44,13 +50,16 @@ class ReachabilityForm:
         self.target_label = target_label
         self.fail_label = fail_label
         self.initial_label = initial_label
-        self.__index_by_state_action = system.index_by_state_action.copy()
-        del self.__index_by_state_action.inv[system.C-2]
-        del self.__index_by_state_action.inv[system.C-1]
+        self.__index_by_state_action = system.index_by_state_action.restrict(system.C-2)
         
         self.__A = self._reach_form_id_matrix() - self.__P
-        self.__to_target = system.P.getcol(system.N-2).todense()[:system.C-2]
+        self.__to_target = system.P_csc.getcol(system.N-2).todense()[:system.C-2]
         
+        self.__cache = None
+        # only the right hand sides of the Farkas constraints depend on the threshold, see `fark_z_constraints`
+        self.__fark_z_matr = None
+        self.__fark_y_matr = None
+
         self.__target_visualization_style = None
         self.__fail_visualization_style = None
         self.set_target_visualization_style()
@@ -162,7 +171,7 @@ class ReachabilityForm:
             assert state == colidx, "State %s must be at index %s but is at %s" % (name, colidx, state)
 
         # fail_mask has a 1 only at the fail state and zeros otherwise
-        fail_mask = np.zeros(system.N,dtype=np.bool)
+        fail_mask = np.zeros(system.N,dtype=bool)
         fail_mask[fail] = True 
 
         # check that every state is reachable
@@ -176,7 +185,9 @@ class ReachabilityForm:
         assert (bwd_mask ^ fail_mask).all(), "Not every state reaches %s in system %s" % (target_label, system)
 
     @staticmethod
-    def reduce(system, initial_label, target_label, new_target_label="rf_target", new_fail_label="rf_fail", debug=False):
+    @phase("reduce")
+    def reduce(system, initial_label, target_label, new_target_label="rf_target", new_fail_label="rf_fail", debug=False, as_arrays=False,
+               fail_tolerance=0.):
         """Reduces a system to a system in reachability form. 
         The transformation does a forward search starting at the initial state, then a 
         backwards search starting from the targets states and then removes all states 
@@ -196,10 +207,20 @@ class ReachabilityForm:
         :type new_fail_label: str, optional
         :param debug: If True, additional diagnostic information is printed, defaults to False
         :type debug: bool, optional
+        :param as_arrays: If True, state_map and state_action_map are returned as arrays instead of dictionaries (see below),
+            defaults to False
+        :type as_arrays: bool, optional
+        :param fail_tolerance: Probabilities to reach the fail state of at most this value are dropped. If "rounding",
+            the rounding error of every row sum (machine epsilon times the number of summands) is used, which ignores
+            the remaining probabilities of rows that only don't sum up to 1 due to rounding errors, defaults to 0
+        :type fail_tolerance: float or str, optional
         :return: A triple (RF, state_map, state_action_map) where state_map (state_action_map) is a mapping from system states
             (state-actions pairs) to states (state-action pairs) of the reduced system. If a state (state-action pair) is not a 
-            key in the dictionary, it was removed.
-        :rtype: Tuple[model.ReachabilityForm, Dict[int,int], Dict[Tuple[int,int],Tuple[int,int]]]
+            key in the dictionary, it was removed. If `as_arrays` is True, state_map (state_action_map) is a 
+            :math:`N_{S_{\\text{all}}}` (:math:`C_{S_{\\text{all}}}`) vector that contains the new index of every state (row of 
+            the transition matrix) of the system, or -1 if it was removed. Actions keep their action index.
+        :rtype: Tuple[model.ReachabilityForm, Dict[int,int], Dict[Tuple[int,int],Tuple[int,int]]] or 
+            Tuple[model.ReachabilityForm, np.ndarray[int], np.ndarray[int]]
         """        
         assert isinstance(system, AbstractMDP)
         assert new_target_label not in system.states_by_label.keys(), "Label '%s' for target state already exists in system %s" % (new_target_label, system)
@@ -218,72 +239,64 @@ class ReachabilityForm:
         forward_reachable = system.reachable_mask(set([initial]), "forward", blocklist=target_states)
         # states which are reachable from the initial state AND are able to reach target states
         reachable_mask = backward_reachable & forward_reachable
-        # TODO: use reachable_mask instead of reachable everywhere
-        # this is much better for performance since lookup of states is always O(1)
-        reachable = [ idx for idx,x in enumerate(reachable_mask) if x ]
-        reachable_index_mapping = { v : k for k,v in enumerate(reachable) }
 
         if debug:
             print("tested backward & forward reachability test")
         
         # reduce states + new target and new fail state 
-        new_state_count = len(reachable) + 2
+        new_state_count = int(reachable_mask.sum()) + 2
         target_idx, fail_idx = new_state_count - 2, new_state_count - 1
         
         if debug:
             print("new states: %s, target index: %s, fail index: %s" % (new_state_count, target_idx, fail_idx))
         
         # create a mapping from system to reachability form
-        to_rf_cols, to_rf_rows = bidict(), bidict()
-
-        for sapidx in range(system.C):
-            stateidx, actionidx = system.index_by_state_action.inv[sapidx]
-            if reachable_mask[stateidx]:
-                newidx = reachable_index_mapping[stateidx] # reachable.index(stateidx)
-                to_rf_rows[(stateidx,actionidx)] = (newidx,actionidx)
-                to_rf_cols[stateidx] = newidx
+        row_state = system.index_by_state_action.row_state
+        row_action = system.index_by_state_action.row_action
+        kept_states = np.nonzero(reachable_mask)[0]
+        new_state_by_state = np.cumsum(reachable_mask) - 1
+        rows = np.nonzero(reachable_mask[row_state])[0]
+        states, actions = row_state[rows], row_action[rows]
+        new_states = new_state_by_state[states]
+        new_index_by_state_action = StateActionIndex(new_states, actions)
 
         if debug:
             print("computed state-action mapping")
 
         # compute reduced transition matrix (without non-reachable states)
         # compute probability of reaching the target state in one step 
-        new_N = len(set(to_rf_cols.values()))
-        new_C = len(set(to_rf_rows.values()))
-        new_P = dok_matrix((new_C, new_N))
-        new_index_by_state_action = bidict()
+        new_N, new_C = len(kept_states), len(rows)
         
         if debug:
             print("shape of new_P (%s,%s)" % (new_C,new_N))
 
-        to_target = np.zeros(new_C)
-
-        # mask for faster access
-        target_mask = np.zeros(system.N, dtype=np.bool)
-        for t in target_states:
-            target_mask[t] = 1
+        target_mask = np.zeros(system.N, dtype=bool)
+        target_mask[list(target_states)] = True
+        from_target = target_mask[states]
+        to_target = from_target.astype(float)
 
-        for newidx, ((source,action),(newsource,newaction)) in enumerate(to_rf_rows.items()):
-            new_index_by_state_action[(newsource,newaction)] = newidx
-            if target_mask[source]: # in target_states:
-                to_target[newidx] = 1
-            else:
-                idx = system.index_by_state_action[(source,action)]
-                for dest in [s for s,a,p in system.successors(source) if a == action]:
-                    if dest in to_rf_cols:
-                        newdest = to_rf_cols[dest]
-                        new_P[newidx, newdest] = system.P[idx, dest]
+        # rows of target states only lead to the new target state
+        new_P = csr_matrix(system.P)[rows][:, kept_states]
+        new_P = diags((~from_target).astype(float)).dot(new_P).tocsr()
+        new_P.eliminate_zeros()
         if debug:
             print("computed transition matrix & to_target")
 
-        rf_system = ReachabilityForm.__initialize_system(
+        # new index of every state and row of the system (-1 if removed)
+        state_map = np.where(reachable_mask, new_state_by_state, -1)
+        state_action_map = np.full(system.C, -1)
+        state_action_map[rows] = np.arange(new_C)
+
+        rf_system = ReachabilityForm._initialize_system(
             new_P, 
             new_index_by_state_action,
             to_target, 
-            to_rf_rows, 
+            state_map,
+            state_action_map, 
             system, 
             new_target_label, 
-            new_fail_label)
+            new_fail_label,
+            fail_tolerance=fail_tolerance)
 
         rf = ReachabilityForm(
             rf_system, 
@@ -292,8 +305,14 @@ class ReachabilityForm:
             fail_label=new_fail_label,
             ignore_consistency_checks=True)
 
-        rf.__adapt_style(to_rf_cols.inv, to_rf_rows.inv, system.visualization)
+        rf.__adapt_style(kept_states, system.visualization)
 
+        if as_arrays:
+            return rf, state_map, state_action_map
+
+        to_rf_cols = bidict(zip(kept_states.tolist(), range(new_N)))
+        states, actions, new_states = states.tolist(), actions.tolist(), new_states.tolist()
+        to_rf_rows = bidict(zip(zip(states, actions), zip(new_states, actions)))
         return rf, to_rf_cols, to_rf_rows
 
     @property
@@ -302,46 +321,73 @@ class ReachabilityForm:
         return self.__system
 
     @staticmethod
-    def __initialize_system(P, index_by_state_action, to_target, mapping, configuration, target_label, fail_label):
+    def _initialize_system(P, index_by_state_action, to_target, state_map, state_action_map, configuration, target_label, fail_label,
+                           fail_tolerance=0.):
+        """Completes a reduced transition matrix by a new target and a new fail state and copies the labels of
+        the states and actions of a system (`configuration`) that are kept. Runs in time linear in the number of nonzero entries.
+
+        :param P: :math:`C \\times N` transition matrix (without target and fail state).
+        :type P: scipy.sparse.csr_matrix
+        :param index_by_state_action: Index of the rows of P.
+        :type index_by_state_action: utils.StateActionIndex
+        :param to_target: :math:`C` vector of probabilities to reach the target state in one step. 
+            The remaining probability of every row goes to the fail state.
+        :type to_target: np.ndarray[float]
+        :param state_map: Vector that contains the new index of every state of `configuration` (or -1 if it was removed).
+        :type state_map: np.ndarray[int]
+        :param state_action_map: Vector that contains the new row of every row of `configuration` (or -1 if it was removed).
+        :type state_action_map: np.ndarray[int]
+        :param configuration: The original system.
+        :type configuration: model.AbstractMDP
+        :param target_label: Label of the new target state.
+        :type target_label: str
+        :param fail_label: Label of the new fail state.
+        :type fail_label: str
+        :param fail_tolerance: Remaining probabilities of at most this value are dropped instead of adding an edge to the
+            fail state. If "rounding", the rounding error of the row sum (machine epsilon times the number of summands)
+            is used for every row. With 0, every positive remaining probability leads to the fail state, defaults to 0
+        :type fail_tolerance: float or str, optional
+        :return: The completed system (same type as `configuration`).
+        :rtype: model.AbstractMDP
+        """
         C,N = P.shape
-        P_compl = dok_matrix((C+2, N+2))
         target_state, fail_state = N, N+1
+        P = csr_matrix(P)
+        to_target = np.asarray(to_target, dtype=float).ravel()
+
+        # columns for target and fail state, and rows for their self-loops. Remaining probabilities up to the
+        # tolerance are dropped, so they don't add edges to the fail state.
+        p_fail = 1 - (to_target + np.asarray(P.sum(axis=1)).ravel())
+        if fail_tolerance == "rounding":
+            fail_tolerance = np.finfo(float).eps * (np.diff(P.indptr) + 2)
+        target_col = csr_matrix(np.where(to_target > 0, to_target, 0)[:,None])
+        fail_col = csr_matrix(np.where(p_fail > fail_tolerance, p_fail, 0)[:,None])
+        loops = csr_matrix(([1.,1.], ([0,1], [target_state,fail_state])), shape=(2,N+2))
+        P_compl = vstack((hstack((P, target_col, fail_col)), loops), format="csr")
+
+        index_by_state_action_compl = StateActionIndex(
+            np.concatenate((index_by_state_action.row_state, [target_state, fail_state])),
+            np.concatenate((index_by_state_action.row_action, [0, 0])))
 
-        index_by_state_action_compl = index_by_state_action.copy()
-        index_by_state_action_compl[(target_state,0)] = C
-        index_by_state_action_compl[(fail_state,0)] = C+1
-    
-        
         # copy labels from configuration (i.e. a system)
-        # mapping defines which state-action pairs in the system map to which state-action pairs in the r.f.
-        label_to_actions = defaultdict(set)
-        label_to_states = defaultdict(set)
-        for idx in range(C):
-            stateidx, actionidx = index_by_state_action.inv[idx]
-            sys_stateidx, sys_actionidx = mapping.inv[(stateidx,actionidx)]
-            labels = configuration.labels_by_state[sys_stateidx]
-            for l in labels:
-                label_to_states[l].add(stateidx)
-            actionlabels = configuration.labels_by_action[(sys_stateidx,sys_actionidx)]
-            for l in actionlabels:
-                label_to_actions[l].add((stateidx,actionidx))
-        label_to_states[fail_label].add(fail_state)
-        label_to_states[target_label].add(target_state)
-
-        not_to_fail = np.zeros(C)
-        for (idx, dest), p in P.items():
-            not_to_fail[idx] += p
-            P_compl[idx, dest] = p
-
-        for idx, p_target in enumerate(to_target):
-            if p_target > 0:
-                P_compl[idx, target_state] = p_target
-            p_fail = 1 - (p_target + not_to_fail[idx])
-            if p_fail > 0:
-                P_compl[idx, fail_state] = p_fail
-
-        P_compl[C, target_state] = 1
-        P_compl[C+1, fail_state] = 1
+        label_to_states = {}
+        for label, states in configuration.states_by_label.items():
+            new_states = state_map[np.fromiter(states, dtype=np.int64, count=len(states))]
+            new_states = new_states[new_states >= 0]
+            if len(new_states) > 0:
+                label_to_states[label] = set(new_states.tolist())
+        label_to_states[target_label] = {target_state}
+        label_to_states[fail_label] = {fail_state}
+
+        label_to_actions = {}
+        row_state, row_action = index_by_state_action.row_state, index_by_state_action.row_action
+        for label, actions in configuration.actions_by_label.items():
+            states_actions = np.array(list(actions), dtype=np.int64).reshape(-1,2)
+            sys_rows = configuration.index_by_state_action.lookup(states_actions[:,0], states_actions[:,1])
+            new_rows = state_action_map[sys_rows[sys_rows >= 0]]
+            new_rows = new_rows[new_rows >= 0]
+            if len(new_rows) > 0:
+                label_to_actions[label] = set(zip(row_state[new_rows].tolist(), row_action[new_rows].tolist()))
 
         return type(configuration)( 
                     P=P_compl, 
@@ -349,8 +395,10 @@ class ReachabilityForm:
                     label_to_states=label_to_states,
                     label_to_actions=label_to_actions)
     
-    def __adapt_style(self, state_map, state_action_map, viz_cfg):
+    def __adapt_style(self, state_map, viz_cfg):
+        # state_map maps states of the r.f. to states of the original system. actions keep their index.
         C,N = self.system.C,self.system.N
+        state_action_map = lambda sa: (state_map[sa[0]], sa[1])
 
         def _state_style(sourceidx, labels):
             if sourceidx == N-2: # target state
@@ -366,7 +414,7 @@ class ReachabilityForm:
             elif sourceidx == N-1:
                 return self.__fail_visualization_style.action_map(sourceidx,action,labels)
             else:
-                _sourceidx,_action = state_action_map[(sourceidx,action)]
+                _sourceidx,_action = state_action_map((sourceidx,action))
                 return viz_cfg.action_map(_sourceidx,_action,labels)
         
         def _trans_style_dtmc(sourceidx,destidx,p):
@@ -383,7 +431,7 @@ class ReachabilityForm:
             elif destidx == N-1:
                 return self.__fail_visualization_style.trans_map(sourceidx,action,destidx,p)
             else:
-                _sourceidx,_action = state_action_map[(sourceidx,action)]
+                _sourceidx,_action = state_action_map((sourceidx,action))
                 return viz_cfg.trans_map(_sourceidx,_action,state_map[destidx],p)
         
         if type(viz_cfg) == DTMCVisualizationConfig:
@@ -391,6 +439,11 @@ class ReachabilityForm:
         else:
             self.system.visualization = VisualizationConfig(state_map=_state_style,trans_map=_trans_style_mdp,action_map=_action_style)
 
+    def __reduce__(self):
+        # only the system and the labels are pickled (see `AbstractMDP.__reduce__`). Derived matrices are rebuilt, 
+        # cached results and visualization styles are not kept.
+        return (ReachabilityForm, (self.system, self.initial_label, self.target_label, self.fail_label, True))
+
     def __repr__(self):
         return "ReachabilityForm(initial=%s, target=%s, fail=%s, system=%s)" % (self.initial_label, self.target_label, self.fail_label, self.system)
 
@@ -402,7 +455,7 @@ class ReachabilityForm:
         :param mode: either 'min' or 'max'
         :type mode: str
         :return: either :math:`(C+1) \\times N`-matrix :math:`M_z`, and vector of length :math:`C+1` :math:`rhs_z` or :math:`(N+1) \\times C`-matrix :math:`M_y`, and :math:`N+1`-vector :math:`rhs_y`.
-        :rtype: Tuple[scipy.sparse.dok_matrix, np.ndarray[float]]
+        :rtype: Tuple[scipy.sparse.csr_matrix, np.ndarray[float]]
         """ 
         assert mode in ["min", "max"]
 
@@ -411,6 +464,20 @@ class ReachabilityForm:
         else:
             return self.fark_y_constraints(threshold)
 
+    def fark_threshold_index(self, mode):
+        """Returns the index of the row of the Farkas constraints (see `fark_constraints`) that contains the threshold. 
+        It is the last row, and the only one whose right hand side depends on the threshold, which is 
+        :math:`-\\lambda`.
+
+        :param mode: either 'min' or 'max'
+        :type mode: str
+        :return: :math:`C` if mode is 'min' and :math:`N` if mode is 'max'.
+        :rtype: int
+        """
+        assert mode in ["min", "max"]
+        C,N = self.__P.shape
+        return C if mode == "min" else N
+
     def fark_z_constraints(self, threshold):
         """
         Returns a matrix :math:`M_z` and a vector :math:`rhs_z` such that for a :math:`N` vector :math:`\mathbf{z}`
@@ -421,23 +488,25 @@ class ReachabilityForm:
             \\mathbf{A} \, \mathbf{z} \leq \mathbf{b} \land \mathbf{z}(\\texttt{init}) \geq \lambda
             \quad \\text{  iff  } \quad
             \mathbf{z} \in \mathcal{P}^{\\text{min}}(\lambda)
+
+        :math:`M_z` does not depend on the threshold. It is constructed once and shared between calls, so it must
+        not be modified.
                 
         :param threshold: The threshold :math:`\lambda` for which the Farkas z-constraints should be constructed
         :type threshold: Float
         :return: :math:`(C+1) \\times N`-matrix :math:`M_z`, and vector of length :math:`C+1` :math:`rhs_z`
-        :rtype: Tuple[scipy.sparse.dok_matrix, np.ndarray[float]]
+        :rtype: Tuple[scipy.sparse.csr_matrix, np.ndarray[float]]
         """
         C,N = self.__P.shape
 
-        rhs = self.to_target.A1.copy()
-        rhs.resize(C+1)
-        rhs[C] = -threshold
-
-        delta = np.zeros(N)
-        delta[self.initial] = 1
+        if self.__fark_z_matr is None:
+            delta = csr_matrix(([-1.], ([0], [self.initial])), shape=(1,N))
+            self.__fark_z_matr = vstack((self.A,delta), format="csr")
 
-        fark_z_matr = vstack((self.A,-delta))
-        return fark_z_matr, rhs
+        rhs = np.empty(C+1)
+        rhs[:C] = self.to_target.A1
+        rhs[C] = -threshold
+        return self.__fark_z_matr, rhs
 
     def fark_y_constraints(self, threshold):
         """ 
@@ -451,35 +520,143 @@ class ReachabilityForm:
             \mathbf{y} \in \mathcal{P}^{\\text{max}}(\lambda)
 
         where :math:`\lambda` is the threshold. The vector :math:`\delta_{\\texttt{init}}` is 1 for the initial state, and otherwise 0.
+        :math:`M_y` does not depend on the threshold. It is constructed once and shared between calls, so it must
+        not be modified.
 
         :param threshold: The threshold :math:`\lambda` for which the Farkas y-constraints should be constructed
         :type threshold: Float
         :return: :math:`(N+1) \\times C`-matrix :math:`M_y`, and :math:`N+1`-vector :math:`rhs_y` 
-        :rtype: Tuple[scipy.sparse.dok_matrix, np.ndarray[float]]
+        :rtype: Tuple[scipy.sparse.csr_matrix, np.ndarray[float]]
         """
         C,N = self.__P.shape
 
-        b = cast_dok_matrix(self.to_target)
+        if self.__fark_y_matr is None:
+            b = csr_matrix(-self.to_target.A1.reshape(1,C))
+            self.__fark_y_matr = vstack((self.A.T,b), format="csr")
 
         rhs = np.zeros(N+1)
         rhs[self.initial] = 1
         rhs[N] = -threshold
+        return self.__fark_y_matr, rhs
+
+    def __default_method(self, method):
+        # DTMCs have no nondeterminism, so LPs can be replaced by linear equation systems
+        if method is None:
+            method = "linear" if isinstance(self.system, DTMC) else "lp"
+        assert method in ["lp", "vi", "linear", "topological"], \
+            "method must be 'lp', 'vi', 'linear' or 'topological', but is %s" % method
+        assert method != "linear" or isinstance(self.system, DTMC), "method 'linear' is only available for DTMCs."
+        return method
 
-        fark_y_matr = hstack((self.A,-b)).T
-        return fark_y_matr, rhs
+    @property
+    def content_hash(self):
+        """A hash of the transition matrix, the state-action index and the initial state of the underlying system.
+        Two RFs with the same hash yield the same results in all analyses.
+
+        :rtype: str
+        """
+        P, index = self.system.P, self.system.index_by_state_action
+        return content_hash(P.indptr, P.indices, P.data, index.row_state, index.row_action, self.initial)
+
+    def __cached(self, name, solver, method, compute):
+        if self.__cache is None:
+            if self.cache_directory is None:
+                self.__cache = ResultCache()
+            else:
+                self.__cache = ResultCache(directory=self.cache_directory, hash=self.content_hash)
+        # the solver only matters if LPs are solved
+        key = (name, method, solver) if method == "lp" else (name, method)
+        result = self.__cache.get(key, compute)
+        # callers may modify the results, the cached ones should stay as they are
+        if isinstance(result, tuple):
+            return tuple(r.copy() if isinstance(r, np.ndarray) else r for r in result)
+        return result.copy() if isinstance(result, np.ndarray) else result
+
+    def clear_cache(self, persisted=False):
+        """Removes all cached results of this RF (see `max_z_state`, `pr_max`, `maximal_end_components` etc.).
+
+        :param persisted: If True, results stored in `cache_directory` are removed as well, defaults to False
+        :type persisted: bool, optional
+        """
+        if self.__cache is not None:
+            self.__cache.clear(persisted=persisted)
+        self.__cache = None
+
+    def strongly_connected_components(self):
+        """Returns the strongly connected components of the underlying system (see `AbstractMDP.strongly_connected_components`).
+
+        :return: A :math:`N_{S_{\\text{all}}}`-dimensional vector containing the index of the SCC every state belongs to and the number of SCCs.
+        :rtype: Tuple[np.ndarray[int],int]
+        """
+        return self.__cached("sccs", None, None, self.system.strongly_connected_components)
+
+    def maximal_end_components(self, with_actions=False):
+        """Returns the maximal end components of the underlying system (see `AbstractMDP.maximal_end_components`).
+
+        :param with_actions: If True, additionally returns a :math:`C_{S_{\\text{all}}}`-dimensional boolean vector
+            that has a True-entry for every state-action pair that belongs to a MEC, defaults to False
+        :type with_actions: bool, optional
+        :return: A :math:`N_{S_{\\text{all}}}`-dimensional vector containing the index of the MEC every state belongs to and the number of MECs.
+        :rtype: Tuple[np.ndarry[int],int] or Tuple[np.ndarray[int],int,np.ndarray[bool]]
+        """
+        mecs = self.__cached("mecs", None, None, lambda: self.system.maximal_end_components(with_actions=True))
+        return mecs if with_actions else mecs[:2]
+
+    def qualitative_states(self, mode):
+        """Returns the states whose minimal ("min") or maximal ("max") probability to reach goal is 0 or 1
+        (see `AbstractMDP.prob0_mask` and `AbstractMDP.prob1_mask`). They are computed by graph analyses and
+        are fixed before the LPs of `max_z_state` and `pr_max` are built, which then only contain the remaining states.
+
+        :param mode: Either "min" or "max".
+        :type mode: str
+        :return: Two :math:`N` dimensional boolean vectors that are True for all states with probability 0 (1).
+        :rtype: Tuple[np.ndarray[bool],np.ndarray[bool]]
+        """
+        assert mode in ["min", "max"]
+        C,N = self.__P.shape
+        def compute():
+            target = {self.target_state_idx}
+            return self.system.prob0_mask(target, mode)[:N], self.system.prob1_mask(target, mode)[:N]
+        return self.__cached("qualitative_states_%s" % mode, None, None, compute)
+
+    def __maybe_system(self, mode):
+        # restricts the RF to the states whose probability is neither 0 nor 1 (see `qualitative_states`). Returns
+        # these states and their rows, the transition matrix between them and the probabilities to reach goal or a 
+        # state with probability 1 in one step.
+        zero, one = self.qualitative_states(mode)
+        maybe = ~(zero | one)
+        rows = np.nonzero(maybe[self.__index_by_state_action.row_state])[0]
+        P = self.__P[rows]
+        return maybe, one, rows, P[:, maybe], self.to_target.A1[rows] + P.dot(one.astype(float))
+
+    def __maybe_lp(self, mode, solver):
+        # solves the LP of `max_z_state` ("min") or `pr_max` ("max") only for the states whose probability is 
+        # neither 0 nor 1. Transitions into states with probability 1 are moved to the right hand side.
+        maybe, one, rows, P, b = self.__maybe_system(mode)
+        result_vector = one.astype(float)
+        if not maybe.any():
+            return result_vector
+
+        row_state = np.cumsum(maybe)[self.__index_by_state_action.row_state[rows]] - 1
+        matr = csr_matrix((np.ones(len(rows)), (np.arange(len(rows)), row_state)), shape=P.shape) - P
+        opt = np.ones(P.shape[1])
+        sense, objective = ("<=", "max") if mode == "min" else (">=", "min")
+        lp = LP.from_coefficients(matr,b,opt,sense=sense,objective=objective)
+        lp.set_bounds(np.arange(len(opt)),lb=0,ub=1)
+
+        result = lp.solve(solver=solver)
+        if result.result_vector is None:
+            return None
+        result_vector[maybe] = result.result_vector
+        return result_vector
 
     def _reach_form_id_matrix(self):
         """Computes the matrix :math:`I` for a given reachability form that for every row (st,act) has an entry 1 at the column corresponding to st."""
         C,N = self.__P.shape
-        I = dok_matrix((C,N))
-
-        for i in range(0,C):
-            (state, _) = self.__index_by_state_action.inv[i]
-            I[i,state] = 1
-
-        return I
+        states = self.__index_by_state_action.row_state
+        return csr_matrix((np.ones(C), (np.arange(C), states)), shape=(C,N))
 
-    def max_z_state(self,solver="cbc"):
+    def max_z_state(self,solver="cbc",method=None):
         """
         Returns a solution to the LP        
 
@@ -489,26 +666,33 @@ class ReachabilityForm:
             
         The solution vector corresponds to the minimal reachabiliy probability, i.e. 
         :math:`\mathbf{x}^*(s) = \mathbf{Pr}^{\\text{min}}_s(\diamond \\text{goal})` for all :math:`s \in S`.
+        States with probability 0 or 1 are determined beforehand (see `qualitative_states`), so the LP only 
+        contains the remaining states.
 
         :param solver: Solver that should be used, defaults to "cbc"
         :type solver: str, optional
+        :param method: Either "lp" (solve the LP), "vi" (compute the probabilities by interval iteration, see 
+            `model.value_iteration.interval_iteration`), "linear" (only for DTMCs, solve the linear equation system
+            :math:`\mathbf{A} \mathbf{x} = \mathbf{b}`) or "topological" (solve one SCC after another, see
+            `model.value_iteration.topological_iteration`). If None, "linear" is used for DTMCs and "lp" otherwise, defaults to None
+        :type method: str, optional
         :return: Result vector
         :rtype: np.ndarray[float]
         """        
-        C,N = self.__P.shape
-        matr, rhs = self.fark_z_constraints(0)
-        opt = np.ones(N)
-        max_z_lp = LP.from_coefficients(
-            matr,rhs,opt,sense="<=",objective="max")
+        method = self.__default_method(method)
+        return self.__cached("max_z_state", solver, method, lambda: self.__max_z_state(solver, method))
 
-        for st_idx in range(N):
-            max_z_lp.add_constraint([(st_idx,1)],">=",0)
-            max_z_lp.add_constraint([(st_idx,1)],"<=",1)
+    def __max_z_state(self, solver, method):
+        if method == "vi":
+            return interval_iteration(self.__P, self.to_target, self.__index_by_state_action, "min")
+        if method == "topological":
+            return self.__topological_iteration("min")
+        if method == "linear":
+            return np.clip(solve_linear_system(self.A, self.to_target), 0, 1)
 
-        result = max_z_lp.solve(solver=solver)
-        return result.result_vector
+        return self.__maybe_lp("min", solver)
 
-    def max_z_state_action(self,solver="cbc"):
+    def max_z_state_action(self,solver="cbc",method=None):
         """
         Let :math:`\mathbf{x}` be a solution vector to `max_z_state`. This function then returns a 
         :math:`C` vector :math:`\mathbf{v}` such that
@@ -521,14 +705,17 @@ class ReachabilityForm:
 
         :param solver: [description], defaults to "cbc"
         :type solver: str, optional
+        :param method: Either "lp", "vi", "linear" or "topological" (see `max_z_state`), defaults to None
+        :type method: str, optional
         :return: Result vector
         :rtype: np.ndarray[float]
         """        
 
-        max_z_vec = self.max_z_state(solver=solver)
-        return self.__P.dot(max_z_vec) + self.to_target.A1
+        method = self.__default_method(method)
+        return self.__cached("max_z_state_action", solver, method, 
+            lambda: self.__P.dot(self.max_z_state(solver=solver,method=method)) + self.to_target.A1)
 
-    def max_y_state_action(self,solver="cbc"):
+    def max_y_state_action(self,solver="cbc",method=None):
         """
         Returns a solution to the LP        
 
@@ -536,24 +723,38 @@ class ReachabilityForm:
 
             \max \, \mathbf{b} \, \mathbf{x} \quad \\text{ subject to } \quad \mathbf{x} \in \mathcal{P}^{\\text{max}}(0)
             
+        For DTMCs, the (componentwise greatest) solution is the vector of expected visiting frequencies, i.e. the solution of
+        :math:`\mathbf{A}^T \mathbf{x} = \mathbf{e}_{\\text{init}}`.
+
         :param solver: Solver that should be used, defaults to "cbc"
         :type solver: str, optional
+        :param method: Either "lp" (solve the LP) or "linear" (only for DTMCs, solve the linear equation system). If None,
+            "linear" is used for DTMCs and "lp" otherwise, defaults to None
+        :type method: str, optional
         :return: Result vector
         :rtype: np.ndarray[float]
         """
+        method = self.__default_method(method)
+        assert method in ["lp", "linear"], "method must be either 'lp' or 'linear', but is %s" % method
+        return self.__cached("max_y_state_action", solver, method, lambda: self.__max_y_state_action(solver, method))
+
+    def __max_y_state_action(self, solver, method):
         C,N = self.__P.shape
+        if method == "linear":
+            e_init = np.zeros(N)
+            e_init[self.initial] = 1
+            return np.maximum(solve_linear_system(self.A.T, e_init), 0)
 
         matr, rhs = self.fark_y_constraints(0)
         max_y_lp = LP.from_coefficients(
             matr,rhs,self.to_target,sense="<=",objective="max")
 
-        for sap_idx in range(C):
-            max_y_lp.add_constraint([(sap_idx,1)],">=",0)
+        max_y_lp.set_bounds(np.arange(C),lb=0)
 
         result = max_y_lp.solve(solver=solver)
         return result.result_vector
 
-    def max_y_state(self,solver="cbc"):
+    def max_y_state(self,solver="cbc",method=None):
         """
         Let :math:`\mathbf{x}` be a solution vector to `max_y_state_action`. This function then returns a 
         :math:`N` vector :math:`\mathbf{v}` such that
@@ -566,108 +767,167 @@ class ReachabilityForm:
 
         :param solver: Solver that should be used, defaults to "cbc"
         :type solver: str, optional
+        :param method: Either "lp" or "linear" (see `max_y_state_action`), defaults to None
+        :type method: str, optional
         :return: Result vector
         :rtype: np.ndarray[float]
         """        
+        method = self.__default_method(method)
+        return self.__cached("max_y_state", solver, method, lambda: self.__max_y_state(solver, method))
+
+    def __max_y_state(self, solver, method):
         C,N = self.__P.shape
-        max_y_vec = self.max_y_state_action(solver=solver)
-        max_y_states = np.zeros(N)
-        max_y_states[self.initial] = 1
-        for sap_idx in range(C):
-            (st,act) = self.__index_by_state_action.inv[sap_idx]
-            max_y_states[st] = max_y_states[st] + max_y_vec[sap_idx]
+        max_y_vec = self.max_y_state_action(solver=solver,method=method)
+        max_y_states = np.bincount(self.__index_by_state_action.row_state, weights=max_y_vec, minlength=N)
+        max_y_states[self.initial] += 1
         return max_y_states
 
-    def pr_min(self,solver="cbc"):
+    def pr_min(self,solver="cbc",method=None):
         """Computes an :math:`N` vector :math:`\mathbf{x}` such that 
         :math:`\mathbf{x}(s) = \mathbf{Pr}^{\\text{min}}_s(\diamond \\text{goal})` for :math:`s \in S`.
 
         :param solver: Solver that should be used, defaults to "cbc"
         :type solver: str, optional
+        :param method: Either "lp", "vi", "linear" or "topological" (see `max_z_state`), defaults to None
+        :type method: str, optional
         :return: Result vector
         :rtype: np.ndarray[float]
         """        
-        return self.max_z_state(solver=solver)
+        return self.max_z_state(solver=solver,method=method)
 
-    def pr_max(self,solver="cbc"):
+    def pr_max(self,solver="cbc",method=None):
         """Computes an :math:`N` vector :math:`\mathbf{x}` such that :math:`\mathbf{x}(s) = 
         \mathbf{Pr}^{\\text{max}}_s(\diamond \\text{goal})` for :math:`s \in S`.
 
         :param solver: Solver that should be used, defaults to "cbc"
         :type solver: str, optional
+        :param method: Either "lp", "vi", "linear" or "topological" (see `max_z_state`), defaults to None
+        :type method: str, optional
         :return: Result vector
         :rtype: np.ndarray[float]
         """
-        C,N = self.__P.shape
-
-        matr, rhs = self.fark_z_constraints(1)
-        opt = np.ones(N)
-        pr_max_z_lp = LP.from_coefficients(
-            matr,rhs,opt,sense=">=",objective="min")
-
-        for st_idx in range(N):
-            pr_max_z_lp.add_constraint([(st_idx,1)],">=",0)
-            pr_max_z_lp.add_constraint([(st_idx,1)],"<=",1)
+        method = self.__default_method(method)
+        return self.__cached("pr_max", solver, method, lambda: self.__pr_max(solver, method))
+
+    def __pr_max(self, solver, method):
+        if method == "linear":
+            # in DTMCs, minimal and maximal probabilities are the same
+            return self.max_z_state(method="linear")
+        if method == "vi":
+            mecs, _, mec_actions = self.maximal_end_components(with_actions=True)
+            return interval_iteration(self.__P, self.to_target, self.__index_by_state_action, "max", 
+                mecs=(mecs, mec_actions))
+        if method == "topological":
+            return self.__topological_iteration("max")
+
+        return self.__maybe_lp("max", solver)
+
+    def __topological_iteration(self, mode):
+        # like `__maybe_lp`, only the states whose probability is neither 0 nor 1 are considered
+        maybe, one, rows, P, b = self.__maybe_system(mode)
+        result_vector = one.astype(float)
+        if not maybe.any():
+            return result_vector
+
+        index = StateActionIndex(np.cumsum(maybe)[self.__index_by_state_action.row_state[rows]] - 1, 
+                                 self.__index_by_state_action.row_action[rows])
+        sccs, _ = Graph.from_csr(P.shape[1], P.indptr, P.indices, P.data, index.row_state, index.row_action).strongly_connected_components()
+        mecs = None
+        if mode == "max":
+            # MECs are either contained in the considered states or disjoint from them
+            mec_of_state, _, mec_actions = self.maximal_end_components(with_actions=True)
+            mecs = (mec_of_state[:len(maybe)][maybe], mec_actions[rows])
+        # SCCs of DTMCs are solved as linear equation systems
+        local_method = "linear" if isinstance(self.system, DTMC) else "vi"
+        result_vector[maybe] = topological_iteration(P, b, index, mode, sccs, mecs=mecs, local_method=local_method)
+        return result_vector
+
+    def is_mec_free(self):
+        """Checks whether the RF is MEC-free, i.e. whether target and fail are the only states that belong to an end component.
+        This is the case iff every state reaches target or fail with probability 1 under all schedulers, which only depends
+        on the graph of the system and is computed in time linear in the number of transitions (see `AbstractMDP.prob0_mask`).
+        If the RF is not MEC-free, `collapse_mecs` computes a MEC-free RF with the same maximal reachability probabilities.
+
+        :return: True if the RF is MEC-free.
+        :rtype: bool
+        """
+        return self.__cached("mec_freeness", None, None, self.__is_mec_free)
 
-        result = pr_max_z_lp.solve(solver=solver)
-        return result.result_vector
+    def __is_mec_free(self):
+        C,N = self.__P.shape
+        never_stopped = self.system.prob0_mask({self.target_state_idx, self.fail_state_idx}, "min")
+        return not never_stopped[:N].any()
 
     def _check_mec_freeness(self):
-
-        # indices of old fail and target state
-        target_state, target_action = self.system.N-2, self.system.C-2
-        fail_state, fail_action = self.system.N-1, self.system.C-1
-
-        if len(set(self.system.predecessors(fail_state))) == 1:
-            # if that happens, then fail state has no predecessors but itself.
-            # in that case, the fail state has no impact on the other states.
-            assert (self.pr_min() == 1).all()
-            return
-
-        import copy
-        new_label_to_states = copy.deepcopy(self.system.states_by_label)
-        new_index_by_state_action = copy.deepcopy(self.system.index_by_state_action)
-
-        # create a new transition matrix with 2 new entries for a new target and fail state
-        P = dok_matrix((self.system.C+2,self.system.N+2))
-        P[:self.system.C,:self.system.N] = self.system.P
-
-        # indices of new target and new fail state according to RF
-        new_target_state, new_target_action = self.system.N, self.system.C
-        new_fail_state, new_fail_action = self.system.N+1, self.system.C+1
-        # index state-action pairs
-        new_index_by_state_action[(new_target_state,0)] = new_target_action
-        new_index_by_state_action[(new_fail_state,0)] = new_fail_action
+        assert self.is_mec_free(), "RF contains maximal end components, see `ReachabilityForm.collapse_mecs`."
+        return True
+
+    def collapse_mecs(self):
+        """Computes the MEC quotient of the RF, i.e. a RF where every maximal end component (see `maximal_end_components`)
+        is collapsed into a single state. The new state gets all actions of the states of the MEC that may leave the MEC,
+        while actions that stay inside of the MEC are removed. The quotient is MEC-free (see `is_mec_free`) and has the
+        same maximal reachability probabilities, i.e. `pr_max` of a state equals `pr_max` of the state it is mapped to.
+        Minimal reachability probabilities are not preserved, since all states of a MEC have minimal probability 0.
         
-        # map new target and new fail state only to themselves
-        P[new_target_action,new_target_state] = 1
-        P[new_fail_action,new_fail_state] = 1
-
-        # remap old fail & target state to new target state
-        P[target_action,target_state] = 0
-        P[target_action,new_target_state] = 1
-        P[fail_action,fail_state] = 0
-        P[fail_action,new_target_state] = 1
-        
-        # remove fail and target label from old target and fail state
-        new_label_to_states.remove(self.target_label, target_state)
-        new_label_to_states.remove(self.fail_label, fail_state)
-        # add fail and target label to new target and new fail state
-        new_label_to_states.add(self.target_label, new_target_state)
-        new_label_to_states.add(self.fail_label, new_fail_state)
-
-        # new system should already be in RF, so calling .reduce is not necessary
-        target_or_fail_system = type(self.system)(
-            P=P, 
-            index_by_state_action=new_index_by_state_action,
-            label_to_actions={},
-            label_to_states=new_label_to_states)
-        
-        target_or_fail_rf = ReachabilityForm(
-            target_or_fail_system,
-            self.initial_label,
+        Apart from the MEC decomposition, this runs in time linear in the number of nonzero entries of the transition matrix.
+        States that don't belong to a MEC keep their actions, the actions of a collapsed state are numbered consecutively.
+        Labels of states (actions) are copied to the states (actions) they are mapped to.
+
+        :return: A triple (RF, state_map, state_action_map) where state_map (state_action_map) is a :math:`N_{S_{\\text{all}}}`
+            (:math:`C_{S_{\\text{all}}}`) vector that contains the index of the new state (row) of every state (row) of this RF,
+            or -1 if the row was removed.
+        :rtype: Tuple[model.ReachabilityForm, np.ndarray[int], np.ndarray[int]]
+        """
+        C,N = self.__P.shape
+        mecs, mec_count, mec_actions = self.maximal_end_components(with_actions=True)
+        mecs, mec_actions = mecs[:N], mec_actions[:C]
+
+        # every state is represented by the smallest state of its MEC (or by itself)
+        first_states = np.full(mec_count+1, N)
+        np.minimum.at(first_states, mecs, np.arange(N))
+        representatives = np.where(mecs > 0, first_states[mecs], np.arange(N))
+        _, new_states = np.unique(representatives, return_inverse=True)
+        new_states = new_states.ravel()
+        new_N = int(new_states.max(initial=-1)) + 1
+
+        # actions that stay inside of a MEC are removed
+        rows = np.nonzero(~mec_actions)[0]
+        new_C = len(rows)
+        row_state, row_action = self.__index_by_state_action.row_state[rows], self.__index_by_state_action.row_action[rows]
+        in_mec = mecs[row_state] > 0
+        new_row_state = new_states[row_state]
+        # actions of collapsed states are numbered by their position among the rows of the new state
+        order = np.argsort(new_row_state, kind="stable")
+        offsets = np.zeros(new_N+1, dtype=np.int64)
+        np.cumsum(np.bincount(new_row_state, minlength=new_N), out=offsets[1:])
+        positions = np.empty(new_C, dtype=np.int64)
+        positions[order] = np.arange(new_C) - offsets[new_row_state[order]]
+        new_row_action = np.where(in_mec, positions, row_action)
+
+        collapse = csr_matrix((np.ones(N), (np.arange(N), new_states)), shape=(N, new_N))
+        new_P = csr_matrix(self.__P)[rows].dot(collapse).tocsr()
+
+        state_map = np.concatenate((new_states, [new_N, new_N+1]))
+        state_action_map = np.full(C+2, -1)
+        state_action_map[rows] = np.arange(new_C)
+        state_action_map[[C, C+1]] = [new_C, new_C+1]
+
+        quotient_system = ReachabilityForm._initialize_system(
+            new_P,
+            StateActionIndex(new_row_state, new_row_action),
+            self.to_target.A1[rows],
+            np.where(state_map < new_N, state_map, -1),
+            np.where(state_action_map < new_C, state_action_map, -1),
+            self.system,
             self.target_label,
-            self.fail_label)
-
-        assert (target_or_fail_rf.pr_min() == 1).all(), target_or_fail_rf.pr_min()
+            self.fail_label,
+            # the probabilities to fail are recomputed from sums of merged entries
+            fail_tolerance="rounding")
 
+        quotient = ReachabilityForm(
+            quotient_system,
+            self.initial_label,
+            target_label=self.target_label,
+            fail_label=self.fail_label,
+            ignore_consistency_checks=True)
+        return quotient, state_map, state_action_map
@@ -0,0 +1,240 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from ..utils import StateActionIndex
+from .linear_equations import solve_linear_system
+
+def prob0_min(P, to_target, index):
+    """Computes all states :math:`s` with :math:`\\mathbf{Pr}^{\\text{min}}_s(\\diamond \\text{goal}) = 0`, i.e. states
+    where some scheduler avoids the goal forever. These are all states that are not in the smallest set :math:`T` 
+    containing every state whose actions all reach goal or :math:`T` with positive probability.
+
+    :param P: :math:`C \\times N` transition matrix (without goal and fail).
+    :type P: scipy.sparse.csr_matrix
+    :param to_target: :math:`C` vector of probabilities to reach goal in one step.
+    :type to_target: np.ndarray[float]
+    :param index: State-action index of the rows of P.
+    :type index: utils.StateActionIndex
+    :return: :math:`N` dimensional boolean vector that is True for every state with minimal probability 0.
+    :rtype: np.ndarray[bool]
+    """
+    C,N = P.shape
+    reaches = np.zeros(N, dtype=bool)
+    row_hits = to_target > 0
+    while True:
+        # a state positively reaches goal under every scheduler iff all of its actions hit goal or
+        # a state that positively reaches goal
+        row_hits = row_hits | (P.dot(reaches.astype(float)) > 0)
+        missing = np.bincount(index.row_state, weights=~row_hits, minlength=N)
+        new_reaches = missing == 0
+        if (new_reaches == reaches).all():
+            return ~reaches
+        reaches = new_reaches
+
+def interval_iteration(P, to_target, index, mode, mecs=None, epsilon=1e-10, max_iterations=10**6):
+    """Computes the minimal or maximal probability to reach goal for every state by interval iteration,
+    i.e. a lower bound (starting from 0) and an upper bound (starting from 1) are iterated until they are
+    at most :math:`2\\epsilon` apart. The result is the average of both bounds, which is guaranteed to be at most
+    :math:`\\epsilon` away from the exact probabilities.
+
+    One step computes :math:`\\mathbf{P} \\mathbf{x} + \\mathbf{b}` for all state-action pairs and then takes the
+    minimum/maximum over all actions of every state. For the upper bound to converge,
+
+    - in "min"-mode, all states with minimal probability 0 are fixed to 0 (see `prob0_min`),
+    - in "max"-mode, the values of states in maximal end components (MECs) are bounded by their best exit in every step.
+
+    :param P: :math:`C \\times N` transition matrix (without goal and fail).
+    :type P: scipy.sparse.csr_matrix
+    :param to_target: :math:`C` vector of probabilities to reach goal in one step.
+    :type to_target: np.ndarray[float]
+    :param index: State-action index of the rows of P. Every state needs to have at least one action.
+    :type index: utils.StateActionIndex
+    :param mode: Either "min" or "max".
+    :type mode: str
+    :param mecs: Only used in "max"-mode. A pair of a :math:`N` vector containing the MEC of every state
+        (0 if the state is in no MEC) and a :math:`C` boolean vector that is True for all actions that stay
+        in their MEC (see `AbstractMDP.maximal_end_components`). If None, the model is assumed to be MEC-free.
+    :type mecs: Tuple[np.ndarray[int], np.ndarray[bool]], optional
+    :param epsilon: Required precision, defaults to 1e-10
+    :type epsilon: float, optional
+    :param max_iterations: Maximal number of iterations, defaults to 10**6
+    :type max_iterations: int, optional
+    :return: :math:`N` vector of probabilities.
+    :rtype: np.ndarray[float]
+    """
+    assert mode in ["min", "max"], "mode must be either 'min' or 'max', but is %s" % mode
+    C,N = P.shape
+    to_target = np.asarray(to_target, dtype=float).ravel()
+    state_rows, offsets = index.state_rows, index.state_row_offsets
+    assert len(offsets) == N+1 and (np.diff(offsets) > 0).all(), "Every state needs at least one action."
+    reduce = np.minimum.reduceat if mode == "min" else np.maximum.reduceat
+
+    def step(x):
+        return reduce((P.dot(x) + to_target)[state_rows], offsets[:-1])
+
+    lower, upper = np.zeros(N), np.ones(N)
+    fixed = prob0_min(P, to_target, index) if mode == "min" else np.zeros(N, dtype=bool)
+    upper[fixed] = 0
+
+    if mode == "max" and mecs is not None:
+        mec_of_state, mec_actions = mecs
+        mec_of_state = np.asarray(mec_of_state[:N], dtype=np.int64)
+        # actions of MEC states that leave their MEC, and the MEC they are leaving
+        exits = np.nonzero((mec_of_state[index.row_state] > 0) & ~np.asarray(mec_actions[:C], dtype=bool))[0]
+        exit_mecs = mec_of_state[index.row_state[exits]]
+        exit_P, exit_to_target = P[exits], to_target[exits]
+        in_mec = np.nonzero(mec_of_state > 0)[0]
+    else:
+        exits = None
+
+    for _ in range(max_iterations):
+        if (upper - lower).max(initial=0) <= 2*epsilon:
+            return (upper + lower)/2
+        lower = step(lower)
+        upper = step(upper)
+        if exits is not None:
+            # deflate: a MEC can't do better than its best exit
+            best_exit = np.zeros(mec_of_state.max(initial=0)+1)
+            np.maximum.at(best_exit, exit_mecs, exit_P.dot(upper) + exit_to_target)
+            upper[in_mec] = np.minimum(upper[in_mec], best_exit[mec_of_state[in_mec]])
+        lower[fixed], upper[fixed] = 0, 0
+    assert False, "Interval iteration did not converge after %d iterations." % max_iterations
+
+def condensation_levels(P, index, sccs):
+    """Computes the level of every strongly connected component (SCC) in the condensation of the graph of P, i.e. 
+    the length of the longest path to a bottom SCC. SCCs of the same level have no transitions between each other, 
+    and all transitions that leave a SCC lead to SCCs of a lower level. The levels are computed by repeatedly 
+    removing all SCCs without (remaining) successors, in time linear in the number of transitions.
+
+    :param P: :math:`C \\times N` transition matrix.
+    :type P: scipy.sparse.csr_matrix
+    :param index: State-action index of the rows of P.
+    :type index: utils.StateActionIndex
+    :param sccs: :math:`N` vector containing the SCC of every state (see `AbstractMDP.strongly_connected_components`).
+    :type sccs: np.ndarray[int]
+    :return: Vector containing the level of every SCC and the number of levels.
+    :rtype: Tuple[np.ndarray[int], int]
+    """
+    P = csr_matrix(P)
+    sccs = np.asarray(sccs, dtype=np.int64)
+    K = int(sccs.max(initial=-1)) + 1
+    rows = np.repeat(np.arange(P.shape[0]), np.diff(P.indptr))
+    src, dst = sccs[index.row_state[rows]], sccs[P.indices]
+    leaving = src != dst
+    src, dst = src[leaving], dst[leaving]
+
+    remaining = np.bincount(src, minlength=K)
+    # predecessors of SCC k are preds[pred_offsets[k]:pred_offsets[k+1]]
+    preds = src[np.argsort(dst, kind="stable")]
+    pred_offsets = np.zeros(K+1, dtype=np.int64)
+    np.cumsum(np.bincount(dst, minlength=K), out=pred_offsets[1:])
+
+    levels = np.zeros(K, dtype=np.int64)
+    frontier = np.nonzero(remaining == 0)[0]
+    level_count = 0
+    while len(frontier) > 0:
+        levels[frontier] = level_count
+        level_count += 1
+        starts, counts = pred_offsets[frontier], np.diff(pred_offsets)[frontier]
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        frontier_preds = preds[positions]
+        np.subtract.at(remaining, frontier_preds, 1)
+        frontier = np.unique(frontier_preds[remaining[frontier_preds] == 0])
+    return levels, level_count
+
+def topological_iteration(P, to_target, index, mode, sccs, mecs=None, local_method="vi", epsilon=1e-10, max_iterations=10**6):
+    """Computes the minimal or maximal probability to reach goal for every state by processing the strongly
+    connected components (SCCs) in reverse topological order, such that the probabilities of all successors of a SCC 
+    are known when it is processed. SCCs are grouped by their level in the condensation (see `condensation_levels`),
+    and all SCCs of a level are processed at once:
+
+    - the probability of a trivial SCC (a single state) is computed directly, since the probability of an action
+      with self-loop probability :math:`p<1` and probability :math:`b` to move to a known state (or goal) is 
+      :math:`b/(1-p)`,
+    - all other SCCs are solved by interval iteration (see `interval_iteration`) or, if `local_method` is "linear", 
+      by solving their linear equation system (see `model.linear_equations.solve_linear_system`), where transitions 
+      to known states are moved to the right hand side.
+
+    :param P: :math:`C \\times N` transition matrix (without goal and fail).
+    :type P: scipy.sparse.csr_matrix
+    :param to_target: :math:`C` vector of probabilities to reach goal in one step.
+    :type to_target: np.ndarray[float]
+    :param index: State-action index of the rows of P. Every state needs to have at least one action.
+    :type index: utils.StateActionIndex
+    :param mode: Either "min" or "max".
+    :type mode: str
+    :param sccs: :math:`N` vector containing the SCC of every state (see `AbstractMDP.strongly_connected_components`).
+    :type sccs: np.ndarray[int]
+    :param mecs: MECs of the model (see `interval_iteration`), defaults to None
+    :type mecs: Tuple[np.ndarray[int], np.ndarray[bool]], optional
+    :param local_method: Either "vi" or "linear" (only if every state has exactly one action), defaults to "vi"
+    :type local_method: str, optional
+    :param epsilon: Required precision, which is split among all levels that contain nontrivial SCCs, defaults to 1e-10
+    :type epsilon: float, optional
+    :param max_iterations: Maximal number of iterations of every interval iteration, defaults to 10**6
+    :type max_iterations: int, optional
+    :return: :math:`N` vector of probabilities.
+    :rtype: np.ndarray[float]
+    """
+    assert mode in ["min", "max"], "mode must be either 'min' or 'max', but is %s" % mode
+    assert local_method in ["vi", "linear"], "local_method must be either 'vi' or 'linear', but is %s" % local_method
+    C,N = P.shape
+    P = csr_matrix(P)
+    to_target = np.asarray(to_target, dtype=float).ravel()
+    sccs = np.asarray(sccs[:N], dtype=np.int64)
+    row_state, row_action = index.row_state, index.row_action
+    assert local_method != "linear" or C == N, "local_method 'linear' requires exactly one action per state."
+
+    levels, level_count = condensation_levels(P, index, sccs)
+    state_level = levels[sccs]
+    trivial = (np.bincount(sccs)[sccs] == 1)
+    self_loops = np.asarray(P[np.arange(C), row_state]).ravel()
+
+    # states and rows sorted by level
+    state_order = np.argsort(state_level, kind="stable")
+    state_bounds = np.searchsorted(state_level[state_order], np.arange(level_count+1))
+    row_order = np.argsort(state_level[row_state], kind="stable")
+    row_bounds = np.searchsorted(state_level[row_state][row_order], np.arange(level_count+1))
+    P_sorted, to_target_sorted = P[row_order], to_target[row_order]
+    row_state_sorted, self_loops_sorted = row_state[row_order], self_loops[row_order]
+
+    nontrivial_levels = len(np.unique(state_level[~trivial]))
+    local_epsilon = epsilon / max(nontrivial_levels, 1)
+    reduce_at = np.minimum.at if mode == "min" else np.maximum.at
+    x = np.zeros(N)
+    local_state = np.zeros(N, dtype=np.int64)
+
+    for level in range(level_count):
+        states = state_order[state_bounds[level]:state_bounds[level+1]]
+        start, end = row_bounds[level], row_bounds[level+1]
+        level_P, level_states = P_sorted[start:end], row_state_sorted[start:end]
+        # probability to reach goal via a state of a lower level (x is 0 for all states of this level)
+        b = to_target_sorted[start:end] + level_P.dot(x)
+
+        trivial_rows = trivial[level_states]
+        loops = self_loops_sorted[start:end][trivial_rows]
+        # an action that loops with probability 1 never reaches goal
+        values = np.where(loops < 1, b[trivial_rows] / np.where(loops < 1, 1 - loops, 1), 0)
+        trivial_states = states[trivial[states]]
+        x[trivial_states] = np.inf if mode == "min" else -np.inf
+        reduce_at(x, level_states[trivial_rows], values)
+
+        local_states = states[~trivial[states]]
+        if len(local_states) == 0:
+            continue
+        local_state[local_states] = np.arange(len(local_states))
+        local_rows = np.nonzero(~trivial_rows)[0]
+        local_P = level_P[local_rows][:, local_states]
+        local_row_state = local_state[level_states[local_rows]]
+        if local_method == "linear":
+            A = csr_matrix((np.ones(len(local_rows)), (np.arange(len(local_rows)), local_row_state)), shape=local_P.shape) - local_P
+            x[local_states] = np.clip(solve_linear_system(A, b[local_rows]), 0, 1)
+        else:
+            local_index = StateActionIndex(local_row_state, row_action[row_order[start:end][local_rows]])
+            local_mecs = None
+            if mecs is not None:
+                mec_of_state, mec_actions = mecs
+                local_mecs = (np.asarray(mec_of_state)[local_states], np.asarray(mec_actions)[row_order[start:end][local_rows]])
+            x[local_states] = interval_iteration(local_P, b[local_rows], local_index, mode, mecs=local_mecs, 
+                                                 epsilon=local_epsilon, max_iterations=max_iterations)
+    return x
@@ -1 +1 @@
-from .prism import parse_label_file, prism_to_tra
\ No newline at end of file
+from .prism import parse_label_file, parse_transition_file, transition_matrix_from_entries, prism_to_tra
\ No newline at end of file
@@ -1,4 +1,7 @@
 import re
+import io
+import numpy as np
+from scipy.sparse import csr_matrix
 from subprocess import check_output, CalledProcessError
 import tempfile
 from shutil import copyfileobj
@@ -38,6 +41,82 @@ def parse_label_file(filepath):
 
     return states_by_label, labels_by_state, labelid_to_label
 
+def parse_transition_file(filepath, column_count):
+    """Reads a .tra-file into NumPy columns. The file is read once. The first line (the header) is returned as a
+    list of tokens, the numerical columns of all other lines are parsed in bulk by a single call of `numpy.loadtxt`.
+    Lines that have an additional column (i.e. an action label in MDP files) are found by counting the tokens of
+    every line with vectorized operations, and the contents of that column are returned separately.
+
+    :param filepath: the filepath
+    :type filepath: str
+    :param column_count: number of numerical columns every non-header line has
+    :type column_count: int
+    :return: the tokens of the header line, a :math:`M \\times` `column_count` array containing the numerical columns
+        of all :math:`M` other (non-empty) lines, the indices of all lines that have an additional column and the
+        contents of that column.
+    :rtype: Tuple[List[str], np.ndarray[float], np.ndarray[int], np.ndarray[str]]
+    """
+    with open(filepath, "rb") as tra_file:
+        header = tra_file.readline().decode().split()
+        body = tra_file.read()
+
+    text = np.frombuffer(body, dtype=np.uint8)
+    whitespace = np.zeros(256, dtype=bool)
+    whitespace[np.frombuffer(b" \t\n\r\v\f", dtype=np.uint8)] = True
+    is_space = whitespace[text]
+    # tokens start (end) at non-whitespace characters that are preceded (followed) by whitespace
+    is_token = ~is_space
+    token_starts = np.flatnonzero(is_token & np.concatenate(([True], is_space[:-1])))
+    token_ends = np.flatnonzero(is_token & np.concatenate((is_space[1:], [True]))) + 1
+    if len(token_starts) == 0:
+        return header, np.zeros((0, column_count)), np.zeros(0, dtype=int), np.zeros(0, dtype=str)
+
+    # the first token of every non-empty line is the first token after a line break
+    first_tokens = np.searchsorted(token_starts, np.flatnonzero(text == ord("\n")))
+    first_tokens = np.concatenate(([0], first_tokens[first_tokens < len(token_starts)]))
+    first_tokens = first_tokens[np.concatenate(([True], first_tokens[1:] != first_tokens[:-1]))]
+    token_counts = np.diff(np.append(first_tokens, len(token_starts)))
+    assert (token_counts >= column_count).all() and (token_counts <= column_count + 1).all(), \
+        "Every line of %s must have %d or %d columns." % (filepath, column_count, column_count + 1)
+
+    columns = np.loadtxt(io.BytesIO(body), usecols=range(column_count), ndmin=2)
+
+    extra_lines = np.flatnonzero(token_counts > column_count)
+    if len(extra_lines) == 0:
+        return header, columns, extra_lines, np.zeros(0, dtype=str)
+    # cut the additional column out of the text as a matrix of fixed-width byte strings
+    starts = token_starts[first_tokens[extra_lines] + column_count]
+    lengths = token_ends[first_tokens[extra_lines] + column_count] - starts
+    width = int(lengths.max())
+    offsets = np.arange(width)
+    chars = text[np.minimum(starts[:,None] + offsets, len(text) - 1)]
+    chars[offsets >= lengths[:,None]] = 0
+    extra_column = chars.view("S%d" % width).ravel().astype(str)
+    return header, columns, extra_lines, extra_column
+
+def transition_matrix_from_entries(rows, cols, probs, shape):
+    """Builds a transition matrix in CSR format from the entries of a .tra-file. If an entry occurs more than once,
+    the last occurrence counts, i.e. later lines overwrite earlier ones (as in a line-by-line parser).
+
+    :param rows: row (state or state-action pair) of every entry
+    :type rows: np.ndarray[int]
+    :param cols: column (successor state) of every entry
+    :type cols: np.ndarray[int]
+    :param probs: probability of every entry
+    :type probs: np.ndarray[float]
+    :param shape: shape of the transition matrix
+    :type shape: Tuple[int,int]
+    :return: the transition matrix
+    :rtype: scipy.sparse.csr_matrix
+    """
+    P = csr_matrix((probs, (rows, cols)), shape=shape)
+    if P.nnz < len(probs):
+        # duplicate entries were summed up, so the matrix is built again from the last occurrence of every entry
+        _, last = np.unique((rows * shape[1] + cols)[::-1], return_index=True)
+        last = len(probs) - 1 - last
+        P = csr_matrix((probs[last], (rows[last], cols[last])), shape=shape)
+    return P
+
 def prism_to_tra(model_path, destination_path, prism_constants = {}, extra_labels = {}):
     """Translates a prism model into an explicit representation as .tra,.sta,.lab files.
     To this end prism is called, which needs to be present in the path.
@@ -12,8 +12,10 @@ from .problemresult import ProblemResult
 from .formulations import add_indicator_constraints, \
                           compute_upper_bound, \
                           construct_MILP, \
+                          set_threshold, \
                           certificate_size, \
                           construct_indicator_graph, \
-                          construct_RMP
+                          construct_RMP, \
+                          add_violated_constraints
 from .qsheur import QSHeur
 from .milpexact import MILPExact
\ No newline at end of file
@@ -1,12 +1,11 @@
 ## this file returns MILPs/LPs as follows:
 from switss.model import ReachabilityForm
 from switss.solver import MILP, LP, GurobiMILP
-from switss.utils import InvertibleDict, Graph
+from switss.utils import InvertibleDict, Graph, StateActionIndex, phase
 from . import AllOnesInitializer
 
 import numpy as np
-from scipy.sparse import dok_matrix
-from bidict import bidict
+from scipy.sparse import dok_matrix, csr_matrix, vstack
 
 def certificate_size(rf, mode):
     """returns the certificate dimension w.r.t. a given mode and RF
@@ -25,6 +24,7 @@ def certificate_size(rf, mode):
     else:
         return C-2
 
+@phase("compute_upper_bound")
 def compute_upper_bound(matr, rhs, solver="cbc"):
     """
     computes upper bound :math:`K` for LPs/MILPs. Solves the LP
@@ -43,16 +43,19 @@ def compute_upper_bound(matr, rhs, solver="cbc"):
     :return: the optimal value :math:`K` and status of LP
     :rtype: Tuple[str, float]
     """
+    upper_bound_LP = _upper_bound_LP(matr, rhs)
+    lp_result = upper_bound_LP.solve(solver=solver)
+    assert lp_result.status != "unbounded"
+    return lp_result.status, lp_result.value
+
+def _upper_bound_LP(matr, rhs):
+    # the LP of `compute_upper_bound`
     _, certsize = matr.shape
     upper_obj = np.ones(certsize)
     upper_bound_LP = LP.from_coefficients(matr, rhs, upper_obj, objective="max")
 
-    for idx in range(certsize):
-        upper_bound_LP.add_constraint([(idx, 1)], ">=", 0)
-
-    lp_result = upper_bound_LP.solve(solver=solver)
-    assert lp_result.status != "unbounded"
-    return lp_result.status, lp_result.value
+    upper_bound_LP.set_bounds(np.arange(certsize), lb=0)
+    return upper_bound_LP
 
 
 def groups_from_labels(rf, mode, labels=None):
@@ -82,9 +85,7 @@ def groups_from_labels(rf, mode, labels=None):
         for label in labels:
             states = rf.system.states_by_label[label]
             for state in states:
-                actions = rf.system.actions_by_state[state]
-                for action in actions:
-                    sap = rf.system.index_by_state_action[(state, action)]
+                for sap in rf.system.index_by_state_action.rows_of_state(state).tolist():
                     groups.add(label, sap)
         return groups
 
@@ -114,37 +115,168 @@ def add_indicator_constraints(model, variables, upper_bound, mode, groups, indic
     :rtype: utils.InvertibleDict[int, Set[int]]
     """
 
-    indicator_to_group = {}
-    for _, group in groups.items():
-        indicator_var = model.add_variables(indicator_domain)
-        indicator_to_group[indicator_var] = group
-        for var in group:
-            model.add_constraint([(var, 1), (indicator_var, -upper_bound)], "<=", 0)
-    indicator_to_group = InvertibleDict(indicator_to_group)
-
-    if indicator_domain != "binary":
-        for indicator_var in indicator_to_group.keys():
-            model.add_constraint([(indicator_var, 1)], ">=", 0)
-            model.add_constraint([(indicator_var, 1)], "<=", 1)
+    groups = [group for _, group in groups.items()]
+    if len(groups) == 0:
+        return InvertibleDict({})
+    # real indicators are bounded by 0 <= sigma(l) <= 1, binary ones implicitly
+    indicator_vars = model.add_variables(*[indicator_domain]*len(groups), lb=0, ub=1)
+    indicator_vars = [indicator_vars] if len(groups) == 1 else indicator_vars
+    indicator_to_group = InvertibleDict(dict(zip(indicator_vars, groups)))
+    # indicator variables are the last variables of the model
+    model.add_constraints_matrix(_indicator_matrix(indicator_to_group, upper_bound, indicator_vars[-1]+1), "<=", 0)
 
     return indicator_to_group
 
+def _indicator_matrix(indicators, upper_bound, varcount):
+    # one row x(v) - K*sigma(l) for every indicator variable sigma(l) and every variable v of its group
+    group_vars, group_indicators = [], []
+    for indicator_var, group in indicators.items():
+        group_vars.extend(group)
+        group_indicators.extend([indicator_var]*len(group))
+    rowcount = len(group_vars)
+    rows = np.concatenate((np.arange(rowcount), np.arange(rowcount)))
+    cols = np.concatenate((np.array(group_vars, dtype=np.int64), np.array(group_indicators, dtype=np.int64)))
+    vals = np.concatenate((np.ones(rowcount), np.full(rowcount, -float(upper_bound))))
+    return csr_matrix((vals, (rows, cols)), shape=(rowcount, varcount))
+
+def _full_constraints(rf, threshold, mode, indicators, upper_bound):
+    # all constraints of the MILP of `construct_MILP` as one system matr * (x, sigma) <= rhs
+    fark_matr, fark_rhs = rf.fark_constraints(threshold, mode)
+    varcount = certificate_size(rf, mode) + len(indicators.keys())
+    fark_matr = csr_matrix((fark_matr.data, fark_matr.indices, fark_matr.indptr), shape=(fark_matr.shape[0], varcount))
+    ind_matr = _indicator_matrix(indicators, upper_bound, varcount)
+    return vstack((fark_matr, ind_matr), format="csr"), np.concatenate((fark_rhs, np.zeros(ind_matr.shape[0])))
+
 
-def construct_RMP(rf, threshold, mode, Pinit, modeltype="pulp"):
+@phase("construct_RMP")
+def construct_RMP(rf, threshold, mode, Pinit=None, labels=None, relaxed=False, upper_bound_solver="cbc", modeltype="pulp", upper_bound=None):
+    """
+    constructs a restricted master problem (RMP) of the MILP of `construct_MILP`, i.e. a MILP with the same variables
+    and objective function, but only a subset of its constraints. Further constraints are added by `add_violated_constraints`
+    until the solution of the RMP satisfies all constraints of the MILP, which makes it an optimal solution of the MILP
+    as well (see `MILPExact`). The constraints of the MILP are the Farkas constraints (see `model.ReachabilityForm.fark_constraints`)
+    followed by the indicator constraints :math:`\mathbf{x}(v) \leq K \sigma(l)` (see `add_indicator_constraints`).
+
+    :param rf: the RF that induces the polytope :math:`\mathcal{F}`
+    :type rf: model.ReachabilityForm
+    :param threshold: the threshold :math:`\lambda`
+    :type threshold: float
+    :param mode: the chosen mode; either 'min' or 'max'
+    :type mode: str
+    :param Pinit: indices of the constraints of the MILP that are contained initially. If None, these are the threshold
+        constraint and all indicator constraints, which only have two nonzero coefficients each, defaults to None
+    :type Pinit: Iterable[int], optional
+    :param labels: set of labels grouping states or state-action-pairs together (see `construct_MILP`), defaults to None
+    :type labels: List[str], optional
+    :param relaxed: if set to True, then the indicator variables are relaxed to :math:`0 \leq \sigma \leq 1`,
+        defaults to False
+    :type relaxed: bool, optional
+    :param upper_bound_solver: if the max-form is considered, :math:`K` needs to be computed by a solver, 
+        defaults to "cbc"
+    :type upper_bound_solver: str, optional
+    :param modeltype: returns either a PuLP or Gurobi-MILP. Needs to be either 'gurobi' or 'pulp'
+    :type modeltype: str
+    :param upper_bound: if given, it is used as :math:`K` instead of computing it, defaults to None
+    :type upper_bound: float, optional
+    :return: the resulting RMP, the indicator variables (see `construct_MILP`), a vector that contains for every
+        constraint of the MILP (the Farkas constraints followed by the indicator constraints) its index in the RMP,
+        or -1 if it is not contained, and the constraints of the MILP as a tuple (matr, rhs, owners) that is passed
+        to `add_violated_constraints`. `owners` is the transposed sign pattern of the Farkas constraints, i.e. it maps
+        every variable to the Farkas constraints where it has a positive coefficient. If the upper bound calculation
+        fails, returns (None, None, None, None)
+    :rtype: Tuple[solver.MILP, utils.InvertibleDict[int, Set[int]], np.ndarray[int], Tuple[scipy.sparse.csr_matrix, np.ndarray[float], scipy.sparse.csr_matrix]]
+    """
     assert mode in ["min", "max"]
     assert modeltype in ["gurobi", "pulp"]
     modeltype = { "gurobi": GurobiMILP, "pulp": MILP }[modeltype]
+
     fark_matr, fark_rhs = rf.fark_constraints(threshold, mode)
+    if upper_bound is None and mode == "min":
+        upper_bound = 1.
+    elif upper_bound is None:
+        status, upper_bound = compute_upper_bound(fark_matr, fark_rhs, solver=upper_bound_solver)
+        if status != "optimal":
+            return None, None, None, None
+
+    groups = groups_from_labels(rf, mode, labels=labels)
     certsize = certificate_size(rf, mode)
-    model = modeltype.from_coefficients(fark_matr, fark_rhs, np.zeros(certsize), ["real"]*certsize) # initialize model
-    constraints = []
-    
-    
-    
-    return model, constraints
+    model = modeltype(objective="min")
+    model.add_variables(*["real"]*certsize, lb=0, ub=upper_bound)
+    indicator_domain = "real" if relaxed else "binary"
+    indicator_vars = model.add_variables(*[indicator_domain]*len(groups.keys()), lb=0, ub=1)
+    indicator_vars = [indicator_vars] if len(groups.keys()) == 1 else indicator_vars
+    indicators = InvertibleDict(dict(zip(indicator_vars, [group for _, group in groups.items()])))
+    objective = AllOnesInitializer(indicators).initialize()
+    model.set_objective_function(objective)
+
+    # the constraints of the MILP are only constructed once, since they are needed in every separation round
+    matr, rhs = _full_constraints(rf, threshold, mode, indicators, upper_bound)
+    owners = csr_matrix(fark_matr > 0).T.tocsr()
+    if Pinit is None:
+        Pinit = np.concatenate(([rf.fark_threshold_index(mode)], np.arange(fark_matr.shape[0], matr.shape[0])))
+    constraints = np.full(matr.shape[0], -1)
+    _add_constraints(model, matr, rhs, constraints, np.unique(np.fromiter(Pinit, dtype=np.int64)))
+    return model, indicators, constraints, (matr, rhs, owners)
 
+def _add_constraints(model, matr, rhs, constraints, rows):
+    if len(rows) > 0:
+        constraints[rows] = model.add_constraints_matrix(matr[rows], "<=", rhs[rows])
 
-def construct_MILP(rf, threshold, mode, labels=None, relaxed=False, upper_bound_solver="cbc", modeltype="pulp"):
+def add_violated_constraints(model, system, constraints, solution, batch_size=None, lookahead=0, tolerance=1e-8):
+    """
+    adds the constraints of the MILP of `construct_MILP` to a RMP (see `construct_RMP`) that are violated by a
+    solution of the RMP, i.e. Farkas constraints and indicator constraints :math:`\mathbf{x}(v) \leq K \sigma(l)`.
+    Every constraint is added at most once.
+
+    :param model: the RMP
+    :type model: solver.MILP
+    :param system: the constraints of the MILP returned by `construct_RMP`. If the threshold of the RMP is changed
+        (see `set_threshold`), the right hand side of the threshold constraint has to be changed here as well
+    :type system: Tuple[scipy.sparse.csr_matrix, np.ndarray[float], scipy.sparse.csr_matrix]
+    :param constraints: the constraint indices returned by `construct_RMP`, which are updated in place
+    :type constraints: np.ndarray[int]
+    :param solution: a solution of the RMP, i.e. the values of all variables
+    :type solution: np.ndarray[float]
+    :param batch_size: maximal number of violated constraints that are added. If more constraints are violated, the ones
+        with the biggest violation are added. If None, all are added, defaults to None
+    :type batch_size: int, optional
+    :param lookahead: additionally adds the Farkas constraints that are likely violated in the next iterations, i.e.
+        the constraints of the states (state-action pairs) whose values are needed to satisfy the added Farkas constraints,
+        up to this number of steps, defaults to 0
+    :type lookahead: int, optional
+    :param tolerance: constraints are violated if the left hand side exceeds the right hand side by more than this,
+        defaults to 1e-8
+    :type tolerance: float, optional
+    :return: the number of added constraints. If it is 0, the solution is a solution of the MILP.
+    :rtype: int
+    """
+    matr, rhs, owners = system
+    violation = matr.dot(np.asarray(solution, dtype=float)) - rhs
+    rows = np.nonzero((violation > tolerance) & (constraints < 0))[0]
+    if batch_size is not None and len(rows) > batch_size:
+        rows = np.sort(rows[np.argpartition(-violation[rows], batch_size-1)[:batch_size]])
+
+    if lookahead > 0 and len(rows) > 0:
+        # a Farkas constraint belongs to the variables with positive coefficients (a state or the actions of a state)
+        # and demands positive values of the variables with negative coefficients (its successors or predecessors).
+        # The constraints of the demanded variables are likely violated by the next solution.
+        fark_count = owners.shape[1]
+        selected = constraints >= 0
+        selected[rows] = True
+        frontier = rows[rows < fark_count]
+        for _ in range(lookahead):
+            demanding = matr[frontier]
+            demanded = np.unique(demanding.indices[demanding.data < 0])
+            frontier = np.unique(owners[demanded].indices)
+            frontier = frontier[~selected[frontier]]
+            selected[frontier] = True
+        rows = np.nonzero(selected & (constraints < 0))[0]
+
+    _add_constraints(model, matr, rhs, constraints, rows)
+    return len(rows)
+
+@phase("construct_MILP")
+def construct_MILP(rf, threshold, mode, labels=None, relaxed=False, upper_bound_solver="cbc", modeltype="pulp", upper_bound=None):
     """
     constructs a MILP in the following form:
 
@@ -171,6 +303,8 @@ def construct_MILP(rf, threshold, mode, labels=None, relaxed=False, upper_bound_
     :type upper_bound_solver: str, optional
     :param modeltype: returns either a PuLP or Gurobi-MILP. Needs to be either 'gurobi' or 'pulp'
     :type modeltype: str
+    :param upper_bound: if given, it is used as :math:`K` instead of computing it, defaults to None
+    :type upper_bound: float, optional
     :return: the resulting MILP. If the upper bound calculation fails, returns (None, None)
     :rtype: Tuple[solver.MILP, utils.InvertibleDict[int, Set[int]]]
     """
@@ -181,9 +315,9 @@ def construct_MILP(rf, threshold, mode, labels=None, relaxed=False, upper_bound_
     fark_matr, fark_rhs = rf.fark_constraints(threshold, mode)
     
     # compute the upper bound K
-    if mode == "min":
+    if upper_bound is None and mode == "min":
         upper_bound = 1. 
-    else:
+    elif upper_bound is None:
         status, upper_bound = compute_upper_bound(fark_matr, fark_rhs, solver=upper_bound_solver)
         if status != "optimal":
             return None, None
@@ -194,9 +328,7 @@ def construct_MILP(rf, threshold, mode, labels=None, relaxed=False, upper_bound_
     # construct MILP
     certsize = certificate_size(rf, mode)
     model = modeltype.from_coefficients(fark_matr, fark_rhs, np.zeros(certsize), ["real"]*certsize) # initialize model
-    for varidx in range(certsize):
-        model.add_constraint([(varidx, 1)], ">=", 0)
-        model.add_constraint([(varidx, 1)], "<=", upper_bound) # isn't this constraint unnecessary?
+    model.set_bounds(np.arange(certsize), lb=0, ub=upper_bound)
     # add indicator variables, which are either binary or real, dependent on what relaxed was set to
     indicator_domain = "real" if relaxed else "binary"
     indicators = add_indicator_constraints(model, np.arange(certsize), 
@@ -209,6 +341,31 @@ def construct_MILP(rf, threshold, mode, labels=None, relaxed=False, upper_bound_
     return model, indicators
 
 
+def set_threshold(model, rf, threshold, mode, constraints=None):
+    """changes the threshold :math:`\lambda` of a MILP/LP that was constructed by `construct_MILP` (or `construct_RMP`) in
+    place. Only the right hand side of the threshold constraint (see `model.ReachabilityForm.fark_threshold_index`) is
+    changed, so the model can be solved again without constructing it from scratch.
+
+    In 'max'-mode, the upper bound :math:`K` of the model depends on the threshold it was computed for. It is also an 
+    upper bound for all greater thresholds, so the threshold must not be decreased below it.
+
+    :param model: the MILP/LP
+    :type model: solver.MILP
+    :param rf: the RF the model was constructed for
+    :type rf: model.ReachabilityForm
+    :param threshold: the new threshold :math:`\lambda`
+    :type threshold: float
+    :param mode: either 'min' or 'max'
+    :type mode: str
+    :param constraints: if the model is a RMP, the constraint indices returned by `construct_RMP`, defaults to None
+    :type constraints: np.ndarray[int], optional
+    """
+    assert mode in ["min", "max"]
+    constridx = rf.fark_threshold_index(mode)
+    if constraints is not None:
+        constridx = constraints[constridx]
+    model.set_rhs([constridx], -threshold)
+
 def construct_indicator_graph(rf : ReachabilityForm, mode : str, indicators, indicator_var_to_idx):
     assert mode in ["min", "max"]
     # P only encodes reachability -- we don't care about probabilities
@@ -243,8 +400,7 @@ def construct_indicator_graph(rf : ReachabilityForm, mode : str, indicators, ind
                         for indicator_succ_sap in indicators_succ_sap:
                             indsuccsapidx = indicator_var_to_idx[indicator_succ_sap]
                             P[indsapidx, indsuccsapidx] = 1
-    index_by_state_action = bidict({ (idx,0) : idx for idx in range(indicator_count) })
-    return Graph(P, index_by_state_action)
+    return Graph(P, StateActionIndex.identity(indicator_count))
 
 
 
@@ -1,9 +1,12 @@
-from . import ProblemFormulation, ProblemResult, Subsystem, AllOnesInitializer, construct_MILP, certificate_size
-from switss.solver import SolverResult
+from . import ProblemFormulation, ProblemResult, Subsystem, AllOnesInitializer, construct_MILP, set_threshold, certificate_size, \
+              construct_RMP, add_violated_constraints, compute_upper_bound
+from switss.solver import SolverResult, SolverSession
 from switss.utils import InvertibleDict
 
 from bidict import bidict
 import numpy as np
+import math
+import time
 
 class MILPExact(ProblemFormulation):
     """
@@ -35,39 +38,99 @@ class MILPExact(ProblemFormulation):
         \\text{for all}\; s \in S,\; l \in \Lambda(s)
 
     for the z-form. In both cases, :math:`\sigma` is a :math:`|L|`-dimensional vector.
+
+    The last constructed MILP of each mode is kept. If the next call uses the same RF and labels and a threshold that
+    is at least as big (e.g. in `benchmarks.run`), only the threshold of the MILP is changed (see
+    `problem.set_threshold`) instead of constructing it again.
+
+    If `lazy` is True, the MILP is not constructed as a whole. Instead, a restricted master problem (RMP) that only
+    contains a small subset of the constraints is solved (see `problem.construct_RMP`), and the constraints that are
+    violated by its solution are added (see `problem.add_violated_constraints`) until the solution satisfies all
+    constraints. Since the RMP is a relaxation of the MILP, this solution is optimal for the MILP as well. The constraints
+    are first generated for the LP relaxation, which is cheap, and then for the MILP. Usually, only the Farkas constraints
+    of the states around the minimal witness are added, which keeps the problems that are passed to the solver small
+    for large models, at the expense of solving several (smaller) MILPs.
     """
-    def __init__(self, solver="cbc"):
+    def __init__(self, solver="cbc", lazy=False, batch_size=None, lookahead=3):
         """Instantiates a MILPExact instance from a given mode ("min" or "max") and a solver.
 
         :param mode: The mode, either "min" or "max"
         :type mode: str
         :param solver: Solver the should be used, defaults to "cbc"
         :type solver: str, optional
+        :param lazy: If True, constraints are generated lazily, defaults to False
+        :type lazy: bool, optional
+        :param batch_size: If `lazy` is True, the maximal number of violated constraints that are added after every solve.
+            If None, all violated constraints are added, defaults to None
+        :type batch_size: int, optional
+        :param lookahead: If `lazy` is True, the constraints of the states that are at most this number of steps away
+            from the violated constraints are added as well (see `problem.add_violated_constraints`), defaults to 3
+        :type lookahead: int, optional
         """
         super().__init__()
         self.solver = solver
+        self.lazy = lazy
+        self.batch_size = batch_size
+        self.lookahead = lookahead
+        # maps modes to (reach_form, labels, threshold, model, rmp) of the last constructed MILP,
+        # where rmp is (constraints, system) (see `problem.construct_RMP`) if the MILP is a RMP and None otherwise.
+        # MILPs that are not RMPs are kept in a `solver.SolverSession`
+        self.__last_models = {}
+
+    def __getstate__(self):
+        # constructed MILPs are not copied
+        state = self.__dict__.copy()
+        state["_MILPExact__last_models"] = {}
+        return state
 
     @property
     def details(self):
-        """Returns a dictionary with method details. Keys are "type", "mode" and "solver"."""
+        """Returns a dictionary with method details. Keys are "type", "solver" and "lazy"."""
         return {
             "type" : "MILPExact",
-            "solver" : self.solver
+            "solver" : self.solver,
+            "lazy" : self.lazy
         }
 
+    def __reusable_model(self, reach_form, threshold, mode, labels):
+        if mode not in self.__last_models:
+            return None, None
+        last_reach_form, last_labels, last_threshold, model, rmp = self.__last_models[mode]
+        # in 'max'-mode, the upper bound K of the MILP is only valid for greater thresholds
+        if last_reach_form is not reach_form or last_labels != labels or (rmp is not None) != self.lazy or \
+           (mode == "max" and threshold < last_threshold):
+            return None, None
+        # the constraints that were added to a RMP are constraints of the MILP for every threshold
+        set_threshold(model, reach_form, threshold, mode, constraints=None if rmp is None else rmp[0])
+        if rmp is not None:
+            rmp[1][1][reach_form.fark_threshold_index(mode)] = -threshold
+        return model, rmp
+
     def _solveiter(self, reach_form, threshold, mode, labels, timeout=None):
-        model, _ = construct_MILP(reach_form, 
-                                  threshold, 
-                                  mode=mode, 
-                                  labels=labels, 
-                                  relaxed=False, 
-                                  upper_bound_solver=self.solver,
-                                  modeltype="gurobi" if self.solver=="gurobi" else "pulp")
-        
-        if model is None:
+        labels = None if labels is None else list(labels)
+        if self.lazy:
+            yield self.__solve_lazily(reach_form, threshold, mode, labels, timeout)
+            return
+
+        # the MILP is kept loaded in the solver between thresholds if possible (see `solver.SolverSession`)
+        session, _ = self.__reusable_model(reach_form, threshold, mode, labels)
+        if session is None:
+            model, _ = construct_MILP(reach_form, 
+                                      threshold, 
+                                      mode=mode, 
+                                      labels=labels, 
+                                      relaxed=False, 
+                                      upper_bound_solver=self.solver,
+                                      modeltype="gurobi" if self.solver=="gurobi" else "pulp")
+            self.__last_models.pop(mode, None)
+            if model is not None:
+                session = SolverSession(model, self.solver)
+                self.__last_models[mode] = (reach_form, labels, threshold, session, None)
+
+        if session is None:
             yield ProblemResult("infeasible", None, None, None)
         else:
-            result = model.solve(solver=self.solver, timeout=timeout)
+            result = session.solve(timeout=timeout)
             if result.status != "optimal":
                 yield ProblemResult(result.status, None, None, None)
             else:
@@ -75,3 +138,59 @@ class MILPExact(ProblemFormulation):
                 certificate = result.result_vector[:certsize]
                 witness = Subsystem(reach_form, certificate, mode)
                 yield ProblemResult("success", witness, result.value, certificate)
+
+    def __solve_lazily(self, reach_form, threshold, mode, labels, timeout):
+        start = time.perf_counter()
+        model, rmp = self.__reusable_model(reach_form, threshold, mode, labels)
+        if model is None:
+            if mode == "min":
+                upper_bound = 1.
+            else:
+                status, upper_bound = compute_upper_bound(*reach_form.fark_constraints(threshold, mode), solver=self.solver)
+                if status != "optimal":
+                    return ProblemResult("infeasible", None, None, None)
+            # the constraints that are needed by the LP relaxation are generated first, which is much faster
+            # than solving a MILP in every iteration. They are the initial constraints of the RMP.
+            Pinit = None
+            for relaxed in [True, False]:
+                model, _, constraints, system = construct_RMP(reach_form,
+                                                               threshold,
+                                                               mode,
+                                                               Pinit=Pinit,
+                                                               labels=labels,
+                                                               relaxed=relaxed,
+                                                               modeltype="gurobi" if self.solver=="gurobi" else "pulp",
+                                                               upper_bound=upper_bound)
+                rmp = (constraints, system)
+                if relaxed:
+                    result = self.__generate_constraints(model, rmp, start, timeout)
+                    if result.status != "optimal":
+                        return ProblemResult(result.status, None, None, None)
+                    Pinit = np.nonzero(constraints >= 0)[0]
+            self.__last_models[mode] = (reach_form, labels, threshold, model, rmp)
+
+        result = self.__generate_constraints(model, rmp, start, timeout)
+        if result.status != "optimal":
+            return ProblemResult(result.status, None, None, None)
+        certsize = certificate_size(reach_form, mode)
+        certificate = result.result_vector[:certsize]
+        witness = Subsystem(reach_form, certificate, mode)
+        return ProblemResult("success", witness, result.value, certificate)
+
+    def __generate_constraints(self, model, rmp, start, timeout):
+        # solves the RMP and adds violated constraints until there are none
+        constraints, system = rmp
+        while True:
+            remaining = None if timeout is None else timeout - (time.perf_counter() - start)
+            if remaining is not None and remaining <= 0:
+                return SolverResult("notsolved", None, None, None)
+            # all solvers except HiGHS take whole seconds
+            if remaining is not None and self.solver != "highs":
+                remaining = math.ceil(remaining)
+            result = model.solve(solver=self.solver, timeout=remaining)
+            if result.status != "optimal":
+                return result
+            added = add_violated_constraints(model, system, constraints, result.result_vector,
+                                             batch_size=self.batch_size, lookahead=self.lookahead)
+            if added == 0:
+                return result
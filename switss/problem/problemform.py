@@ -4,7 +4,7 @@ from collections import deque
 import numpy as np
 
 from ..solver import MILP,LP
-from ..utils import InvertibleDict
+from ..utils import InvertibleDict, phase
 
 class ProblemFormulation:
     """A ProblemFormulation is an abstract base class for
@@ -85,11 +85,11 @@ class ProblemFormulation:
         """
         assert (threshold >= 0) and (threshold <= 1)
         assert mode in ["min","max"]
-        return self._solveiter(reachability_form, 
-                               threshold,
-                               mode, 
-                               labels=labels, 
-                               timeout=timeout)
+        return _phase_iter(self._solveiter(reachability_form, 
+                                           threshold,
+                                           mode, 
+                                           labels=labels, 
+                                           timeout=timeout))
 
     @abstractmethod
     def _solveiter(self, 
@@ -111,3 +111,12 @@ class ProblemFormulation:
         """        
         pass
 
+def _phase_iter(results):
+    # the computation of every result is recorded as phase "solveiter" (without the time the caller needs to process it)
+    while True:
+        with phase("solveiter"):
+            try:
+                result = next(results)
+            except StopIteration:
+                return
+        yield result
@@ -1,7 +1,8 @@
 from . import ProblemFormulation, ProblemResult, Subsystem
-from . import AllOnesInitializer, InverseResultUpdater, construct_MILP, certificate_size
-from switss.utils import InvertibleDict
-from switss.solver import LP
+from . import AllOnesInitializer, InverseResultUpdater, construct_MILP, set_threshold, certificate_size
+from .formulations import _upper_bound_LP
+from switss.utils import InvertibleDict, phase
+from switss.solver import LP, SolverSession
 import numpy as np
 
 class QSHeur(ProblemFormulation):
@@ -57,7 +58,10 @@ class QSHeur(ProblemFormulation):
         :type initializertype: problem.Initializer, optional
         :param updatertype: The used update-method, defaults to InverseResultUpdater
         :type updatertype: problem.Updater, optional
-        :param solver: Solver that should be used, defaults to "cbc"
+        :param solver: Solver that should be used, also by the initializer and the updater. The LPs are only
+            reoptimized from the basis of the last LP if the solver is "highs" and `highspy` is installed (see
+            `solver.SolverSession`). With all other solvers, including the default "cbc", every LP is solved from
+            scratch, defaults to "cbc"
         :type solver: str, optional
         """        
         super().__init__()
@@ -66,6 +70,15 @@ class QSHeur(ProblemFormulation):
         self.solver = solver
         self.updatertype = updatertype
         self.initializertype = initializertype
+        # maps modes to [reach_form, labels, upper_bound, session, indicators, initializer, added_constraints,
+        # upper_bound_session] of the last constructed LP, where upper_bound is the K the LP was constructed for
+        self.__last_sessions = {}
+
+    def __getstate__(self):
+        # solver sessions are not copied
+        state = self.__dict__.copy()
+        state["_QSHeur__last_sessions"] = {}
+        return state
 
     @property
     def details(self):
@@ -79,38 +92,93 @@ class QSHeur(ProblemFormulation):
             "updatertype" : self.updatertype.__name__
         }
 
+    def __upper_bound(self, reach_form, threshold, mode):
+        # computes K for the given threshold (see `problem.construct_MILP`). In 'max'-mode, the LP of
+        # `problem.compute_upper_bound` is kept in a session as well, since only its threshold changes between calls
+        if mode == "min":
+            return "optimal", 1., None
+        last = self.__last_sessions.get(mode)
+        if last is not None and last[0] is reach_form:
+            upper_bound_session = last[7]
+            set_threshold(upper_bound_session, reach_form, threshold, mode)
+        else:
+            fark_matr, fark_rhs = reach_form.fark_constraints(threshold, mode)
+            upper_bound_session = SolverSession(_upper_bound_LP(fark_matr, fark_rhs), self.solver)
+        with phase("compute_upper_bound"):
+            result = upper_bound_session.solve()
+        assert result.status != "unbounded"
+        return result.status, result.value, upper_bound_session
+
+    def __session(self, reach_form, threshold, mode, labels, upper_bound, upper_bound_session):
+        # returns a session of the relaxed MILP of `problem.construct_MILP` for the given threshold and upper bound,
+        # the indicators, the initializer and the factor by which the indicator variables of the LP have to be multiplied
+        # to get the ones of a LP that is constructed for the upper bound
+        last = self.__last_sessions.get(mode)
+        same_groups = last is not None and last[0] is reach_form and last[1] == labels
+        # constraints that were added by the updater would have to be removed, which reloads the LP anyway.
+        # Solvers that don't keep the LP loaded wouldn't profit from rescaling the LP (see below) for another upper bound
+        if not same_groups or len(last[6]) > 0 or (last[2] != upper_bound and not last[3].persistent):
+            model, indicators = construct_MILP(reach_form,
+                                               threshold,
+                                               mode=mode,
+                                               labels=labels,
+                                               relaxed=True,
+                                               upper_bound=upper_bound)
+            session = SolverSession(model, self.solver)
+            # the initializer only depends on the RF and the groups
+            initializer = last[5] if same_groups else self.initializertype(
+                reachability_form=reach_form, mode=mode, indicator_to_group=indicators, solver=self.solver)
+            self.__last_sessions[mode] = [reach_form, labels, upper_bound, session, indicators, initializer, [],
+                                          upper_bound_session]
+            return session, indicators, initializer, 1.
+
+        _, _, last_upper_bound, session, indicators, initializer, _, _ = last
+        set_threshold(session, reach_form, threshold, mode)
+        # the LP for another upper bound K' arises from the one for K by substituting sigma(l) = (K'/K) tau(l) in
+        # x(v) <= K sigma(l), i.e. the bounds of sigma(l) become 0 <= sigma(l) <= K'/K and tau(l) = (K/K') sigma(l)
+        scale = last_upper_bound / upper_bound
+        if mode == "max":
+            session.set_bounds(np.arange(certificate_size(reach_form, mode)), ub=upper_bound)
+            session.set_bounds(list(indicators.keys()), ub=1/scale)
+        return session, indicators, initializer, scale
+
     def _solveiter(self, reach_form, threshold, mode, labels, timeout=None):
         """Runs the QSheuristic using the Farkas (y- or z-) polytope
-        depending on the value in mode."""
-        model, indicators = construct_MILP(reach_form, 
-                                           threshold, 
-                                           mode=mode, 
-                                           labels=labels, 
-                                           relaxed=True, 
-                                           upper_bound_solver=self.solver)
-        if model is None:
+        depending on the value in mode. The LP (and the initializer) are kept and only the threshold is
+        changed if the next call uses the same RF and labels, e.g. in `benchmarks.run`."""
+        labels = None if labels is None else list(labels)
+        status, upper_bound, upper_bound_session = self.__upper_bound(reach_form, threshold, mode)
+        if status != "optimal":
             yield ProblemResult("infeasible", None, None, None)
             return
-        
+
+        session, indicators, initializer, scale = self.__session(
+            reach_form, threshold, mode, labels, upper_bound, upper_bound_session)
+        added_constraints = self.__last_sessions[mode][6]
         certsize = certificate_size(reach_form, mode)
-        initializer = self.initializertype(reachability_form=reach_form, mode=mode, indicator_to_group=indicators)
-        updater = self.updatertype(reachability_form=reach_form, mode=mode, indicator_to_group=indicators)
+        updater = self.updatertype(reachability_form=reach_form, mode=mode, indicator_to_group=indicators,
+                                   solver=self.solver)
         current_objective = initializer.initialize()
+        # only the objective function (and some constraints) change between iterations, so the problem is kept 
+        # loaded in the solver if possible
         for i in range(self.iterations):
-            model.set_objective_function(current_objective)
-            result = model.solve(self.solver, timeout=timeout)
+            session.set_objective_function([(var, coeff*scale) for var, coeff in current_objective])
+            result = session.solve(timeout=timeout)
             if result.status == "optimal":
-                certificate = result.result_vector[:certsize]
+                result_vector = result.result_vector.copy()
+                result_vector[certsize:] *= scale
+                certificate = result_vector[:certsize]
                 witness = Subsystem(reach_form, certificate, mode)
-                indicator_weights = result.result_vector[certsize:]
+                indicator_weights = result_vector[certsize:]
                 no_nonzero_groups = len([i for i in indicator_weights if i > 0])
                 yield ProblemResult("success", witness, no_nonzero_groups, certificate)
 
-                current_objective = updater.update(result.result_vector)
-                new_constraints = updater.constraints(result.result_vector)
-                for constraint in new_constraints:
-                    model.add_constraint(*constraint)
+                current_objective = updater.update(result_vector)
+                new_constraints = updater.constraints(result_vector)
+                for lhs, sense, rhs in new_constraints:
+                    lhs = [(var, coeff*scale if var >= certsize else coeff) for var, coeff in lhs]
+                    added_constraints.append(session.add_constraint(lhs, sense, rhs))
             else:
                 # failed to optimize LP
                 yield ProblemResult(result.status, None, None, None)
-                break
\ No newline at end of file
+                break
@@ -185,20 +185,24 @@ class InverseReachabilityInitializer(Initializer):
 
     The reasoning is similar to the z-Form; state-action pairs that yield states which have a low probability
     of reaching the goal state get a high weight.
+
+    The probabilities are computed with the given solver and method (see `model.ReachabilityForm.max_z_state`, 
+    e.g. "topological").
     """    
-    def __init__(self, reachability_form, mode, indicator_to_group, solver="cbc"):
+    def __init__(self, reachability_form, mode, indicator_to_group, solver="cbc", method=None):
         super(InverseReachabilityInitializer, self).__init__(reachability_form, mode, indicator_to_group)
         self.solver = solver
+        self.method = method
 
         self.Pr = None
         if self.mode == "min":
             # if mode is min, each variable in a group corresponds to a state
-            Pr_x = self.reachability_form.max_z_state(solver=self.solver)
+            Pr_x = self.reachability_form.max_z_state(solver=self.solver, method=self.method)
             assert (Pr_x > 0).all()
             self.Pr = Pr_x
         else:
             # if mode is max, each variable in a group corresponds to a state-action pair index
-            Pr_x_a = self.reachability_form.max_z_state_action(solver=self.solver)
+            Pr_x_a = self.reachability_form.max_z_state_action(solver=self.solver, method=self.method)
             assert (Pr_x_a > 0).all()
             self.Pr = Pr_x_a
 
@@ -243,20 +247,22 @@ class InverseFrequencyInitializer(Initializer):
 
 
 class InverseCombinedInitializer(Initializer):
-    def __init__(self, reachability_form, mode, indicator_to_group, solver="cbc"):
+    def __init__(self, reachability_form, mode, indicator_to_group, solver="cbc", method=None):
         super(InverseCombinedInitializer, self).__init__(reachability_form, mode, indicator_to_group)
         self.solver = solver
+        # method that is used to compute the reachability probabilities (see `model.ReachabilityForm.max_z_state`)
+        self.method = method
 
         self.E = None
         if self.mode == "min":
             # if mode is min, each variable in a group corresponds to a state
             E_x = self.reachability_form.max_y_state(solver=self.solver)
-            Pr_x = self.reachability_form.max_z_state(solver=self.solver)
+            Pr_x = self.reachability_form.max_z_state(solver=self.solver, method=self.method)
             self.V = E_x*Pr_x
         else:
             # if mode is max, each variable in a group corresponds to a state-action pair index
             E_x_a = self.reachability_form.max_y_state_action(solver=self.solver)
-            Pr_x_a = self.reachability_form.max_z_state_action(solver=self.solver)
+            Pr_x_a = self.reachability_form.max_z_state_action(solver=self.solver, method=self.method)
             self.V = E_x_a*Pr_x_a
 
 
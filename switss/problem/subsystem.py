@@ -1,11 +1,9 @@
-from bidict import bidict
 import numpy as np
 from graphviz import Digraph
-from scipy.sparse import dok_matrix
-from collections import defaultdict
+from scipy.sparse import csr_matrix
 
 from ..model import DTMC, MDP, ReachabilityForm
-from ..utils import color_from_hash, InvertibleDict, std_action_map
+from ..utils import color_from_hash, InvertibleDict, std_action_map, StateActionIndex, phase
 
 class Subsystem:
     """In this context, a subsystem is the combination of a system in reachability form (RF) and 
@@ -64,10 +62,8 @@ class Subsystem:
             C,N = self.__supersys.system.P.shape
             self.__subsystem_mask = np.zeros(N-2)
             if self.__certform == "max":
-                for index in range(C-2):
-                    if self.certificate[index] > 0:
-                        (st,_) = self.__supersys.system.index_by_state_action.inv[index]
-                        self.__subsystem_mask[st] = True
+                row_state = self.__supersys.system.index_by_state_action.row_state[:C-2]
+                self.__subsystem_mask[row_state[self.certificate[:C-2] > 0]] = True
             else:
                 self.__subsystem_mask = self.certificate > 0
 
@@ -79,6 +75,7 @@ class Subsystem:
         return self.__supersys
 
     @property
+    @phase("subsystem")
     def subsys(self):
         """RF of the subsystem. On the first call, this will generate the subsystem from the certificate and supersystem which
         may take some time dependent on the size of the system. If `ignore_consistency_checks` was set to True, the generated 
@@ -86,82 +83,36 @@ class Subsystem:
         if self.__subsys != None:
             return self.__subsys
 
-        state_vector = self.subsystem_mask
+        state_vector = np.asarray(self.subsystem_mask, dtype=bool)
         reach_form = self.supersys
-        P = reach_form.system.P
-        C,N = P.shape
-
-        new_to_old_states = bidict()
-        new_index_by_state_action = bidict()
-        new_label_to_states = defaultdict(set)
-        new_label_to_actions = defaultdict(set) 
-        new_N = 0
-        new_C = 0
-
-        old_label_by_states = reach_form.system.labels_by_state
-
-        # Map the new states to new indices and compute a map to the old states
-        for i in range(N-2):
-            if state_vector[i] == True:
-                new_to_old_states[new_N] = i
-                for l in old_label_by_states[i]:
-                    new_label_to_states[l].add(new_N)
-                new_N += 1
-
-        # Compute the new number of choices (= rows)
-        for rowidx in range(C-2):
-            (source,action) = reach_form.system.index_by_state_action.inv[rowidx]
-            if state_vector[source] == True:
-                actionlabels = reach_form.system.labels_by_action[(source,action)]
-                new_source = new_to_old_states.inv[source]
-                new_index_by_state_action[(new_source,action)] = new_C
-                new_label_to_actions[(new_source,action)] = actionlabels
-                new_C += 1
-
-        fail_state, target_state = new_N + 1, new_N
-        new_index_by_state_action[(fail_state,0)] = new_C+1
-        new_index_by_state_action[(target_state,0)] = new_C
-        
-        new_label_to_states[reach_form.target_label] = {target_state}
-        new_label_to_states[reach_form.fail_label] = {fail_state}
-
-        new_P = dok_matrix((new_C+2,new_N+2))
-        new_P[new_C+1, fail_state] = 1
-        new_P[new_C, target_state] = 1
-
-        not_to_fail = np.zeros(new_C)
-
-        # Populate the new transition matrix
-        for (rowidx,target), prob in P.items():
-            (source,action) = reach_form.system.index_by_state_action.inv[rowidx]
-            if target >= N-2 or source >= N-2:
-                # P also contains target & fail state - but state_vector only has N-2 entries
-                continue
-
-            if state_vector[source] == True and state_vector[target] == True:
-                new_source = new_to_old_states.inv[source]
-                new_target = new_to_old_states.inv[target]
-                new_row_idx = new_index_by_state_action[(new_source,action)]
-                new_P[new_row_idx,new_target] = prob
-                not_to_fail[new_row_idx] += prob
-
-        # populate probabilities to fail
-        # maps every target state with probability 1 to itself.
-        for rowidx, p_target in enumerate(reach_form.to_target):
-            (source,action) = reach_form.system.index_by_state_action.inv[rowidx]
-            if state_vector[source] == True:
-                new_source = new_to_old_states.inv[source]
-                new_row_idx = new_index_by_state_action[(new_source,action)]
-                new_P[new_row_idx, target_state] = p_target 
-                new_P[new_row_idx, fail_state] = 1 - (p_target + not_to_fail[new_row_idx])
+        C,N = reach_form.system.P.shape
+
+        # new index of every state and row of the supersystem (-1 if removed). old target and fail state are removed
+        # as well, since they are replaced by the new target and fail state.
+        kept_states = np.nonzero(state_vector)[0]
+        state_map = np.full(N, -1)
+        state_map[kept_states] = np.arange(len(kept_states))
+        row_state = reach_form.system.index_by_state_action.row_state[:C-2]
+        row_action = reach_form.system.index_by_state_action.row_action[:C-2]
+        rows = np.nonzero(state_vector[row_state])[0]
+        state_action_map = np.full(C, -1)
+        state_action_map[rows] = np.arange(len(rows))
+
+        new_P = csr_matrix(reach_form.system.P)[rows][:, kept_states]
+        new_index_by_state_action = StateActionIndex(state_map[row_state[rows]], row_action[rows])
+        to_target = reach_form.to_target.A1[rows]
 
         # model type is same as supersystems model type.
         # if model type is DTMC, additional parameters are ignored.
-        modeltype = type(self.supersys.system)
-        model = modeltype(P=new_P, 
-            index_by_state_action=new_index_by_state_action, 
-            label_to_actions=dict(new_label_to_actions), 
-            label_to_states=dict(new_label_to_states))
+        model = ReachabilityForm._initialize_system(
+            new_P,
+            new_index_by_state_action,
+            to_target,
+            state_map,
+            state_action_map,
+            reach_form.system,
+            reach_form.target_label,
+            reach_form.fail_label)
 
         model = ReachabilityForm(
             model, 
@@ -1,6 +1,8 @@
 """This module is a wrapper for the PuLP library, which is capable of 
 solving LP/MILP instances by using different kinds of solvers (like Gurobi or CBC).
 The wrapper defines custom MILP and LP classes in order to simplify the instantiation of 
-problems from coefficient vectors and matrices."""
+problems from coefficient vectors and matrices. The "highs" solver is not called through PuLP,
+but in-process via scipy.optimize."""
 from .solverresult import SolverResult
-from .milp import MILP, LP, GurobiMILP
\ No newline at end of file
+from .milp import MILP, LP, GurobiMILP
+from .session import SolverSession
\ No newline at end of file
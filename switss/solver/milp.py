@@ -1,6 +1,7 @@
-from ..utils import cast_dok_matrix
+from ..utils import cast_csr_matrix, phase
 from . import SolverResult
-from scipy.sparse import dok_matrix
+from scipy.sparse import csr_matrix, vstack
+from scipy.optimize import milp, linprog, LinearConstraint, Bounds
 import pulp
 import numpy as np
 
@@ -42,6 +43,18 @@ class MILP:
 
         result = milp.solve(solver="cbc")
         print(result)
+
+    .. code-block::
+
+        # constraints can also be added in bulk, i.e. as a sparse matrix. This is the fastest way of building large problems.
+        # simple bounds like x >= 0 are best given as bounds of the variables.
+        milp = MILP(objective="max")
+        milp.add_variables("integer", "real", lb=0)
+        milp.add_constraints_matrix(np.matrix([[2,1],[4,-1],[-8,2]]), "<=", np.array([10,8,2]))
+        milp.set_objective_function([(0, 1), (1, 1)])
+
+    Internally, the problem is stored as a sparse constraint matrix together with senses and right hand sides. PuLP-objects
+    are only created when a solver is used that is called through PuLP (i.e. every solver except "highs").
     """
     def __init__(self, objective="min"):
         """Initializes an empty MILP.
@@ -50,63 +63,199 @@ class MILP:
         :type objective: str, optional
         """        
         assert objective in ["min", "max"], "objective must be either 'min' or 'max'"
-        objective = { "min" : pulp.LpMinimize, "max" : pulp.LpMaximize }[objective]
-        self.__pulpmodel = pulp.LpProblem("",objective)
-        self.__variables = [] 
-        self.__constraints = []
-        self.__set_objective_function = False
-
+        self.__objective = objective
+        self.__domains = []
+        self.__opt = np.zeros(0)
+        self.__lower = np.zeros(0)
+        self.__upper = np.zeros(0)
+        # constraints are stored in blocks of (A, senses, rhs), which are concatenated when needed
+        self.__blocks = []
+        self.__assembled = None
+        self.__constraint_count = 0
+        self.__removed = set()
+        # lazily built PuLP problem. variables and constraints are materialized up to the given counts.
+        self.__pulpmodel = None
+        self.__pulpvariables = []
+        self.__pulpconstraints = 0
+
+    @phase("solve")
     def solve(self, solver="cbc",timeout=None):
         """Solves this problem and returns the problem result.
         
-        :param solver: The solver that should be used. Currently supported are "cbc", "gurobi", "glpk" and "cplex", defaults to "cbc"
+        :param solver: The solver that should be used. Currently supported are "cbc", "gurobi", "glpk", "cplex" and "highs", 
+            defaults to "cbc". "highs" solves the problem in-process via `scipy.optimize.linprog` (LPs, including dual values) 
+            or `scipy.optimize.milp` (MILPs, without dual values), all others are called through PuLP.
         :type solver: str, optional
         :return: Result.
         :rtype: solver.SolverResult
         """        
-        assert solver in ["gurobi","cbc","glpk","cplex"], "solver must be in ['gurobi','cbc','glpk','cplex']"
+        assert solver in ["gurobi","cbc","glpk","cplex","highs"], "solver must be in ['gurobi','cbc','glpk','cplex','highs']"
         if timeout != None:
-            assert isinstance(timeout,int), "timeout must be specified in seconds as integer value"
+            # HiGHS also accepts fractions of seconds
+            assert isinstance(timeout,int) or (solver == "highs" and isinstance(timeout,float)), \
+                "timeout must be specified in seconds as integer value"
 
+        if solver == "highs":
+            return self._solve_highs(timeout=timeout)
+
+        with phase("export"):
+            pulpmodel = self._pulp_model()
         if solver == "gurobi":
             gurobi_options = [
                 ("MIPGap",0), ("MIPGapAbs",0), ("FeasibilityTol",1e-9),\
                 ("IntFeasTol",1e-9),("NumericFocus",3)]
             if timeout != None:
                 gurobi_options.append(("TimeLimit",str(timeout)))
-            self.__pulpmodel.setSolver(pulp.GUROBI_CMD(options=gurobi_options))
+            pulpmodel.setSolver(pulp.GUROBI_CMD(options=gurobi_options))
         elif solver == "cbc":
             cbc_options = ["--integerT","0"]
-            self.__pulpmodel.setSolver(
+            pulpmodel.setSolver(
                 pulp.PULP_CBC_CMD(gapRel=1e-9,timeLimit=timeout,options=cbc_options))
         elif solver == "glpk":
             glpk_options = ["--tmlim",str(timeout)] if timeout != None else []
-            self.__pulpmodel.setSolver(pulp.GLPK_CMD(options=glpk_options))
+            pulpmodel.setSolver(pulp.GLPK_CMD(options=glpk_options))
         elif solver == "cplex":
-            self.__pulpmodel.setSolver(pulp.CPLEX_PY(timeLimit=timeout))
+            pulpmodel.setSolver(pulp.CPLEX_PY(timeLimit=timeout))
+
+        with phase("solver"):
+            pulpmodel.solve()
+
+        with phase("parse"):
+            status = {   1:"optimal",
+                         0:"notsolved",
+                        -1:"infeasible", 
+                        -2:"unbounded", 
+                        -3:"undefined"}[pulpmodel.status]
+            result_vector = np.array([var.value() for var in self.__pulpvariables])
+            dual_result_vector = np.array([ 
+                pulpmodel.constraints["c%d" % idx].pi if idx not in self.__removed else float("nan") 
+                for idx in range(self.__constraint_count) ])
+            value = pulpmodel.objective.value()
 
-        self.__pulpmodel.solve()
+        return SolverResult(status, result_vector, dual_result_vector, value)
 
-        status = {   1:"optimal",
-                     0:"notsolved",
-                    -1:"infeasible", 
-                    -2:"unbounded", 
-                    -3:"undefined"}[self.__pulpmodel.status]
-        result_vector = np.array([var.value() for var in self.__variables])
-        dual_result_vector = np.array([ constr.pi for constr in self.__constraints ])
-        value = self.__pulpmodel.objective.value()
+    def _pulp_model(self):
+        """Returns this problem as a `pulp.LpProblem`. Variables and constraints that were added since the last 
+        call are materialized, the objective function is set again.
 
-        return SolverResult(status, result_vector, dual_result_vector, value)
+        :rtype: pulp.LpProblem
+        """
+        if self.__pulpmodel is None:
+            self.__pulpmodel = pulp.LpProblem("", { "min" : pulp.LpMinimize, "max" : pulp.LpMaximize }[self.__objective])
+        cats = { "real" : pulp.LpContinuous, "integer" : pulp.LpInteger, "binary" : pulp.LpBinary }
+        for varidx in range(len(self.__pulpvariables), len(self.__domains)):
+            self.__pulpvariables.append(pulp.LpVariable("x%d" % varidx, cat=cats[self.__domains[varidx]]))
+        # bounds may have changed since the variables were created
+        lower = np.where(np.isinf(self.__lower), None, self.__lower).tolist()
+        upper = np.where(np.isinf(self.__upper), None, self.__upper).tolist()
+        for var, lb, ub in zip(self.__pulpvariables, lower, upper):
+            var.lowBound, var.upBound = lb, ub
+
+        A, senses, rhs = self.__constraint_arrays()
+        pulpsenses = { "<=" : pulp.LpConstraintLE, "=" : pulp.LpConstraintEQ, ">=" : pulp.LpConstraintGE }
+        for constridx in range(self.__pulpconstraints, self.__constraint_count):
+            if constridx in self.__removed:
+                continue
+            start, end = A.indptr[constridx], A.indptr[constridx+1]
+            lhs = pulp.LpAffineExpression(
+                zip([self.__pulpvariables[var] for var in A.indices[start:end]], A.data[start:end].tolist()))
+            self.__pulpmodel += pulp.LpConstraint(
+                name="c%d" % constridx, e=lhs, sense=pulpsenses[senses[constridx]], rhs=rhs[constridx])
+        self.__pulpconstraints = self.__constraint_count
+        for constridx in self.__removed:
+            self.__pulpmodel.constraints.pop("c%d" % constridx, None)
+
+        self.__pulpmodel.setObjective(pulp.LpAffineExpression(zip(self.__pulpvariables, self.__opt.tolist())))
+        return self.__pulpmodel
+
+    def __constraint_arrays(self):
+        # concatenates all blocks of constraints. removed constraints are still contained.
+        N = len(self.__domains)
+        if self.__assembled is None or self.__assembled[0].shape[1] != N:
+            matrices = [csr_matrix((A.data, A.indices, A.indptr), shape=(A.shape[0], N)) for A,_,_ in self.__blocks]
+            A = vstack(matrices, format="csr") if len(matrices) > 0 else csr_matrix((0, N))
+            senses = np.concatenate([senses for _,senses,_ in self.__blocks] + [np.zeros(0, dtype=object)])
+            rhs = np.concatenate([rhs for _,_,rhs in self.__blocks] + [np.zeros(0)])
+            self.__blocks = [(A, senses, rhs)]
+            self.__assembled = (A, senses, rhs)
+        return self.__assembled
+
+    def _variable_arrays(self):
+        """Returns the domains, lower and upper bounds of all variables.
+
+        :rtype: Tuple[List[str], np.ndarray[float], np.ndarray[float]]
+        """
+        return list(self.__domains), self.__lower.copy(), self.__upper.copy()
+
+    @property
+    def objective(self):
+        """Either "min" or "max"."""
+        return self.__objective
+
+    def _coefficient_arrays(self):
+        """Returns this problem in array form, i.e. a :math:`M \\times N` constraint matrix :math:`A`, lower and upper bounds
+        :math:`l,u` such that :math:`l \\leq Ax \\leq u` (with :math:`\\pm\\infty` for missing bounds), the :math:`N` objective
+        coefficients and the indices of the (not removed) constraints that correspond to the rows of :math:`A`.
+
+        :rtype: Tuple[scipy.sparse.csr_matrix, np.ndarray[float], np.ndarray[float], np.ndarray[float], np.ndarray[int]]
+        """
+        A, senses, rhs = self.__constraint_arrays()
+        constridxs = np.arange(self.__constraint_count)
+        if len(self.__removed) > 0:
+            constridxs = np.setdiff1d(constridxs, np.fromiter(self.__removed, dtype=np.int64))
+            A, senses, rhs = A[constridxs], senses[constridxs], rhs[constridxs]
+        lower = np.where(senses == "<=", -np.inf, rhs)
+        upper = np.where(senses == ">=", np.inf, rhs)
+        return A, lower, upper, self.__opt.copy(), constridxs
+
+    def _solve_highs(self, timeout=None):
+        with phase("export"):
+            A, lower, upper, opt, constridxs = self._coefficient_arrays()
+        N = len(self.__domains)
+        # HiGHS always minimizes
+        sign = -1 if self.__objective == "max" else 1
+        domains = np.array(self.__domains, dtype=object)
+        integrality = (domains != "real").astype(np.int64)
+        var_lower, var_upper = self.__lower, self.__upper
+        options = {} if timeout is None else { "time_limit" : timeout }
+
+        dual_result_vector = None
+        if integrality.any():
+            constraints = [LinearConstraint(A, lower, upper)] if A.shape[0] > 0 else []
+            with phase("solver"):
+                result = milp(sign*opt, integrality=integrality, bounds=Bounds(var_lower, var_upper),
+                              constraints=constraints, options=options)
+        else:
+            # linprog expects A_ub x <= b_ub and A_eq x = b_eq. >=-constraints are multiplied by -1.
+            eq, le, ge = lower == upper, np.isinf(lower), np.isinf(upper) & ~np.isinf(lower)
+            A_ub = A[np.nonzero(le | ge)[0]]
+            row_sign = np.where(ge[le | ge], -1, 1)
+            A_ub = csr_matrix(A_ub.multiply(row_sign[:,None]))
+            b_ub = np.where(ge, -lower, upper)[le | ge]
+            with phase("solver"):
+                result = linprog(sign*opt, 
+                                 A_ub=A_ub if A_ub.shape[0] > 0 else None, b_ub=b_ub if A_ub.shape[0] > 0 else None,
+                                 A_eq=A[np.nonzero(eq)[0]] if eq.any() else None, b_eq=lower[eq] if eq.any() else None,
+                                 bounds=list(zip(np.where(np.isinf(var_lower), None, var_lower), np.where(np.isinf(var_upper), None, var_upper))),
+                                 method="highs", options=options)
+            if result.status == 0:
+                # marginals are the derivatives of the (minimized) objective function with respect to the right hand sides
+                dual_result_vector = np.full(self.__constraint_count, np.nan)
+                ub_duals = sign*row_sign*result.ineqlin.marginals if A_ub.shape[0] > 0 else np.zeros(0)
+                eq_duals = sign*result.eqlin.marginals if eq.any() else np.zeros(0)
+                dual_result_vector[constridxs[le | ge]] = ub_duals
+                dual_result_vector[constridxs[eq]] = eq_duals
+
+        status = { 0:"optimal", 1:"notsolved", 2:"infeasible", 3:"unbounded", 4:"undefined" }.get(result.status, "undefined")
+        if status != "optimal":
+            return SolverResult(status, None, None, None)
+        return SolverResult(status, result.x, dual_result_vector, sign*result.fun)
 
     def _assert_expression(self, expression):
         for idx,(var,coeff) in enumerate(expression):
-            assert var >= 0 and var < len(self.__variables), "Variable %s does not exist (@index=%d)." % (var, idx)
+            assert var >= 0 and var < len(self.__domains), "Variable %s does not exist (@index=%d)." % (var, idx)
             assert coeff == float(coeff), "Coefficient coeff=%s is not a number (@index=%d)." % (coeff, idx)
 
-    def _expr_to_pulp(self, expression):
-        for var, coeff in expression:
-            yield self.__variables[var], coeff
-
     def set_objective_function(self, expression):
         """Sets the objective function of the form
 
@@ -114,19 +263,26 @@ class MILP:
             
             \sum_j \sigma_j x_j
 
-        where :math:`\sigma_j` indicates a coefficient and :math:`x_j` a variable.
+        where :math:`\sigma_j` indicates a coefficient and :math:`x_j` a variable. If the objective function was already set,
+        only the coefficients of the given variables are changed.
         
         :param expression: Sum is given as a list of variable/coefficient pairs. Each pair has the coefficient on the
             right and the variable on the left.
         :type expression: List[Tuple[int,float]]
         """        
         self._assert_expression(expression)
-        if not self.__set_objective_function:
-            self.__set_objective_function = True
-            self.__pulpmodel += pulp.LpAffineExpression(self._expr_to_pulp(expression))
-        else:
-            for var,coeff in expression:
-                self.__pulpmodel.objective[self.__variables[var]] = coeff
+        for var, coeff in expression:
+            self.__opt[var] = coeff
+
+    def set_objective_vector(self, opt):
+        """Sets the coefficients of all variables in the objective function at once.
+
+        :param opt: :math:`N` vector of coefficients, where :math:`N` is the number of variables.
+        :type opt: np.ndarray[float]
+        """
+        opt = np.asarray(opt, dtype=float).ravel()
+        assert len(opt) == len(self.__domains), "opt must have %d entries, but has %d" % (len(self.__domains), len(opt))
+        self.__opt = opt.copy()
         
     def add_constraint(self, lhs, sense, rhs):
         """Adds a constraint of the form
@@ -144,54 +300,125 @@ class MILP:
         :type sense: str
         :param rhs: Right side of the equation, i.e. a number.
         :type rhs: float
-        :return: name of the added constraint
-        :rtype: str
+        :return: index of the added constraint
+        :rtype: int
         """        
         assert sense in ["<=", "=", ">="]
         assert rhs == float(rhs), "Right hand side is not a number: rhs=%s" % rhs 
         self._assert_expression(lhs)
 
-        lhs = pulp.LpAffineExpression(self._expr_to_pulp(lhs))
-        sense = { "<=" : pulp.LpConstraintLE, 
-                  "=" : pulp.LpConstraintEQ, 
-                  ">=" : pulp.LpConstraintGE }[sense]
+        A = csr_matrix(([float(coeff) for _, coeff in lhs], [var for var, _ in lhs], [0, len(lhs)]), shape=(1, len(self.__domains)))
+        A.sum_duplicates()
+        return self.__add_block(A, np.array([sense], dtype=object), np.array([float(rhs)]))[0]
 
-        constridx = len( self.__constraints )
-        name = "c%d" % constridx
-        constraint = pulp.LpConstraint(name=name, e=lhs, sense=sense, rhs=rhs)
-        self.__pulpmodel += constraint
-        self.__constraints.append(constraint)
-        
-        return constridx
+    def add_constraints_matrix(self, A, sense, b):
+        """Adds constraints of the form
+
+        .. math::
+
+            A x \circ b
+
+        in bulk, where :math:`\circ \in \{ \leq, =, \geq \}` (componentwise). This is much faster than adding the 
+        rows one by one via `add_constraint`.
+
+        :param A: :math:`M \\times N` constraint matrix, where :math:`N` is the number of variables.
+        :type A: Either 2d-list, numpy.matrix, numpy.array or scipy.sparse.spmatrix
+        :param sense: Type of equation ("<=", ">=" or "="), either one for all constraints or a :math:`M` vector.
+        :type sense: str or List[str]
+        :param b: Right hand side, either a number or a :math:`M` vector.
+        :type b: float or np.ndarray[float]
+        :return: Indices of the added constraints.
+        :rtype: np.ndarray[int]
+        """
+        A = cast_csr_matrix(A).astype(float)
+        M = A.shape[0]
+        assert A.shape[1] == len(self.__domains), "A must have %d columns, but has %d" % (len(self.__domains), A.shape[1])
+        senses = np.full(M, sense, dtype=object) if isinstance(sense, str) else np.array(sense, dtype=object).ravel()
+        assert len(senses) == M and np.isin(senses, ["<=", "=", ">="]).all(), "sense must be '<=', '=' or '>='"
+        b = np.asarray(cast_csr_matrix(b).todense(), dtype=float).ravel() if not np.isscalar(b) else np.full(M, float(b))
+        assert len(b) == M, "b must have %d entries, but has %d" % (M, len(b))
+        return self.__add_block(A, senses, b)
+
+    def __add_block(self, A, senses, rhs):
+        constridxs = np.arange(self.__constraint_count, self.__constraint_count + A.shape[0])
+        self.__blocks.append((A, senses, rhs))
+        self.__assembled = None
+        self.__constraint_count += A.shape[0]
+        return constridxs
 
     def remove_constraint(self, constridx):
         """removes a given constraint from the model.
 
-        :param constridx: the name of the constraint
-        :type constridx: str
+        :param constridx: index of the constraint
+        :type constridx: int
         """        
-        self.__pulpmodel.constraints.pop(constridx)
+        assert 0 <= constridx < self.__constraint_count, "Constraint %s does not exist." % constridx
+        self.__removed.add(constridx)
 
-    def add_variables(self, *domains):
+    def set_rhs(self, constridxs, rhs):
+        """Changes the right hand sides of a number of constraints.
+
+        :param constridxs: Indices of the constraints.
+        :type constridxs: Iterable[int]
+        :param rhs: New right hand side(s), either one for all or one per constraint.
+        :type rhs: float or List[float]
+        """
+        constridxs = np.asarray(constridxs, dtype=np.int64).ravel()
+        assert ((constridxs >= 0) & (constridxs < self.__constraint_count)).all(), "Some constraint does not exist."
+        rhs = np.broadcast_to(np.asarray(rhs, dtype=float), constridxs.shape)
+        # the right hand sides are changed in the blocks that contain them, which avoids concatenating all blocks
+        offsets = np.cumsum([0] + [len(block_rhs) for _,_,block_rhs in self.__blocks])
+        blockidxs = np.searchsorted(offsets, constridxs, side="right") - 1
+        for blockidx, constridx, value in zip(blockidxs.tolist(), constridxs.tolist(), rhs.tolist()):
+            self.__blocks[blockidx][2][constridx - offsets[blockidx]] = value
+            if self.__pulpmodel is not None and constridx < self.__pulpconstraints and constridx not in self.__removed:
+                self.__pulpmodel.constraints["c%d" % constridx].constant = -value
+
+    def add_variables(self, *domains, lb=None, ub=None):
         """Adds a list of variables to this MILP. Each element in `domains` must be either `integer`, `binary` or `real`.
         
+        :param lb: Lower bound of the new variables, either one for all or one per variable. If None, variables are 
+            unbounded from below (binary variables: 0), defaults to None
+        :type lb: float or List[float], optional
+        :param ub: Upper bound of the new variables, either one for all or one per variable. If None, variables are 
+            unbounded from above (binary variables: 1), defaults to None
+        :type ub: float or List[float], optional
         :return: Index or indices of new variables.
         :rtype: either List[int] or int.
         """        
-        l = []
         for domain in domains:
             assert domain in ["integer", "real", "binary"]
-
-            cat = { "real" : pulp.LpContinuous, "integer" : pulp.LpInteger, "binary" : pulp.LpBinary }[domain]
-            varidx = len(self.__variables)
-            var = pulp.LpVariable("x%d" % varidx, cat=cat)
-            self.__variables.append(var)
-
-            if len(domains) == 1:
-                return varidx
-            else:
-                l.append(varidx)
-        return l
+        varidxs = list(range(len(self.__domains), len(self.__domains) + len(domains)))
+        binary = np.array([domain == "binary" for domain in domains], dtype=bool)
+        self.__domains.extend(domains)
+        self.__opt = np.concatenate((self.__opt, np.zeros(len(domains))))
+        self.__lower = np.concatenate((self.__lower, np.where(binary, 0, -np.inf)))
+        self.__upper = np.concatenate((self.__upper, np.where(binary, 1, np.inf)))
+        if lb is not None or ub is not None:
+            self.set_bounds(varidxs, lb=lb, ub=ub)
+        if len(domains) == 1:
+            return varidxs[0]
+        return varidxs
+
+    def set_bounds(self, varidxs, lb=None, ub=None):
+        """Sets bounds :math:`lb \\leq x_i \\leq ub` for a number of variables. Bounds are passed to the solvers as 
+        variable (column) bounds, which is much cheaper than adding them as constraints.
+
+        :param varidxs: Indices of the variables.
+        :type varidxs: Iterable[int]
+        :param lb: Lower bound(s), either one for all or one per variable. Use -np.inf for no bound. If None, 
+            lower bounds are not changed, defaults to None
+        :type lb: float or List[float], optional
+        :param ub: Upper bound(s), either one for all or one per variable. Use np.inf for no bound. If None, 
+            upper bounds are not changed, defaults to None
+        :type ub: float or List[float], optional
+        """
+        varidxs = np.asarray(varidxs, dtype=np.int64)
+        assert ((varidxs >= 0) & (varidxs < len(self.__domains))).all(), "Some variable does not exist."
+        if lb is not None:
+            self.__lower[varidxs] = lb
+        if ub is not None:
+            self.__upper[varidxs] = ub
 
     @classmethod
     def from_coefficients(cls, A, b, opt, domains, sense="<=", objective="min"):
@@ -203,7 +430,7 @@ class MILP:
 
         where :math:`\circ \in \{ \leq, \geq \}`, :math:`N` is the number of variables and :math:`M`
         the number of linear constraints. :math:`\mathbb{D}_i` indicates
-        the domain of each variable. If `A`, `b` and `opt` are not given as a `scipy.sparse.dok_matrix`, 
+        the domain of each variable. If `A`, `b` and `opt` are not given as a `scipy.sparse.csr_matrix`, 
         they are transformed into that form automatically.
         
         :param A: Matrix for inequality conditions  (:math:`A`).
@@ -221,37 +448,20 @@ class MILP:
         :return: The resulting MILP.
         :rtype: solver.MILP
         """
-
-        A = cast_dok_matrix(A).tocsr()
-        b = cast_dok_matrix(b)
-
-        opt = cast_dok_matrix(opt)
-
+        A = cast_csr_matrix(A)
         model = MILP(objective=objective)
 
         # initialize problem
         # this adds the variables and the objective function (which is opt^T*x, i.e. sum_{i=1}^N opt[i]*x[i])
         model.add_variables(*[domains[idx] for idx in range(A.shape[1])])
-        model.set_objective_function([(idx, opt[idx,0]) for idx in range(A.shape[1])])
-        
-        # this takes quite a lot of time since accessing the rows is inefficient, even for csr-formats.
-        # maybe find a way to compute Ax <= b faster.
+        if opt is not None:
+            model.set_objective_vector(np.asarray(cast_csr_matrix(opt).todense()).ravel())
         # now: add linear constraints: Ax <= b.
-
-        for constridx in range(A.shape[0]):
-            # calculates A[constridx,:]^T * x
-            row = A.getrow(constridx)
-            lhs = [0]*len(row.indices)
-            # print(row)
-            for i,j,d in zip(range(len(row.indices)), row.indices, row.data):
-                lhs[i] = (j, float(d))
-            # adds constraint: A[constridx,:]^T * x <= b[constridx]
-            model.add_constraint(lhs, sense, b[constridx,0])
-
+        model.add_constraints_matrix(A, sense, b)
         return model
 
     def __repr__(self):
-        return str(self.__pulpmodel)
+        return str(self._pulp_model())
 
 
 class LP(MILP):
@@ -296,7 +506,7 @@ class LP(MILP):
 
         where :math:`\circ \in \{\leq,\geq\}` :math:`N` is the number of
         variables and :math:`M` the number of linear constraints.
-        If `A`, `b` and `opt` are not given as a `scipy.sparse.dok_matrix`,
+        If `A`, `b` and `opt` are not given as a `scipy.sparse.csr_matrix`,
         they are transformed into that form automatically.
 
         :param A: Matrix for inequality conditions  (:math:`A`).
@@ -314,15 +524,19 @@ class LP(MILP):
         """
         return MILP.from_coefficients(A,b,opt,["real"]*A.shape[1],sense=sense,objective=objective)
 
-    def add_variables(self, count):
+    def add_variables(self, count, lb=None, ub=None):
         """Adds a number of variables to the LP.
         
         :param count: The amount of new variables.
         :type count: int
+        :param lb: Lower bound(s) of the new variables (see `MILP.add_variables`), defaults to None
+        :type lb: float or List[float], optional
+        :param ub: Upper bound(s) of the new variables (see `MILP.add_variables`), defaults to None
+        :type ub: float or List[float], optional
         :return: Index or indices of new variables.
         :rtype: either List[int] or int.
         """        
-        return MILP.add_variables(self, *["real"]*count)
+        return MILP.add_variables(self, *["real"]*count, lb=lb, ub=ub)
 
 
 class GurobiMILP(MILP):
@@ -347,8 +561,10 @@ class GurobiMILP(MILP):
         self.__model.setParam('OutputFlag', 0)
 
 
+    @phase("solve")
     def solve(self, **kwargs):
-        self.__model.optimize()
+        with phase("solver"):
+            self.__model.optimize()
         
         status_dict = { GRB.OPTIMAL: "optimal",
                         GRB.LOADED: "notsolved",
@@ -435,6 +651,57 @@ class GurobiMILP(MILP):
         return constridx
 
 
+    def add_constraints_matrix(self, A, sense, b):
+        """Adds constraints of the form :math:`A x \circ b` in bulk (see `MILP.add_constraints_matrix`).
+
+        :param A: :math:`M \\times N` constraint matrix, where :math:`N` is the number of variables.
+        :type A: Either 2d-list, numpy.matrix, numpy.array or scipy.sparse.spmatrix
+        :param sense: Type of equation ("<=", ">=" or "="), either one for all constraints or a :math:`M` vector.
+        :type sense: str or List[str]
+        :param b: Right hand side, either a number or a :math:`M` vector.
+        :type b: float or np.ndarray[float]
+        :return: Indices of the added constraints.
+        :rtype: np.ndarray[int]
+        """
+        A = cast_csr_matrix(A).astype(float)
+        M = A.shape[0]
+        assert A.shape[1] == len(self.__variables), "A must have %d columns, but has %d" % (len(self.__variables), A.shape[1])
+        senses = np.full(M, sense, dtype=object) if isinstance(sense, str) else np.array(sense, dtype=object).ravel()
+        assert len(senses) == M and np.isin(senses, ["<=", "=", ">="]).all(), "sense must be '<=', '=' or '>='"
+        b = np.asarray(cast_csr_matrix(b).todense(), dtype=float).ravel() if not np.isscalar(b) else np.full(M, float(b))
+        assert len(b) == M, "b must have %d entries, but has %d" % (M, len(b))
+        if M == 0:
+            return np.zeros(0, dtype=np.int64)
+        # all rows are passed to Gurobi at once as a sparse matrix
+        gurobi_senses = np.where(senses == "<=", GRB.LESS_EQUAL, np.where(senses == ">=", GRB.GREATER_EQUAL, GRB.EQUAL))
+        newconstrs = self.__model.addMConstr(A, self.__variables, gurobi_senses, b)
+        # older versions of gurobipy return a list of constraints instead of a MConstr
+        newconstrs = newconstrs.tolist() if hasattr(newconstrs, "tolist") else list(newconstrs)
+        constridxs = np.arange(len(self.__constraints), len(self.__constraints) + M)
+        self.__constraints.extend(newconstrs)
+        return constridxs
+
+    def set_objective_vector(self, opt):
+        """Sets the coefficients of all variables in the objective function at once.
+
+        :param opt: :math:`N` vector of coefficients, where :math:`N` is the number of variables.
+        :type opt: np.ndarray[float]
+        """
+        self.set_objective_function(list(enumerate(np.asarray(opt, dtype=float).ravel().tolist())))
+
+    def set_rhs(self, constridxs, rhs):
+        """Changes the right hand sides of a number of constraints (see `MILP.set_rhs`).
+
+        :param constridxs: Indices of the constraints.
+        :type constridxs: Iterable[int]
+        :param rhs: New right hand side(s), either one for all or one per constraint.
+        :type rhs: float or List[float]
+        """
+        constridxs = np.asarray(constridxs, dtype=np.int64)
+        rhs = np.broadcast_to(np.asarray(rhs, dtype=float), constridxs.shape)
+        for constridx, value in zip(constridxs.tolist(), rhs.tolist()):
+            self.__constraints[constridx].RHS = value
+
     def add_to_constraint(self, constridx, coeff, varidx):
         constr = self.__constraints[constridx]
         self.__model.chgCoeff(constr, self.__variables[varidx], coeff)
@@ -449,9 +716,15 @@ class GurobiMILP(MILP):
         self.__constraints[constridx] = None
 
 
-    def add_variables(self, *domains):
+    def add_variables(self, *domains, lb=None, ub=None):
         """Adds a list of variables to this MILP. Each element in `domains` must be either `integer`, `binary` or `real`.
         
+        :param lb: Lower bound of the new variables, either one for all or one per variable. If None, Gurobi's 
+            default (0) is used, defaults to None
+        :type lb: float or List[float], optional
+        :param ub: Upper bound of the new variables, either one for all or one per variable. If None, variables are 
+            unbounded from above (binary variables: 1), defaults to None
+        :type ub: float or List[float], optional
         :return: Index or indices of new variables.
         :rtype: either List[int] or int.
         """        
@@ -466,13 +739,35 @@ class GurobiMILP(MILP):
             varname = "x%d" % varidx
             var = self.__model.addVar(vtype=cat, name=varname)
             self.__variables.append(var)
+            l.append(varidx)
 
-            if len(domains) == 1:
-                return varidx
-            else:
-                l.append(varidx)
+        if lb is not None or ub is not None:
+            self.set_bounds(l, lb=lb, ub=ub)
+        if len(domains) == 1:
+            return l[0]
         return l
 
+    def set_bounds(self, varidxs, lb=None, ub=None):
+        """Sets bounds :math:`lb \\leq x_i \\leq ub` for a number of variables (see `MILP.set_bounds`).
+
+        :param varidxs: Indices of the variables.
+        :type varidxs: Iterable[int]
+        :param lb: Lower bound(s), either one for all or one per variable. Use -np.inf for no bound. If None, 
+            lower bounds are not changed, defaults to None
+        :type lb: float or List[float], optional
+        :param ub: Upper bound(s), either one for all or one per variable. Use np.inf for no bound. If None, 
+            upper bounds are not changed, defaults to None
+        :type ub: float or List[float], optional
+        """
+        varidxs = np.asarray(varidxs, dtype=np.int64)
+        for bound, attr in [(lb, "lb"), (ub, "ub")]:
+            if bound is None:
+                continue
+            bounds = np.broadcast_to(np.asarray(bound, dtype=float), varidxs.shape)
+            bounds = np.clip(bounds, -GRB.INFINITY, GRB.INFINITY)
+            for varidx, value in zip(varidxs.tolist(), bounds.tolist()):
+                setattr(self.__variables[varidx], attr, value)
+
 
     @classmethod
     def from_coefficients(cls, A, b, opt, domains, sense="<=", objective="min"):
@@ -484,7 +779,7 @@ class GurobiMILP(MILP):
 
         where :math:`\circ \in \{ \leq, \geq \}`, :math:`N` is the number of variables and :math:`M`
         the number of linear constraints. :math:`\mathbb{D}_i` indicates
-        the domain of each variable. If `A`, `b` and `opt` are not given as a `scipy.sparse.dok_matrix`, 
+        the domain of each variable. If `A`, `b` and `opt` are not given as a `scipy.sparse.csr_matrix`, 
         they are transformed into that form automatically.
         
         :param A: Matrix for inequality conditions  (:math:`A`).
@@ -503,31 +798,16 @@ class GurobiMILP(MILP):
         :rtype: solver.MILP
         """
 
-        A = cast_dok_matrix(A).tocsr()
-        b = cast_dok_matrix(b)
-
-        opt = cast_dok_matrix(opt)
-
+        A = cast_csr_matrix(A)
         model = GurobiMILP(objective=objective)
 
         # initialize problem
         # this adds the variables and the objective function (which is opt^T*x, i.e. sum_{i=1}^N opt[i]*x[i])
         model.add_variables(*[domains[idx] for idx in range(A.shape[1])])
-        model.set_objective_function([(idx, opt[idx,0]) for idx in range(A.shape[1])])
-        
-        # this takes quite a lot of time since accessing the rows is inefficient, even for csr-formats.
-        # maybe find a way to compute Ax <= b faster.
+        if opt is not None:
+            model.set_objective_vector(np.asarray(cast_csr_matrix(opt).todense()).ravel())
         # now: add linear constraints: Ax <= b.
-
-        for constridx in range(A.shape[0]):
-            # calculates A[constridx,:]^T * x
-            row = A.getrow(constridx)
-            lhs = [0]*len(row.indices)
-            # print(row)
-            for i,j,d in zip(range(len(row.indices)), row.indices, row.data):
-                lhs[i] = (j, float(d))
-            # adds constraint: A[constridx,:]^T * x <= b[constridx]
-            model.add_constraint(lhs, sense, b[constridx,0])
+        model.add_constraints_matrix(A, sense, b)
 
         return model
 
@@ -0,0 +1,204 @@
+from . import SolverResult, MILP, GurobiMILP
+from ..utils import phase
+import numpy as np
+
+try:
+    import highspy
+except:
+    highspy = None
+
+class SolverSession:
+    """A solver session keeps a problem loaded in a solver across multiple calls of `solve`. The problem may be modified
+    in between (objective function, bounds, right hand sides and new constraints). With "highs" (if `highspy` is
+    installed), the session keeps a `highspy.Highs` instance and reoptimizes with the dual simplex from the basis of
+    the last call instead of starting from scratch.
+
+    All other solvers, including the default "cbc", and "highs" without `highspy` fall back to `MILP.solve` (or
+    `GurobiMILP.solve`), i.e. the (modified) problem is solved from scratch in every call, without any warm start
+    from the session. Whether a session is warm-started can be checked via `persistent`. In every case, the underlying
+    problem is kept up to date, so `session.model` can also be solved directly.
+
+    .. code-block::
+
+        session = SolverSession(MILP.from_coefficients(A,b,opt,domains), solver="highs")
+        result = session.solve()
+        session.set_objective_vector(new_opt)
+        result = session.solve() # reoptimizes from the last basis
+    """
+    def __init__(self, model, solver="cbc"):
+        """
+        :param model: The problem.
+        :type model: solver.MILP or solver.GurobiMILP
+        :param solver: The solver that should be used (see `MILP.solve`). Only "highs" reoptimizes from the last basis,
+            defaults to "cbc"
+        :type solver: str, optional
+        """
+        assert isinstance(model, MILP)
+        self.model = model
+        self.solver = solver
+        self.__highs = None
+        # maps indices of constraints to rows of the highs model
+        self.__rows = None
+        # senses of the rows of the highs model
+        self.__senses = None
+
+    @property
+    def persistent(self):
+        """True if the problem stays loaded in the solver between calls of `solve`, which is only the case for "highs"."""
+        return self.solver == "highs" and highspy is not None and not isinstance(self.model, GurobiMILP)
+
+    def __load_highs(self):
+        A, lower, upper, opt, constridxs = self.model._coefficient_arrays()
+        domains, var_lower, var_upper = self.model._variable_arrays()
+        # the problem is always minimized, as in `MILP.solve`
+        sign = -1 if self.model.objective == "max" else 1
+        lp = highspy.HighsLp()
+        lp.num_col_, lp.num_row_ = A.shape[1], A.shape[0]
+        lp.col_cost_ = sign*opt
+        lp.col_lower_, lp.col_upper_ = var_lower, var_upper
+        lp.row_lower_, lp.row_upper_ = lower, upper
+        lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+        lp.a_matrix_.num_col_, lp.a_matrix_.num_row_ = A.shape[1], A.shape[0]
+        lp.a_matrix_.start_, lp.a_matrix_.index_, lp.a_matrix_.value_ = A.indptr, A.indices, A.data
+        if any(domain != "real" for domain in domains):
+            lp.integrality_ = [highspy.HighsVarType.kContinuous if domain == "real" else highspy.HighsVarType.kInteger
+                               for domain in domains]
+        self.__highs = highspy.Highs()
+        self.__highs.setOptionValue("output_flag", False)
+        self.__highs.setOptionValue("solver", "simplex")
+        # dual simplex
+        self.__highs.setOptionValue("simplex_strategy", 1)
+        self.__highs.passModel(lp)
+        self.__rows = { constridx : row for row, constridx in enumerate(constridxs.tolist()) }
+        self.__senses = np.where(lower == upper, "=", np.where(lower == -np.inf, "<=", ">=")).astype(object).tolist()
+
+    def solve(self, timeout=None):
+        """Solves the problem. If the solver is persistent (see `persistent`), it starts from the basis of the last call.
+
+        :param timeout: Timeout in seconds, defaults to None
+        :type timeout: int, optional
+        :return: Result.
+        :rtype: solver.SolverResult
+        """
+        if not self.persistent:
+            return self.model.solve(solver=self.solver, timeout=timeout)
+        return self.__solve_highs(timeout)
+
+    @phase("solve")
+    def __solve_highs(self, timeout):
+        if self.__highs is None:
+            with phase("export"):
+                self.__load_highs()
+        self.__highs.setOptionValue("time_limit", float(timeout) if timeout is not None else np.inf)
+        with phase("solver"):
+            self.__highs.run()
+            if self.__highs.getModelStatus() == highspy.HighsModelStatus.kSolveError:
+                # reoptimizing may fail for badly scaled modifications, which is why it's retried from scratch
+                self.__highs.clearSolver()
+                self.__highs.run()
+        with phase("parse"):
+            sign = -1 if self.model.objective == "max" else 1
+            model_status = self.__highs.getModelStatus()
+            status = { highspy.HighsModelStatus.kOptimal : "optimal",
+                       highspy.HighsModelStatus.kInfeasible : "infeasible",
+                       highspy.HighsModelStatus.kUnbounded : "unbounded",
+                       highspy.HighsModelStatus.kTimeLimit : "notsolved",
+                       highspy.HighsModelStatus.kIterationLimit : "notsolved" }.get(model_status, "undefined")
+            if status != "optimal":
+                return SolverResult(status, None, None, None)
+            solution = self.__highs.getSolution()
+            dual_result_vector = None
+            if solution.dual_valid:
+                row_dual = np.array(solution.row_dual)
+                constridxs = np.fromiter(self.__rows.keys(), dtype=np.int64, count=len(self.__rows))
+                rows = np.fromiter(self.__rows.values(), dtype=np.int64, count=len(self.__rows))
+                dual_result_vector = np.full(constridxs.max(initial=-1)+1, np.nan)
+                dual_result_vector[constridxs] = sign*row_dual[rows]
+            return SolverResult(status, np.array(solution.col_value), dual_result_vector,
+                                sign*self.__highs.getInfo().objective_function_value)
+
+    def set_objective_function(self, expression):
+        """Changes coefficients of the objective function (see `MILP.set_objective_function`).
+
+        :param expression: List of variable/coefficient pairs.
+        :type expression: List[Tuple[int,float]]
+        """
+        self.model.set_objective_function(expression)
+        if self.__highs is not None:
+            sign = -1 if self.model.objective == "max" else 1
+            varidxs = np.array([var for var, _ in expression], dtype=np.int32)
+            coeffs = np.array([coeff for _, coeff in expression], dtype=float)
+            self.__highs.changeColsCost(len(varidxs), varidxs, sign*coeffs)
+
+    def set_objective_vector(self, opt):
+        """Changes all coefficients of the objective function (see `MILP.set_objective_vector`).
+
+        :param opt: :math:`N` vector of coefficients.
+        :type opt: np.ndarray[float]
+        """
+        self.model.set_objective_vector(opt)
+        if self.__highs is not None:
+            sign = -1 if self.model.objective == "max" else 1
+            opt = np.asarray(opt, dtype=float).ravel()
+            self.__highs.changeColsCost(len(opt), np.arange(len(opt), dtype=np.int32), sign*opt)
+
+    def set_bounds(self, varidxs, lb=None, ub=None):
+        """Changes bounds of variables (see `MILP.set_bounds`).
+
+        :param varidxs: Indices of the variables.
+        :type varidxs: Iterable[int]
+        :param lb: Lower bound(s), defaults to None
+        :type lb: float or List[float], optional
+        :param ub: Upper bound(s), defaults to None
+        :type ub: float or List[float], optional
+        """
+        self.model.set_bounds(varidxs, lb=lb, ub=ub)
+        if self.__highs is not None:
+            varidxs = np.asarray(varidxs, dtype=np.int32)
+            _, lower, upper = self.model._variable_arrays()
+            self.__highs.changeColsBounds(len(varidxs), varidxs, lower[varidxs], upper[varidxs])
+
+    def set_rhs(self, constridxs, rhs):
+        """Changes right hand sides of constraints (see `MILP.set_rhs`).
+
+        :param constridxs: Indices of the constraints.
+        :type constridxs: Iterable[int]
+        :param rhs: New right hand side(s).
+        :type rhs: float or List[float]
+        """
+        self.model.set_rhs(constridxs, rhs)
+        if self.__highs is not None:
+            # only the bounds of the changed rows are passed to highs
+            constridxs = np.asarray(constridxs, dtype=np.int64).ravel()
+            rhs = np.broadcast_to(np.asarray(rhs, dtype=float), constridxs.shape)
+            rows = np.array([self.__rows[constridx] for constridx in constridxs.tolist()], dtype=np.int32)
+            senses = np.array([self.__senses[row] for row in rows.tolist()], dtype=object)
+            lower = np.where(senses == "<=", -np.inf, rhs)
+            upper = np.where(senses == ">=", np.inf, rhs)
+            self.__highs.changeRowsBounds(len(rows), rows, lower, upper)
+
+    def add_constraint(self, lhs, sense, rhs):
+        """Adds a constraint (see `MILP.add_constraint`).
+
+        :return: Index of the added constraint.
+        :rtype: int
+        """
+        constridx = self.model.add_constraint(lhs, sense, rhs)
+        if self.__highs is not None:
+            varidxs = np.array([var for var, _ in lhs], dtype=np.int32)
+            coeffs = np.array([coeff for _, coeff in lhs], dtype=float)
+            lower = -np.inf if sense == "<=" else rhs
+            upper = np.inf if sense == ">=" else rhs
+            self.__highs.addRow(lower, upper, len(varidxs), varidxs, coeffs)
+            self.__rows[constridx] = len(self.__rows)
+            self.__senses.append(sense)
+        return constridx
+
+    def remove_constraint(self, constridx):
+        """Removes a constraint (see `MILP.remove_constraint`). The problem is reloaded on the next call of `solve`.
+
+        :param constridx: Index of the constraint.
+        :type constridx: int
+        """
+        self.model.remove_constraint(constridx)
+        self.__highs = None
@@ -7,9 +7,9 @@ import tempfile
 import itertools
 
 dtmcs = example_dtmcs()
-lp_solvers = ["cbc","gurobi","cplex","glpk"]
+lp_solvers = ["cbc","gurobi","cplex","glpk","highs"]
 solvers = lp_solvers
-milp_solvers = ["cbc","gurobi","cplex"]
+milp_solvers = ["cbc","gurobi","cplex","highs"]
 
 def test_read_write():
     for dtmc in dtmcs:
@@ -19,6 +19,27 @@ def test_read_write():
             read_dtmc = DTMC.from_file(
                 namedtf.name + ".lab", namedtf.name + ".tra")
 
+def test_read_write_binary():
+    for dtmc in dtmcs:
+        with tempfile.TemporaryDirectory() as dirname:
+            dtmc.save_binary(dirname)
+            read_dtmc = DTMC.load_binary(dirname)
+            assert (read_dtmc.P != dtmc.P).nnz == 0
+            assert dict(read_dtmc.states_by_label.items()) == dict(dtmc.states_by_label.items())
+
+def test_load_transition_matrix():
+    for path in ["./examples/datasets/crowds-2-3", "./examples/datasets/groups-example"]:
+        dtmc = DTMC.from_file(path + ".lab", path + ".tra")
+        dtmc_legacy = DTMC.from_file(path + ".lab", path + ".tra", legacy_parser=True)
+        assert (dtmc.P != dtmc_legacy.P).nnz == 0
+    # later lines overwrite earlier lines with the same transition
+    with tempfile.NamedTemporaryFile("w", suffix=".tra") as tra_file:
+        tra_file.write("2 4\n0 1 0.3\n0 0 0.5\n0 1 0.5\n1 1 1\n")
+        tra_file.flush()
+        P = DTMC._load_transition_matrix(tra_file.name)["P"]
+        P_legacy = DTMC._load_transition_matrix_legacy(tra_file.name)["P"]
+        assert (P != P_legacy).nnz == 0 and P[0,1] == 0.5
+
 def test_create_reach_form():
     for dtmc in dtmcs:
         print(dtmc)
@@ -36,6 +57,16 @@ def test_mecs():
     components,mec_count = dtmc.maximal_end_components()
     assert (components == np.array([1., 1., 1., 0., 0., 0., 0., 0.])).all()
 
+def test_sccs_long_chain():
+    import numpy as np
+    from scipy.sparse import csr_matrix
+    # a chain 0 -> 1 -> ... -> N-1 that is long enough to overflow the C stack with recursive Tarjan
+    N = 200000
+    P = csr_matrix((np.ones(N), (np.arange(N), np.minimum(np.arange(1,N+1), N-1))), shape=(N,N))
+    components, sccount = DTMC(P).strongly_connected_components()
+    assert sccount == N and components.dtype.kind == "i"
+    assert (components == np.arange(N)[::-1]).all()
+
 def test_minimal_witnesses():
     for dtmc in dtmcs:
         reach_form ,_,_ = ReachabilityForm.reduce(dtmc,"init","target")
@@ -93,14 +124,55 @@ def test_certificates():
                     assert check_max
 
 
+def test_linear_solve():
+    import numpy as np
+    from switss.model import linear_equations
+    from switss.model.linear_equations import solve_linear_system
+    for dtmc in dtmcs:
+        reach_form ,_,_ = ReachabilityForm.reduce(dtmc,"init","target")
+        for method in ["max_z_state", "max_y_state_action"]:
+            lp_result = getattr(reach_form, method)(method="lp")
+            linear_result = getattr(reach_form, method)()
+            assert np.abs(lp_result - linear_result).max() <= 1e-6
+        assert np.abs(reach_form.pr_min(method="topological") - reach_form.pr_min()).max() <= 1e-6
+        # the expected visiting frequencies satisfy A^T y = e_init
+        y = reach_form.max_y_state_action()
+        assert np.abs(reach_form.A.T.dot(y) - (np.arange(len(y)) == reach_form.initial)).max() <= 1e-8
+        # systems above `DIRECT_SOLVE_LIMIT` are solved iteratively
+        for A, b in [(reach_form.A, reach_form.to_target), (reach_form.A.T, np.arange(len(y)) == reach_form.initial)]:
+            direct = solve_linear_system(A, b, method="direct")
+            assert np.abs(solve_linear_system(A, b, method="iterative") - direct).max() <= 1e-8
+            linear_equations.DIRECT_SOLVE_LIMIT = 0
+            try:
+                assert np.abs(solve_linear_system(A, b) - direct).max() <= 1e-8
+            finally:
+                linear_equations.DIRECT_SOLVE_LIMIT = 10**5
+
+def test_fail_tolerance():
+    import numpy as np
+    # state 0 misses 2^-53 of its probability mass, which is still a transition to the fail state by default
+    P = [[0.0, 0.25, 0.7499999999999999],
+         [0.0, 1.0, 0.0],
+         [0.0, 1.0, 0.0]]
+    dtmc = DTMC(P, label_to_states={ "init" : {0}, "target" : {1} })
+    for fail_tolerance, has_fail_edge in [(0., True), (1e-17, True), (2**-53, False), ("rounding", False)]:
+        reach_form ,_,_ = ReachabilityForm.reduce(dtmc,"init","target",fail_tolerance=fail_tolerance)
+        C,N = reach_form.system.P.shape
+        p_fail = reach_form.system.P[reach_form.initial, N-1]
+        assert (p_fail > 0) == has_fail_edge
+        if has_fail_edge:
+            assert p_fail == 2**-53
+
 def test_prmin_prmax():
+    import numpy as np
     for dtmc in dtmcs:
         reach_form ,_,_ = ReachabilityForm.reduce(dtmc,"init","target")
         for solver in solvers:
-            m_z_st = reach_form.max_z_state(solver=solver)
-            m_z_st_act = reach_form.max_z_state_action(solver=solver)
-            m_y_st_act = reach_form.max_y_state_action(solver=solver)
-            m_y_st = reach_form.max_y_state(solver=solver)
+            # DTMCs use "linear" by default, which ignores the solver
+            m_z_st = reach_form.max_z_state(solver=solver,method="lp")
+            m_z_st_act = reach_form.max_z_state_action(solver=solver,method="lp")
+            m_y_st_act = reach_form.max_y_state_action(solver=solver,method="lp")
+            m_y_st = reach_form.max_y_state(solver=solver,method="lp")
 
             for vec in [m_z_st,m_z_st_act,m_y_st,m_y_st_act]:
                 assert (vec >= -1e-8).all()
@@ -108,13 +180,21 @@ def test_prmin_prmax():
             for vec in [m_z_st,m_z_st_act]:
                 assert (vec <= 1+1e-8).all()
 
-            pr_min = reach_form.pr_min()
-            pr_max = reach_form.pr_max()
+            pr_min = reach_form.pr_min(solver=solver,method="lp")
+            pr_max = reach_form.pr_max(solver=solver,method="lp")
 
             for vec in [pr_min,pr_max]:
-                assert (vec <= 1).all() and (vec >= 0).all()
+                assert (vec <= 1+1e-8).all() and (vec >= -1e-8).all()
+
+            assert np.abs(pr_min - pr_max).max() <= 1e-8
 
-            assert (pr_min == pr_max).all()
+            # the linear equation system has the same solutions as the LPs
+            for vec, linear_vec in [(m_z_st, reach_form.max_z_state(method="linear")),
+                                    (m_z_st_act, reach_form.max_z_state_action(method="linear")),
+                                    (m_y_st_act, reach_form.max_y_state_action(method="linear")),
+                                    (m_y_st, reach_form.max_y_state(method="linear")),
+                                    (pr_max, reach_form.pr_max(method="linear"))]:
+                assert np.abs(vec - linear_vec).max() <= 1e-6
 
             pr_min_at_init = pr_min[reach_form.initial]
             pr_max_at_init = pr_max[reach_form.initial]
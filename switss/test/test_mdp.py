@@ -1,13 +1,13 @@
 from switss.model import MDP, ReachabilityForm
-from switss.problem import MILPExact, QSHeur
+from switss.problem import MILPExact, QSHeur, Subsystem
 from switss.certification import generate_farkas_certificate,check_farkas_certificate
 import switss.problem.qsheurparams as qsparam
-from .example_models import example_mdps, toy_mdp2
+from .example_models import example_mdps, toy_mdp1, toy_mdp2
 import tempfile
 
 mdps = example_mdps()
-lp_solvers = ["cbc","gurobi","glpk","cplex"]
-milp_solvers = ["cbc","gurobi","cplex"]
+lp_solvers = ["cbc","gurobi","glpk","cplex","highs"]
+milp_solvers = ["cbc","gurobi","cplex","highs"]
 
 def test_read_write():
     for mdp in mdps:
@@ -17,6 +17,137 @@ def test_read_write():
             read_mdp = MDP.from_file(
                 namedtf.name + ".lab", namedtf.name + ".tra")
 
+def test_read_write_binary():
+    for mdp in mdps:
+        with tempfile.TemporaryDirectory() as dirname:
+            mdp.save_binary(dirname)
+            for mmap in [True, False]:
+                read_mdp = MDP.load_binary(dirname, mmap=mmap)
+                assert (read_mdp.P != mdp.P).nnz == 0
+                assert dict(read_mdp.index_by_state_action) == dict(mdp.index_by_state_action)
+                assert dict(read_mdp.states_by_label.items()) == dict(mdp.states_by_label.items())
+                assert dict(read_mdp.actions_by_label.items()) == dict(mdp.actions_by_label.items())
+
+def test_pickle():
+    import pickle
+    import numpy as np
+    for mdp in mdps:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        for model in [mdp, mdp.share_memory()]:
+            read_mdp = pickle.loads(pickle.dumps(model))
+            assert (read_mdp.P != mdp.P).nnz == 0
+            assert dict(read_mdp.index_by_state_action) == dict(mdp.index_by_state_action)
+            assert dict(read_mdp.states_by_label.items()) == dict(mdp.states_by_label.items())
+            assert dict(read_mdp.actions_by_label.items()) == dict(mdp.actions_by_label.items())
+            if model.shared_memory is not None:
+                # the unpickled model uses the same shared memory block
+                assert read_mdp.shared_memory.name == model.shared_memory.name
+                model.unlink_shared_memory()
+        read_reach_form = pickle.loads(pickle.dumps(reach_form))
+        assert read_reach_form.initial == reach_form.initial
+        assert np.allclose(read_reach_form.pr_max(), reach_form.pr_max())
+
+def test_phase_timer():
+    from switss.utils import PhaseTimer
+    for mdp in mdps:
+        with PhaseTimer(memory=True) as timer:
+            reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+            for result in QSHeur(iterations=2).solveiter(reach_form, 0.5, "max"):
+                result.subsystem.subsys
+        results = timer.results
+        for name in ["reduce", "construct_MILP", "compute_upper_bound", "solve", "export", "solver", "parse", "solveiter", "subsystem"]:
+            assert results[name]["calls"] > 0
+            assert 0 <= results[name]["self_wall_time"] <= results[name]["wall_time"] + 1e-9
+            assert results[name]["peak_memory"] >= 0
+        assert results["solveiter"]["calls"] >= 2
+        # restricted MILPs are recorded separately from full MILPs
+        with PhaseTimer() as rmp_timer:
+            MILPExact(lazy=True).solve(reach_form, 0.5, "max")
+        assert rmp_timer.results["construct_RMP"]["calls"] > 0 and "construct_MILP" not in rmp_timer.results
+        # phases are only recorded while a timer is active
+        ReachabilityForm.reduce(mdp,"init","target")
+        assert timer.results["reduce"]["calls"] == 1
+
+def test_load_transition_matrix():
+    # csma-3-2 has action labels only on some lines
+    for path in ["./examples/datasets/csma-2-2", "./examples/datasets/consensus-2-4", "./examples/datasets/csma-3-2"]:
+        mdp = MDP.from_file(path + ".lab", path + ".tra")
+        mdp_legacy = MDP.from_file(path + ".lab", path + ".tra", legacy_parser=True)
+        assert (mdp.P != mdp_legacy.P).nnz == 0
+        assert dict(mdp.index_by_state_action) == dict(mdp_legacy.index_by_state_action)
+        assert dict(mdp.actions_by_label.items()) == dict(mdp_legacy.actions_by_label.items())
+    # later lines overwrite earlier lines with the same transition
+    with tempfile.NamedTemporaryFile("w", suffix=".tra") as tra_file:
+        tra_file.write("2 2 4\n0 0 1 0.3\n0 0 0 0.5\n0 0 1 0.5\n1 0 1 1\n")
+        tra_file.flush()
+        P = MDP._load_transition_matrix(tra_file.name)["P"]
+        P_legacy = MDP._load_transition_matrix_legacy(tra_file.name)["P"]
+        assert (P != P_legacy).nnz == 0 and P[0,1] == 0.5
+
+def test_transition_matrix_storage():
+    mdp = toy_mdp2()
+    entries = dict(mdp.P.items())
+    assert len(entries) == mdp.P.nnz and entries[(2,2)] == 0.6
+    try:
+        mdp.P[0,0] = 1
+        assert False, "transition matrix should be read-only"
+    except TypeError:
+        pass
+    # lazily built views are freed under a tight memory budget but rebuilt on demand
+    mdp.release_views()
+    MDP.view_memory_budget = 1
+    try:
+        mdp = toy_mdp2()
+        assert (mdp.P_csc != mdp.P).nnz == 0
+        assert len(list(mdp.successors(0))) == 2
+        assert (mdp.P_csc != mdp.P).nnz == 0
+    finally:
+        MDP.view_memory_budget = None
+
+def test_lazy_view_cache():
+    from switss.utils import LazyViewCache, Graph
+    mdp = mdps[0]
+    P_csc = mdp.P.tocsc()
+    csc_bytes = P_csc.data.nbytes + P_csc.indices.nbytes + P_csc.indptr.nbytes
+    index = mdp.index_by_state_action
+    build_graph = lambda: Graph.from_csr(mdp.N, mdp.P.indptr, mdp.P.indices, mdp.P.data, index.row_state, index.row_action)
+    # sparse views count with the size of their arrays
+    cache = LazyViewCache()
+    cache.get("csc", mdp.P.tocsc)
+    assert cache.nbytes == csc_bytes
+    # the CSC view is freed as soon as the graph view is built
+    cache = LazyViewCache(budget=csc_bytes-1)
+    cache.get("csc", mdp.P.tocsc)
+    assert "csc" in cache
+    cache.get("graph", build_graph)
+    assert "csc" not in cache and "graph" in cache
+
+def test_state_action_index():
+    import numpy as np
+    from switss.utils import StateActionIndex
+    mapping = { (0,0) : 0, (0,1) : 1, (1,0) : 2, (2,0) : 3, (2,1) : 4 }
+    index = StateActionIndex.from_dict(mapping)
+    assert dict(index) == mapping
+    assert all(index.inv[idx] == sap for sap,idx in mapping.items())
+    assert (index.rows_of_state(2) == [3,4]).all() and len(index.rows_of_state(3)) == 0
+    assert (index.lookup([2,0,1],[1,0,1]) == [4,0,-1]).all()
+    assert (0,1) in index and (1,1) not in index
+    mdp = toy_mdp2()
+    assert mdp.actions_by_state[0] == {0,1}
+    assert (mdp.index_by_state_action.row_state == [0,0,1,2,3,4,5,6,7]).all()
+
+def test_graph_construction():
+    from switss.utils import Graph
+    mdp = toy_mdp1()
+    index = mdp.index_by_state_action
+    graph = Graph.from_csr(mdp.N, mdp.P.indptr, mdp.P.indices, mdp.P.data, index.row_state, index.row_action)
+    assert graph.get_nodecount() == mdp.N
+    edges = [index.inv[i] + (d,) for (i,d),p in mdp.P.items()]
+    for state in range(mdp.N):
+        assert [(d,a) for d,a,_ in graph.successors(state)] == [(d,a) for s,a,d in edges if s == state]
+        assert [(s,a) for s,a,_ in graph.predecessors(state)] == [(s,a) for s,a,d in edges if d == state]
+        assert list(graph.successors(state)) == list(Graph(mdp.P, index).successors(state))
+
 def test_create_reach_form():
     for mdp in mdps:
         print(mdp)
@@ -32,12 +163,44 @@ def test_mecs():
     mdp = MDP(P,index_by_state_action)
     components,mec_count = mdp.maximal_end_components()
     assert (components == np.array([3., 3., 3., 2., 0., 2., 0., 1.])).all()
+    _,_,actions = mdp.maximal_end_components(with_actions=True)
+    assert set(np.nonzero(actions)[0]) == {0,1,2,5,6,10}
 
 def test_mec_free():
     for mdp in mdps:
         rf ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
         rf._check_mec_freeness()
 
+def test_collapse_mecs():
+    import numpy as np
+    # states 0 and 1 form a MEC that can be left via (0,1) and (1,1)
+    index_by_state_action = { (0,0) : 0, (0,1) : 1, (1,0) : 2, (1,1) : 3, (2,0) : 4, (3,0) : 5, (4,0) : 6 }
+    P = [[0.0, 1.0, 0.0, 0.0, 0.0 ],
+         [0.0, 0.0, 0.5, 0.5, 0.0 ],
+         [1.0, 0.0, 0.0, 0.0, 0.0 ],
+         [0.0, 0.0, 0.3, 0.0, 0.7 ],
+         [0.0, 0.0, 1.0, 0.0, 0.0 ],
+         [0.0, 0.0, 0.0, 1.0, 0.0 ],
+         [0.25,0.0, 0.5, 0.25,0.0 ]]
+    mdp = MDP(P, index_by_state_action, { "leave" : {(1,1)} }, { "init" : {0}, "target" : {2} })
+    reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+    assert not reach_form.is_mec_free()
+    quotient, state_map, state_action_map = reach_form.collapse_mecs()
+    assert quotient.is_mec_free()
+    assert quotient.system.N == reach_form.system.N - 1
+    assert state_map[0] == state_map[1] and (state_action_map[[0,2]] == -1).all()
+    assert quotient.system.states_by_label["init"] == {state_map[0]}
+    assert len(quotient.system.actions_by_label["leave"]) == 1
+    ReachabilityForm.assert_consistency(quotient.system, "init")
+    N = reach_form.system.N-2
+    assert np.allclose(quotient.pr_max(method="vi")[state_map[:N]], reach_form.pr_max(method="vi"))
+    for mdp in mdps:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        mecs, mec_count = reach_form.maximal_end_components()
+        quotient, state_map, _ = reach_form.collapse_mecs()
+        assert quotient.is_mec_free()
+        assert quotient.system.N == reach_form.system.N - np.count_nonzero(mecs) + mec_count
+
 def test_minimal_witnesses():
     # only test the first 2 examples, as the others are too large
     for mdp in mdps[:1]:
@@ -68,6 +231,61 @@ def test_minimal_witnesses():
                 assert max_results[0].status == "optimal"
                 assert len(set([result.status for result in max_results])) == 1
 
+def test_threshold_update():
+    import numpy as np
+    for mdp in mdps[:1]:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        for mode in ["min", "max"]:
+            # the Farkas matrix is shared, only the threshold entry of the rhs changes
+            matr, rhs = reach_form.fark_constraints(0.2, mode)
+            matr2, rhs2 = reach_form.fark_constraints(0.7, mode)
+            idx = reach_form.fark_threshold_index(mode)
+            assert matr is matr2 and rhs[idx] == -0.2 and rhs2[idx] == -0.7
+            assert (np.delete(rhs, idx) == np.delete(rhs2, idx)).all()
+        # a MILPExact instance reuses its MILPs for increasing thresholds
+        for solver in milp_solvers:
+            instance = MILPExact(solver)
+            for threshold in [0.1, 0.3, 0.5, 0.7, 0.9, 0.2]:
+                for mode in ["min", "max"]:
+                    result = instance.solve(reach_form, threshold, mode)
+                    expected = MILPExact(solver).solve(reach_form, threshold, mode)
+                    assert result.status == expected.status
+                    if result.status == "success":
+                        assert np.isclose(result.value, expected.value)
+
+def test_lazy_milp():
+    import numpy as np
+    for mdp in mdps[:2]:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        for solver in milp_solvers:
+            # the restricted MILPs are also reused for increasing thresholds
+            lazy = MILPExact(solver, lazy=True, batch_size=2, lookahead=1)
+            for threshold in [0.1, 0.3, 0.5, 0.2]:
+                for mode in ["min", "max"]:
+                    result = lazy.solve(reach_form, threshold, mode)
+                    expected = MILPExact(solver).solve(reach_form, threshold, mode)
+                    assert result.status == expected.status
+                    if result.status == "success":
+                        assert np.isclose(result.value, expected.value)
+                        assert check_farkas_certificate(reach_form, mode, ">=", threshold, result.farkas_cert, tol=1e-5)
+            # fractional timeouts are not truncated to 0 seconds
+            result = MILPExact(solver, lazy=True).solve(reach_form, 0.3, "min", timeout=0.5)
+            assert result.status != "notsolved"
+
+def test_benchmark_workers():
+    from switss.benchmarks import run
+    reach_form ,_,_ = ReachabilityForm.reduce(toy_mdp2(),"init","target")
+    for mode in ["min", "max"]:
+        method = QSHeur(iterations=2)
+        sequential = run(reach_form, method, mode, from_thr=0.1, to_thr=0.9, step=0.1)
+        parallel = run(reach_form, method, mode, from_thr=0.1, to_thr=0.9, step=0.1, workers=2)
+        # the runs stop at the first infeasible threshold
+        assert 0 < len(parallel["run"]) == len(sequential["run"]) < 9
+        for els_seq, els_par in zip(sequential["run"], parallel["run"]):
+            assert els_seq["threshold"] == els_par["threshold"]
+            assert els_seq["statecounts"] == els_par["statecounts"]
+            assert els_par["worker"] in [0, 1]
+
 def test_label_based_exact_min():
     ex_mdp = toy_mdp2()
     reach_form ,_,_ = ReachabilityForm.reduce(ex_mdp,"init","target")
@@ -158,6 +376,223 @@ def test_prmin_prmax():
 
             assert (fark_cert_min is not None) and (fark_cert_max is not None)
 
+def test_value_iteration():
+    import numpy as np
+    for mdp in mdps:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        for method in ["pr_min", "pr_max", "max_z_state_action"]:
+            lp_result = getattr(reach_form, method)()
+            vi_result = getattr(reach_form, method)(method="vi")
+            assert np.abs(lp_result - vi_result).max() <= 1e-6
+
+def test_topological_iteration():
+    import numpy as np
+    from switss.model.value_iteration import topological_iteration
+    for mdp in mdps:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        C,N = reach_form.system.C-2, reach_form.system.N-2
+        P = reach_form.system.P[:C,:N]
+        index = reach_form.system.index_by_state_action.restrict(C)
+        sccs, _ = reach_form.strongly_connected_components()
+        mecs, _, mec_actions = reach_form.maximal_end_components(with_actions=True)
+        for mode in ["min", "max"]:
+            lp_result = getattr(reach_form, "pr_" + mode)()
+            # without the graph analyses of `qualitative_states`, all SCCs are solved
+            result = topological_iteration(P, reach_form.to_target.A1, index, mode, sccs, mecs=(mecs, mec_actions))
+            assert np.abs(lp_result - result).max() <= 1e-6
+            assert np.abs(lp_result - getattr(reach_form, "pr_" + mode)(method="topological")).max() <= 1e-6
+
+def test_reduce_as_arrays():
+    for mdp in mdps:
+        _, state_map, state_action_map = ReachabilityForm.reduce(mdp,"init","target")
+        _, state_arr, state_action_arr = ReachabilityForm.reduce(mdp,"init","target",as_arrays=True)
+        assert dict(state_map) == { s : t for s,t in enumerate(state_arr) if t != -1 }
+        index = mdp.index_by_state_action
+        for (s,a), (t,b) in state_action_map.items():
+            assert state_action_arr[index[(s,a)]] != -1 and (t,b) == (state_arr[s],a)
+        assert (state_action_arr != -1).sum() == len(state_action_map)
+
+def test_bisimulation_quotient():
+    import numpy as np
+    from switss.model import bisimulation_quotient, lift_certificate
+    for mdp in mdps:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        quotient, block_map, row_map = bisimulation_quotient(reach_form)
+        assert quotient.system.N <= reach_form.system.N
+        ReachabilityForm.assert_consistency(quotient.system, "init", "rf_target", "rf_fail")
+        # bisimilar states have the same probabilities
+        for method in ["pr_min", "pr_max"]:
+            assert np.allclose(getattr(quotient, method)()[block_map[:-2]], getattr(reach_form, method)())
+        # every row has a row with the same distribution over blocks in the quotient
+        blocks = np.eye(quotient.system.N)[block_map]
+        assert np.allclose(reach_form.system.P.dot(blocks), quotient.system.P[row_map].todense())
+        # witnesses of the quotient are lifted to witnesses of the RF
+        threshold = 0.5*quotient.pr_min()[quotient.initial]
+        result = MILPExact().solve(quotient, threshold, "min")
+        certificate = lift_certificate(reach_form, result.farkas_cert, block_map, "min")
+        assert check_farkas_certificate(reach_form, "min", ">=", threshold, certificate, tol=1e-5)
+        witness = Subsystem(reach_form, certificate, "min")
+        assert witness.subsys.pr_min()[witness.subsys.initial] >= threshold - 1e-8
+        # frequencies of state-action pairs can't be copied to bisimilar states
+        try:
+            lift_certificate(reach_form, np.ones(quotient.system.C-2), block_map, "max")
+            assert False, "'max'-mode certificates should be rejected"
+        except AssertionError as err:
+            assert "min" in str(err)
+
+def test_qualitative_states():
+    import numpy as np
+    index_by_state_action = { (0,0) : 0, (0,1) : 1, (1,0) : 2, (1,1) : 3, (2,0) : 4, (3,0) : 5 }
+    P = [[0.0, 0.5, 0.5, 0.0],
+         [0.0, 0.0, 0.0, 1.0],
+         [0.0, 1.0, 0.0, 0.0],
+         [0.0, 0.0, 1.0, 0.0],
+         [0.0, 0.0, 1.0, 0.0],
+         [0.0, 0.0, 0.0, 1.0]]
+    mdp = MDP(P, index_by_state_action, {}, { "init" : {0}, "target" : {2} })
+    assert (mdp.prob0_mask({2}, "min") == [True, True, False, True]).all()
+    assert (mdp.prob0_mask({2}, "max") == [False, False, False, True]).all()
+    assert (mdp.prob1_mask({2}, "min") == [False, False, True, False]).all()
+    assert (mdp.prob1_mask({2}, "max") == [True, True, True, False]).all()
+    for mdp in mdps:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        for mode in ["min", "max"]:
+            zero, one = reach_form.qualitative_states(mode)
+            vi_result = getattr(reach_form, "pr_" + mode)(method="vi")
+            assert ((vi_result <= 1e-8) == zero).all() and ((vi_result >= 1-1e-8) == one).all()
+
+def test_full_subsystem():
+    import numpy as np
+    from switss.problem import Subsystem
+    for mdp in mdps:
+        reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        certificate = np.ones(reach_form.system.C-2)
+        subsys = Subsystem(reach_form, certificate, "max").subsys
+        # keeping every state yields the same RF
+        assert (subsys.system.P != reach_form.system.P).nnz == 0
+        assert dict(subsys.system.index_by_state_action) == dict(reach_form.system.index_by_state_action)
+        assert dict(subsys.system.actions_by_label.items()) == dict(reach_form.system.actions_by_label.items())
+
+def test_constraints_matrix():
+    import numpy as np
+    from switss.solver import MILP
+    A = np.array([[2,1],[4,-1],[-8,2],[-1,0],[0,-1]])
+    b = np.array([10,8,2,0,0])
+    for solver in milp_solvers:
+        rowwise = MILP(objective="max")
+        rowwise.add_variables("integer", "real")
+        for row, rhs in zip(A, b):
+            rowwise.add_constraint([(0, row[0]), (1, row[1])], "<=", rhs)
+        rowwise.set_objective_function([(0, 1), (1, 1)])
+        bulk = MILP.from_coefficients(A, b, np.ones(2), ["integer", "real"], objective="max")
+        for model in [rowwise, bulk]:
+            result = model.solve(solver)
+            assert result.status == "optimal" and np.allclose(result.result_vector, [2,6])
+
+def test_variable_bounds():
+    import numpy as np
+    from switss.solver import LP
+    for solver in lp_solvers:
+        lp = LP(objective="max")
+        x, y = lp.add_variables(2, lb=0, ub=[3, np.inf])
+        lp.add_constraint([(x, 1), (y, 2)], "<=", 10)
+        lp.set_objective_function([(x, 2), (y, 1)])
+        result = lp.solve(solver)
+        assert result.status == "optimal" and np.allclose(result.result_vector, [3, 3.5])
+        lp.set_bounds([y], ub=1)
+        result = lp.solve(solver)
+        assert result.status == "optimal" and np.allclose(result.result_vector, [3, 1])
+
+def test_solver_session():
+    import numpy as np
+    from switss.solver import LP, SolverSession
+    for solver in lp_solvers:
+        lp = LP(objective="max")
+        x, y = lp.add_variables(2, lb=0, ub=[3, np.inf])
+        c = lp.add_constraint([(x, 1), (y, 2)], "<=", 10)
+        lp.set_objective_function([(x, 2), (y, 1)])
+        session = SolverSession(lp, solver)
+        # only HiGHS is warm-started
+        assert session.persistent == (solver == "highs")
+        result = session.solve()
+        assert result.status == "optimal" and np.allclose(result.result_vector, [3, 3.5])
+        # modifications are passed to the solver and the problem
+        session.set_rhs([c], 4)
+        session.set_objective_function([(y, 3)])
+        result = session.solve()
+        assert result.status == "optimal" and np.allclose(result.result_vector, [3, 0.5])
+        session.add_constraint([(y, 1)], "<=", 1)
+        session.set_bounds([x], ub=2)
+        result = session.solve()
+        assert result.status == "optimal" and np.allclose(result.result_vector, [2, 1])
+        assert np.isclose(result.value, lp.solve(solver).value)
+        # right hand sides of added constraints can be changed as well
+        e = session.add_constraint([(x, 1), (y, 1)], "=", 3)
+        session.set_rhs([e], 2)
+        result = session.solve()
+        assert result.status == "optimal" and np.allclose(result.result_vector, [1, 1])
+        assert np.isclose(result.value, lp.solve(solver).value)
+
+def test_qsheur_threshold_sweep():
+    # a QSHeur instance that is used for several thresholds keeps its LPs, but returns the same results
+    # as a new instance for every threshold
+    for mdp in [toy_mdp1(), toy_mdp2()]:
+        reach_form,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+        for updatertype in [qsparam.InverseResultUpdater, qsparam.InverseResultFixedZerosUpdater]:
+            for mode in ["min","max"]:
+                method = QSHeur(iterations=3, updatertype=updatertype, solver="cbc")
+                for threshold in [0.1, 0.3, 0.2, 0.5]:
+                    fresh = QSHeur(iterations=3, updatertype=updatertype, solver="cbc")
+                    results = method.solveiter(reach_form, threshold, mode)
+                    fresh_results = fresh.solveiter(reach_form, threshold, mode)
+                    for result, fresh_result in zip(results, fresh_results):
+                        assert result.status == fresh_result.status
+                        assert result.value == fresh_result.value
+
+def test_result_cache():
+    import numpy as np
+    import os
+    for mdp in mdps:
+        with tempfile.TemporaryDirectory() as dirname:
+            ReachabilityForm.cache_directory = dirname
+            try:
+                reach_form ,_,_ = ReachabilityForm.reduce(mdp,"init","target")
+                pr_max = reach_form.pr_max()
+                # results are cached in memory and on disk
+                pr_max[:] = -1
+                assert (reach_form.pr_max() >= 0).all()
+                assert os.path.isfile(os.path.join(dirname, reach_form.content_hash, "pr_max-lp-cbc.npy"))
+                mecs, mec_count = reach_form.maximal_end_components()
+                # a RF with the same content reuses the stored results
+                same_form = ReachabilityForm(reach_form.system, reach_form.initial_label)
+                assert same_form.content_hash == reach_form.content_hash
+                assert (same_form.pr_max() == reach_form.pr_max()).all()
+                assert (same_form.maximal_end_components()[0] == mecs).all()
+                assert same_form.maximal_end_components()[1] == mec_count
+                reach_form.clear_cache(persisted=True)
+                assert os.listdir(os.path.join(dirname, reach_form.content_hash)) == []
+            finally:
+                ReachabilityForm.cache_directory = None
+
+def test_result_cache_missing_results():
+    import numpy as np
+    import os
+    from switss.utils import ResultCache
+    calls = []
+    def compute(result):
+        calls.append(result)
+        return result
+    with tempfile.TemporaryDirectory() as dirname:
+        cache = ResultCache(directory=dirname, hash="hash")
+        # results of failed analyses are computed again and not persisted
+        for result in [None, (np.zeros(2), None)]:
+            for _ in range(2):
+                assert cache.get(("failed",), lambda: compute(result)) is result
+        assert len(calls) == 4 and len(cache) == 0 and ("failed",) not in cache
+        assert not os.path.isdir(os.path.join(dirname, "hash"))
+        assert (cache.get(("solved",), lambda: compute(np.ones(2))) == 1).all()
+        assert (ResultCache(directory=dirname, hash="hash").get(("solved",), lambda: None) == 1).all()
+
 def test_heuristics():
     initializers = [qsparam.AllOnesInitializer,
                     qsparam.InverseReachabilityInitializer,
@@ -1,4 +1,10 @@
 from .invertible_dict import InvertibleDict
 from .graphviz_utils import color_from_hash, VisualizationConfig, DTMCVisualizationConfig, std_action_map
-from .casting import cast_dok_matrix
-from .graph import Graph
\ No newline at end of file
+from .casting import cast_dok_matrix, cast_csr_matrix
+from .transition_matrix import TransitionMatrix
+from .lazy_views import LazyViewCache
+from .state_action_index import StateActionIndex
+from .graph import Graph
+from .result_cache import ResultCache, content_hash
+from .shared_arrays import SharedArrays
+from .phases import PhaseTimer, phase
\ No newline at end of file
@@ -1,5 +1,5 @@
 import numpy as np
-from scipy.sparse import dok_matrix, spmatrix
+from scipy.sparse import dok_matrix, csr_matrix, spmatrix
 
 def cast_dok_matrix(obj):
     """Casts a 1d or 2d-object as a `scipy.sparse.dok_matrix`. 
@@ -15,4 +15,25 @@ def cast_dok_matrix(obj):
         if len(obj.shape) == 1:
             obj = np.array([obj]).T
     
-    return dok_matrix(obj)
\ No newline at end of file
+    return dok_matrix(obj)
+
+def cast_csr_matrix(obj):
+    """Casts a 1d or 2d-object as a `scipy.sparse.csr_matrix` in canonical format (i.e. 
+    without duplicate entries and with sorted indices). If the input is 1d, it will create 
+    a (:math:`N \\times 1`) `csr_matrix`.
+
+    :param obj: Input array/list/sparse matrix.
+    :type obj: 1d or 2d-object type
+    :return: Resulting csr_matrix.
+    :rtype: scipy.sparse.csr_matrix
+    """
+    if not isinstance(obj, spmatrix):
+        obj = np.array(obj)
+        if len(obj.shape) == 1:
+            obj = np.array([obj]).T
+
+    obj = csr_matrix(obj)
+    if not obj.has_canonical_format:
+        obj = obj.copy()
+        obj.sum_duplicates()
+    return obj
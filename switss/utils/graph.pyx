@@ -2,8 +2,8 @@
 
 from libc.stdlib cimport malloc, free
 import numpy as np
-from scipy.sparse import dok_matrix
-from bidict import bidict
+from scipy.sparse import dok_matrix, csr_matrix
+from switss.utils.state_action_index import StateActionIndex
 
 ctypedef (int,int,float) SAPPair
 
@@ -30,109 +30,217 @@ cdef void freestack(Stack* stack):
         free(current)
         current = tmp
 
-cdef struct Node:
-    SAPPair *predecessors
-    SAPPair *successors
-    int predcount, succcount 
-
 cdef struct TarjanNode:
     int index, lowlink
     int onstack
 
-cdef struct SubMDP:
-    int* E
-    SAPPair* F
-    int nodecount, sapcount
-
 cdef class Graph:
-    cdef Node *nodes
+    # successors of node v are stored in succs[succ_offsets[v]:succ_offsets[v+1]], predecessors analogously.
+    # succ_rows (pred_rows) contains the row (i.e. state-action pair) of every successor (predecessor) edge,
+    # row_nodes the node of every row.
     cdef int nodecount
+    cdef long rowcount
+    cdef long *succ_offsets
+    cdef long *pred_offsets
+    cdef SAPPair *succs
+    cdef SAPPair *preds
+    cdef long *succ_rows
+    cdef long *pred_rows
+    cdef long *row_nodes
 
     def __cinit__(self, P=None, index_by_state_action=None):
+        self.nodecount = 0
+        self.rowcount = 0
+        self.succ_rows = NULL
+        self.pred_rows = NULL
+        self.row_nodes = NULL
+        self.succ_offsets = NULL
+        self.pred_offsets = NULL
+        self.succs = NULL
+        self.preds = NULL
         if P is not None and index_by_state_action is not None:
-            self.nodecount = P.shape[1]
-            self.nodes = <Node *> malloc(self.nodecount * sizeof(Node))
-            for i in range(self.nodecount):
-                self.nodes[i] = Node(NULL,NULL,0,0)
-            for (i,d),p in P.items():
-                s,a = index_by_state_action.inv[i]
-                self.add_successor(s,a,p,d)
+            index_by_state_action = StateActionIndex.from_dict(index_by_state_action)
+            P = csr_matrix(P)
+            P.sum_duplicates()
+            self.__build_from_csr(P.shape[1], P.indptr, P.indices, P.data, 
+                index_by_state_action.row_state, index_by_state_action.row_action)
+
+    @staticmethod
+    def from_csr(nodecount, indptr, indices, data, row_state, row_action):
+        """Creates a graph from the arrays of a CSR transition matrix and a row-to-state-action mapping
+        (see `utils.StateActionIndex`). Transitions with probability 0 are ignored.
+
+        :param nodecount: Number of nodes (i.e. columns of the transition matrix).
+        :type nodecount: int
+        :param indptr: Row pointers of the CSR matrix.
+        :type indptr: np.ndarray[int]
+        :param indices: Column indices of the CSR matrix.
+        :type indices: np.ndarray[int]
+        :param data: Values of the CSR matrix.
+        :type data: np.ndarray[float]
+        :param row_state: State of every row.
+        :type row_state: np.ndarray[int]
+        :param row_action: Action of every row.
+        :type row_action: np.ndarray[int]
+        :rtype: utils.Graph
+        """
+        graph = Graph()
+        graph.__build_from_csr(nodecount, indptr, indices, data, row_state, row_action)
+        return graph
+
+    def __build_from_csr(self, nodecount, indptr, indices, data, row_state, row_action):
+        indptr = np.asarray(indptr)
+        rows = np.repeat(np.arange(len(indptr)-1), np.diff(indptr))
+        positive = np.asarray(data) > 0
+        rows = rows[positive]
+        self.__build(nodecount, 
+            np.asarray(row_state)[rows], np.asarray(row_action)[rows], 
+            np.asarray(data)[positive], np.asarray(indices)[positive],
+            rows, len(indptr)-1, row_state)
+
+    def __build(self, int nodecount, src, act, prob, dest, rows, long rowcount, row_nodes):
+        # builds the successor and predecessor arrays from a list of edges src -(act,prob)-> dest (where every
+        # edge belongs to a row) using two counting passes: the first one computes the offsets, the second one 
+        # fills in the edges.
+        cdef long[:] rows_v = np.ascontiguousarray(rows, dtype=np.int_)
+        cdef long[:] src_v = np.ascontiguousarray(src, dtype=np.int_)
+        cdef long[:] act_v = np.ascontiguousarray(act, dtype=np.int_)
+        cdef double[:] prob_v = np.ascontiguousarray(prob, dtype=np.double)
+        cdef long[:] dest_v = np.ascontiguousarray(dest, dtype=np.int_)
+        cdef long[:] row_nodes_v = np.ascontiguousarray(row_nodes, dtype=np.int_)
+        cdef long edgecount = src_v.shape[0]
+        cdef long k, v
+        self.__free_nodes()
+        self.nodecount = nodecount
+        self.rowcount = rowcount
+        self.succ_rows = <long *> malloc(max(edgecount,1) * sizeof(long))
+        self.pred_rows = <long *> malloc(max(edgecount,1) * sizeof(long))
+        self.row_nodes = <long *> malloc(max(rowcount,1) * sizeof(long))
+        for k in range(rowcount):
+            self.row_nodes[k] = row_nodes_v[k]
+        self.succ_offsets = <long *> malloc((nodecount+1) * sizeof(long))
+        self.pred_offsets = <long *> malloc((nodecount+1) * sizeof(long))
+        self.succs = <SAPPair *> malloc(max(edgecount,1) * sizeof(SAPPair))
+        self.preds = <SAPPair *> malloc(max(edgecount,1) * sizeof(SAPPair))
+
+        for v in range(nodecount+1):
+            self.succ_offsets[v] = 0
+            self.pred_offsets[v] = 0
+        for k in range(edgecount):
+            self.succ_offsets[src_v[k]+1] += 1
+            self.pred_offsets[dest_v[k]+1] += 1
+        for v in range(nodecount):
+            self.succ_offsets[v+1] += self.succ_offsets[v]
+            self.pred_offsets[v+1] += self.pred_offsets[v]
+
+        cdef long *succ_cursor = <long *> malloc((nodecount+1) * sizeof(long))
+        cdef long *pred_cursor = <long *> malloc((nodecount+1) * sizeof(long))
+        for v in range(nodecount+1):
+            succ_cursor[v] = self.succ_offsets[v]
+            pred_cursor[v] = self.pred_offsets[v]
+        for k in range(edgecount):
+            self.succs[succ_cursor[src_v[k]]] = (dest_v[k], act_v[k], prob_v[k])
+            self.succ_rows[succ_cursor[src_v[k]]] = rows_v[k]
+            succ_cursor[src_v[k]] += 1
+            self.preds[pred_cursor[dest_v[k]]] = (src_v[k], act_v[k], prob_v[k])
+            self.pred_rows[pred_cursor[dest_v[k]]] = rows_v[k]
+            pred_cursor[dest_v[k]] += 1
+        free(succ_cursor)
+        free(pred_cursor)
 
     def get_nodecount(self):
         return self.nodecount
 
-    def subgraph(self, vmask):
-        # compute the size of the subgraph (=#vertices)
-        subgraphsize = 0
-        sub_to_sup = bidict()
-        for i in range(self.nodecount):
-            if vmask[i] == 1: 
-                sub_to_sup[subgraphsize] = i
-                subgraphsize += 1
-
-        cdef Node *nodes = <Node *> malloc(subgraphsize*sizeof(Node)) 
-        for i in range(subgraphsize):
-            nodes[i] = Node(NULL,NULL,0,0)
-        sgraph = Graph()
-        sgraph.nodes = nodes
-        sgraph.nodecount = subgraphsize
-
-        cdef SAPPair* successors
-        for i in range(subgraphsize):
-            orig = sub_to_sup[i]
-            removed_actions = set() # ignore all actions which have successors that are not masked
-            for d,a,p in self.successors(orig):
-                if vmask[d] == 0:
-                    removed_actions.add(a)
-            for d,a,p in self.successors(orig):
-                if a not in removed_actions:
-                    sgraph.add_successor(i,a,p,sub_to_sup.inv[d])
-
-        return sgraph, sub_to_sup
-
-    cdef void add_successor(self, int fromidx, int action, float prob, int toidx):
-        cdef Node* fromnode = &self.nodes[fromidx]
-        cdef Node* tonode = &self.nodes[toidx]
-
-        fromnode[0].succcount += 1
-        cdef SAPPair *newsuccs = <SAPPair *> malloc(fromnode[0].succcount * sizeof(SAPPair))
-        for i in range(fromnode[0].succcount-1):
-            newsuccs[i] = fromnode[0].successors[i]
-        newsuccs[fromnode[0].succcount-1] = (toidx, action, prob)
-        free(fromnode[0].successors)
-        fromnode[0].successors = newsuccs
-
-        tonode[0].predcount += 1
-        cdef SAPPair *newpreds = <SAPPair *> malloc(tonode[0].predcount * sizeof(SAPPair))
-        for i in range(tonode[0].predcount-1):
-            newpreds[i] = tonode[0].predecessors[i]
-        newpreds[tonode[0].predcount-1] = (fromidx, action, prob)
-        free(tonode[0].predecessors)
-        tonode[0].predecessors = newpreds
+    @property
+    def nbytes(self):
+        # amount of memory used by the offset and successor/predecessor arrays
+        if self.succ_offsets == NULL:
+            return 0
+        return 2 * (self.nodecount+1) * sizeof(long) + self.succ_offsets[self.nodecount] * (2 * sizeof(SAPPair) + 2 * sizeof(long)) \
+            + self.rowcount * sizeof(long)
 
     def successors(self, nodeidx, actionidx=None):
-        cdef Node *node = &self.nodes[nodeidx]
-        for i in range(node[0].succcount):
-            if actionidx is None or actionidx == node[0].successors[i][1]:
-                yield node[0].successors[i]
+        for i in range(self.succ_offsets[nodeidx], self.succ_offsets[nodeidx+1]):
+            if actionidx is None or actionidx == self.succs[i][1]:
+                yield self.succs[i]
     
     def predecessors(self, nodeidx, actionidx=None):
-        cdef Node *node = &self.nodes[nodeidx]
-        for i in range(node[0].predcount):
-            if actionidx is None or actionidx == node[0].predecessors[i][1]:
-                yield node[0].predecessors[i]
+        for i in range(self.pred_offsets[nodeidx], self.pred_offsets[nodeidx+1]):
+            if actionidx is None or actionidx == self.preds[i][1]:
+                yield self.preds[i]
 
     def __str__(self):
-        cdef Node *currentnode
         ret = ""
         for i in range(self.nodecount):
-            currentnode = &self.nodes[i]
             ret += str(i) + " ->"
-            for j in range(currentnode[0].succcount):
-                ret += " " + str(currentnode[0].successors[j])
+            for j in range(self.succ_offsets[i], self.succ_offsets[i+1]):
+                ret += " " + str(self.succs[j])
             ret += "\n"
         return ret
 
+    def strongly_connected_components(self):
+        # iterative implementation of Tarjan's Algorithm. Nodes are visited in the same order as in the 
+        # recursive formulation, so components are numbered the same way (in reverse topological order).
+        # callstack simulates the recursion, i.e. contains the path of nodes that are currently visited, 
+        # and nextedge[v] is the position of the next successor of v that needs to be visited.
+        cdef int n = self.nodecount
+        cdef long[:] index = np.full(n, -1, dtype=np.int_)
+        cdef long[:] lowlink = np.zeros(n, dtype=np.int_)
+        cdef long[:] nextedge = np.zeros(n, dtype=np.int_)
+        cdef char[:] onstack = np.zeros(n, dtype=np.int8)
+        cdef long[:] stack = np.zeros(n, dtype=np.int_)
+        cdef long[:] callstack = np.zeros(n, dtype=np.int_)
+        scs_arr = np.zeros(n, dtype=np.int_)
+        cdef long[:] scs = scs_arr
+        cdef long stacksize = 0, callstacksize = 0, counter = 0, sccount = 0
+        cdef long root, v, w, u
+
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack[stacksize] = root
+            stacksize += 1
+            onstack[root] = 1
+            nextedge[root] = self.succ_offsets[root]
+            callstack[callstacksize] = root
+            callstacksize += 1
+
+            while callstacksize > 0:
+                v = callstack[callstacksize-1]
+                if nextedge[v] < self.succ_offsets[v+1]:
+                    w = self.succs[nextedge[v]][0] # -> index of successor state
+                    nextedge[v] += 1
+                    if index[w] == -1:
+                        # "recursive call" on w
+                        index[w] = lowlink[w] = counter
+                        counter += 1
+                        stack[stacksize] = w
+                        stacksize += 1
+                        onstack[w] = 1
+                        nextedge[w] = self.succ_offsets[w]
+                        callstack[callstacksize] = w
+                        callstacksize += 1
+                    elif onstack[w]:
+                        lowlink[v] = min(lowlink[v], index[w])
+                else:
+                    # all successors of v are visited
+                    callstacksize -= 1
+                    if lowlink[v] == index[v]:
+                        w = -1
+                        while w != v:
+                            stacksize -= 1
+                            w = stack[stacksize]
+                            onstack[w] = 0
+                            scs[w] = sccount
+                        sccount += 1
+                    if callstacksize > 0:
+                        u = callstack[callstacksize-1]
+                        lowlink[u] = min(lowlink[u], lowlink[v])
+
+        return scs_arr, sccount
+
     cdef (int,int,Stack*) strongconnect(self, int v, Stack* stack, TarjanNode* tnodes, 
         int i, int* scs, int sccount):
         
@@ -140,9 +248,8 @@ cdef class Graph:
         i += 1
         stack = push(stack, v)
 
-        cdef Node *node = &self.nodes[v]
-        for succidx in range(node[0].succcount):
-            w = node[0].successors[succidx][0] # -> index of successor state
+        for succidx in range(self.succ_offsets[v], self.succ_offsets[v+1]):
+            w = self.succs[succidx][0] # -> index of successor state
             if tnodes[w].index == -1:
                 i,sccount,stack = self.strongconnect(w,stack,tnodes,i,scs,sccount)
                 tnodes[v].lowlink = min(tnodes[v].lowlink,tnodes[w].lowlink)
@@ -160,8 +267,10 @@ cdef class Graph:
         return i,sccount,stack
 
 
-    def strongly_connected_components(self):
-        # Implementation of Tarjan's Algorithm
+    def strongly_connected_components_recursive(self):
+        # recursive implementation of Tarjan's Algorithm. This was replaced by `strongly_connected_components`,
+        # but is kept for benchmarking and checking results (see `benchmarks.run_scc`). 
+        # Long chains of states may overflow the C stack!
         # initialize vector containing strongly connected endcomponents
         cdef int* scs = <int *> malloc(self.nodecount * sizeof(int))
         cdef int sccount = 0
@@ -172,12 +281,13 @@ cdef class Graph:
             tnodes[i].index = -1
 
         cdef Stack *stack = NULL
+        i = 0
         for v in range(self.nodecount):
             if tnodes[v].index == -1:
                 i,sccount,stack = self.strongconnect(v, stack, tnodes, i, scs, sccount)
 
         # copy into numpy array
-        scs_arr = np.zeros(self.nodecount)
+        scs_arr = np.zeros(self.nodecount, dtype=int)
         for i in range(self.nodecount):
             scs_arr[i] = scs[i]
         
@@ -188,48 +298,166 @@ cdef class Graph:
         
         return scs_arr, sccount
 
-    def maximal_end_components(self):
-        # iteratively create sub-graphs. 
-        # but this may be a bit time-consuming, since it involves copying 
-        # quite a few nodes from graphs to subgraphs. 
-        # possible to share objects and instead just point to parent's objects? 
-        # this would avoid unneccessary copying...
-        # we should implement the copy-approach first; it's just simpler and we will
-        # see whether the algorithm really works.
-        ret = np.zeros(self.nodecount)
-        mec_counter = 1
-        stack = [ (self,[]) ]
-        while len(stack) > 0:
-            graph,mappings = stack.pop()
-            components,compcount = graph.strongly_connected_components()
-            
-            if compcount == 1:
-                # make sure that every node has at least one outgoing edge (one action that can be enabled for states in the MDP)
-                ignore_this_graph = False
-                for i in range(graph.get_nodecount()):
-                    if len(list(graph.successors(i))) == 0:
-                        ignore_this_graph = True
+    cdef long __restricted_scc(self, long[:] nodes, long[:] member, long tag, char[:] edge_active,
+        long[:] index, long[:] lowlink, long[:] nextedge, char[:] onstack, 
+        long[:] stack, long[:] callstack, long[:] scs):
+        # iterative Tarjan (see `strongly_connected_components`) on the subgraph induced by all nodes v with
+        # member[v] == tag and all edges e with edge_active[e]. Roots are visited in the order given by `nodes`.
+        # index[v] needs to be -1 for all these nodes. Returns the number of components.
+        cdef long stacksize = 0, callstacksize = 0, counter = 0, sccount = 0
+        cdef long k, e, root, v, w, u
+        for k in range(nodes.shape[0]):
+            root = nodes[k]
+            if index[root] != -1:
+                continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack[stacksize] = root
+            stacksize += 1
+            onstack[root] = 1
+            nextedge[root] = self.succ_offsets[root]
+            callstack[callstacksize] = root
+            callstacksize += 1
+
+            while callstacksize > 0:
+                v = callstack[callstacksize-1]
+                if nextedge[v] < self.succ_offsets[v+1]:
+                    e = nextedge[v]
+                    nextedge[v] += 1
+                    if not edge_active[e]:
+                        continue
+                    w = self.succs[e][0]
+                    if index[w] == -1:
+                        index[w] = lowlink[w] = counter
+                        counter += 1
+                        stack[stacksize] = w
+                        stacksize += 1
+                        onstack[w] = 1
+                        nextedge[w] = self.succ_offsets[w]
+                        callstack[callstacksize] = w
+                        callstacksize += 1
+                    elif onstack[w]:
+                        lowlink[v] = min(lowlink[v], index[w])
+                else:
+                    callstacksize -= 1
+                    if lowlink[v] == index[v]:
+                        w = -1
+                        while w != v:
+                            stacksize -= 1
+                            w = stack[stacksize]
+                            onstack[w] = 0
+                            scs[w] = sccount
+                        sccount += 1
+                    if callstacksize > 0:
+                        u = callstack[callstacksize-1]
+                        lowlink[u] = min(lowlink[u], lowlink[v])
+        return sccount
+
+    def maximal_end_components(self, with_actions=False):
+        # iterative SCC-refinement that works on this graph only: the current candidate set of nodes is marked in 
+        # `member` and an action of a candidate node is active iff all of its successors are candidates, too. 
+        # If the active subgraph of a candidate set is strongly connected and every node has an active action, 
+        # the set is a MEC. Otherwise, every SCC becomes a new candidate set. 
+        # Candidate sets are stored as consecutive ranges of `order`, and are processed in LIFO-order.
+        cdef long n = self.nodecount
+        cdef long edgecount = self.succ_offsets[n] if n > 0 else 0
+        ret_arr = np.zeros(n, dtype=np.int_)
+        cdef long[:] ret = ret_arr
+        cdef long[:] member = np.full(n, -1, dtype=np.int_)
+        cdef char[:] edge_active = np.zeros(max(edgecount,1), dtype=np.int8)
+        cdef long[:] order = np.arange(n, dtype=np.int_)
+        cdef long[:] tmp = np.zeros(n, dtype=np.int_)
+        cdef long[:] counts = np.zeros(n+1, dtype=np.int_)
+        cdef long[:] rangestarts = np.zeros(n+1, dtype=np.int_)
+        cdef long[:] rangeends = np.zeros(n+1, dtype=np.int_)
+        cdef long[:] index = np.full(n, -1, dtype=np.int_)
+        cdef long[:] lowlink = np.zeros(n, dtype=np.int_)
+        cdef long[:] nextedge = np.zeros(n, dtype=np.int_)
+        cdef char[:] onstack = np.zeros(n, dtype=np.int8)
+        cdef long[:] stack = np.zeros(n, dtype=np.int_)
+        cdef long[:] callstack = np.zeros(n, dtype=np.int_)
+        cdef long[:] scs = np.zeros(n, dtype=np.int_)
+        cdef long rangecount = 0, tag = 0, mec_counter = 1
+        cdef long start, end, k, v, e, f, g, row, sccount, c
+        cdef char active, is_mec
+
+        if n > 0:
+            rangestarts[0], rangeends[0] = 0, n
+            rangecount = 1
+
+        while rangecount > 0:
+            rangecount -= 1
+            start, end = rangestarts[rangecount], rangeends[rangecount]
+            tag += 1
+            for k in range(start, end):
+                member[order[k]] = tag
+                index[order[k]] = -1
+
+            # an action is active iff all its successors are candidates
+            for k in range(start, end):
+                v = order[k]
+                e = self.succ_offsets[v]
+                while e < self.succ_offsets[v+1]:
+                    row, active, f = self.succ_rows[e], 1, e
+                    while f < self.succ_offsets[v+1] and self.succ_rows[f] == row:
+                        if member[self.succs[f][0]] != tag:
+                            active = 0
+                        f += 1
+                    for g in range(e, f):
+                        edge_active[g] = active
+                    e = f
+
+            sccount = self.__restricted_scc(order[start:end], member, tag, edge_active, 
+                index, lowlink, nextedge, onstack, stack, callstack, scs)
+
+            if sccount == 1:
+                # make sure that every node has at least one active action
+                is_mec = 1
+                for k in range(start, end):
+                    v = order[k]
+                    active = 0
+                    for e in range(self.succ_offsets[v], self.succ_offsets[v+1]):
+                        if edge_active[e]:
+                            active = 1
+                            break
+                    if not active:
+                        is_mec = 0
                         break
-                if ignore_this_graph: continue
-                
-                # cannot be reduced much further,
-                # trace chain of mappings back to root graph 
-                states = mappings[-1].keys()
-                mapped_states = set()
-                for mapping in mappings[::-1]:
-                    for state in states:
-                        mapped_states.add(mapping[state])
-                    states = mapped_states
-                    mapped_states = set()
-                
-                for state in states:
-                    ret[state] = mec_counter
-                mec_counter += 1
+                if is_mec:
+                    for k in range(start, end):
+                        ret[order[k]] = mec_counter
+                    mec_counter += 1
             else:
-                sgs = [ graph.subgraph(components == i) for i in range(compcount) ]
-                stack += [ (subgraph, mappings + [to_sup]) for subgraph,to_sup in sgs ]
-        return ret, mec_counter-1
-
+                # sort the candidates by their component (stable, so every range stays in ascending order) 
+                for c in range(sccount+1):
+                    counts[c] = 0
+                for k in range(start, end):
+                    counts[scs[order[k]]+1] += 1
+                for c in range(sccount):
+                    counts[c+1] += counts[c]
+                for k in range(start, end):
+                    v = order[k]
+                    tmp[counts[scs[v]]] = v
+                    counts[scs[v]] += 1
+                # counts[c] now is the end of component c
+                for k in range(start, end):
+                    order[k] = tmp[k-start]
+                for c in range(sccount):
+                    rangestarts[rangecount] = start + (counts[c-1] if c > 0 else 0)
+                    rangeends[rangecount] = start + counts[c]
+                    rangecount += 1
+
+        if not with_actions:
+            return ret_arr, mec_counter-1
+
+        # actions of MEC nodes are not touched after the MEC was found, so edge_active is still up to date
+        actions_arr = np.zeros(self.rowcount, dtype=bool)
+        cdef char[:] actions = actions_arr.view(np.int8)
+        for v in range(n):
+            if ret[v] > 0:
+                for e in range(self.succ_offsets[v], self.succ_offsets[v+1]):
+                    actions[self.succ_rows[e]] = edge_active[e]
+        return ret_arr, mec_counter-1, actions_arr
 
     def reachable(self, fromset, direction, blocklist=set()):
         assert len(fromset) > 0
@@ -239,8 +467,7 @@ cdef class Graph:
         cdef int* instack = <int *> malloc(self.nodecount * sizeof(int))
         cdef Stack *stack = NULL
         cdef int currentidx
-        cdef Node *currentnode
-        cdef int neighbourcount
+        cdef long neighbourstart, neighbourend
         cdef SAPPair* neighbours
         cdef int* blockmask = <int *> malloc(self.nodecount * sizeof(int))
 
@@ -259,25 +486,24 @@ cdef class Graph:
 
         while stack != NULL:
             stack, currentidx = pop(stack)
-            currentnode = &self.nodes[currentidx]
             instack[currentidx] = 0
             reachablemask[currentidx] = 1
 
             if not blockmask[currentidx]:
                 if direction == "forward":
-                    neighbourcount = currentnode[0].succcount
-                    neighbours = currentnode[0].successors
+                    neighbourstart, neighbourend = self.succ_offsets[currentidx], self.succ_offsets[currentidx+1]
+                    neighbours = self.succs
                 else:
-                    neighbourcount = currentnode[0].predcount
-                    neighbours = currentnode[0].predecessors
+                    neighbourstart, neighbourend = self.pred_offsets[currentidx], self.pred_offsets[currentidx+1]
+                    neighbours = self.preds
 
-                for idx in range(neighbourcount):
+                for idx in range(neighbourstart, neighbourend):
                     neighidx,_,_ = neighbours[idx]
                     if not reachablemask[neighidx] and not instack[neighidx]:
                         instack[neighidx] = 1
                         stack = push(stack, neighidx)
 
-        ret = np.zeros(self.nodecount, dtype=np.bool)
+        ret = np.zeros(self.nodecount, dtype=bool)
         for i in range(self.nodecount):
             ret[i] = reachablemask[i]
 
@@ -287,11 +513,166 @@ cdef class Graph:
         freestack(stack)
         return ret
     
+    def __node_mask(self, nodes):
+        mask = np.zeros(self.nodecount, dtype=np.int8)
+        mask[np.fromiter(nodes, dtype=np.int_, count=len(nodes))] = 1
+        return mask
+
+    def __backward_closure(self, char[:] start, char[:] avoid):
+        # marks all nodes that reach a start node via nodes that are not avoided (breadth-first search)
+        cdef long n = self.nodecount
+        ret_arr = np.zeros(n, dtype=bool)
+        cdef char[:] marked = ret_arr.view(np.int8)
+        cdef long[:] queue = np.zeros(max(n,1), dtype=np.int_)
+        cdef long head = 0, tail = 0, v, u, e
+        for v in range(n):
+            if start[v]:
+                marked[v] = 1
+                queue[tail] = v
+                tail += 1
+        while head < tail:
+            v = queue[head]
+            head += 1
+            for e in range(self.pred_offsets[v], self.pred_offsets[v+1]):
+                u,_,_ = self.preds[e]
+                if not marked[u] and not avoid[u]:
+                    marked[u] = 1
+                    queue[tail] = u
+                    tail += 1
+        return ret_arr
+
+    def prob0a(self, targets):
+        """Computes all nodes that reach the targets with probability 0 under all schedulers, i.e. 
+        nodes that can't reach a target at all.
+
+        :param targets: Target nodes.
+        :type targets: Iterable[int]
+        :return: Boolean vector that is True for every such node.
+        :rtype: np.ndarray[bool]
+        """
+        return ~self.__backward_closure(self.__node_mask(targets), np.zeros(self.nodecount, dtype=np.int8))
+
+    def prob0e(self, targets):
+        """Computes all nodes that reach the targets with probability 0 under some scheduler. These are all nodes 
+        that are not in the smallest set :math:`R` that contains the targets and every node whose actions all have
+        a successor in :math:`R`. Runs in time linear in the number of edges.
+
+        :param targets: Target nodes.
+        :type targets: Iterable[int]
+        :return: Boolean vector that is True for every such node.
+        :rtype: np.ndarray[bool]
+        """
+        cdef long n = self.nodecount
+        cdef char[:] target = self.__node_mask(targets)
+        in_r_arr = np.zeros(n, dtype=bool)
+        cdef char[:] in_r = in_r_arr.view(np.int8)
+        # number of actions of every node that have no successor in R yet
+        cdef long[:] remaining = np.zeros(max(n,1), dtype=np.int_)
+        cdef char[:] hit = np.zeros(max(self.rowcount,1), dtype=np.int8)
+        cdef long[:] queue = np.zeros(max(n,1), dtype=np.int_)
+        cdef long head = 0, tail = 0, v, u, e, row
+        for row in range(self.rowcount):
+            remaining[self.row_nodes[row]] += 1
+        for v in range(n):
+            if target[v]:
+                in_r[v] = 1
+                queue[tail] = v
+                tail += 1
+        while head < tail:
+            v = queue[head]
+            head += 1
+            for e in range(self.pred_offsets[v], self.pred_offsets[v+1]):
+                u,_,_ = self.preds[e]
+                row = self.pred_rows[e]
+                if not hit[row]:
+                    hit[row] = 1
+                    remaining[u] -= 1
+                    if remaining[u] == 0 and not in_r[u]:
+                        in_r[u] = 1
+                        queue[tail] = u
+                        tail += 1
+        return ~in_r_arr
+
+    def prob1a(self, targets):
+        """Computes all nodes that reach the targets with probability 1 under all schedulers, i.e. nodes that
+        can't reach a node of `prob0e` without visiting a target before. Assumes that the probabilities of
+        every action sum up to 1.
+
+        :param targets: Target nodes.
+        :type targets: Iterable[int]
+        :return: Boolean vector that is True for every such node.
+        :rtype: np.ndarray[bool]
+        """
+        prob0e = self.prob0e(targets)
+        return ~self.__backward_closure(prob0e.view(np.int8), self.__node_mask(targets))
+
+    def prob1e(self, targets):
+        """Computes all nodes that reach the targets with probability 1 under some scheduler. Starting with all
+        nodes that can reach a target, the candidate set :math:`U` is shrunk to the set of nodes that reach a target via
+        actions whose successors are all in :math:`U` until it doesn't change anymore. Every iteration runs in time 
+        linear in the number of edges. Assumes that the probabilities of every action sum up to 1.
+
+        :param targets: Target nodes.
+        :type targets: Iterable[int]
+        :return: Boolean vector that is True for every such node.
+        :rtype: np.ndarray[bool]
+        """
+        cdef long n = self.nodecount
+        cdef char[:] target = self.__node_mask(targets)
+        u_arr = ~self.prob0a(targets)
+        cdef char[:] in_u = u_arr.view(np.int8)
+        in_r_arr = np.zeros(n, dtype=bool)
+        cdef char[:] in_r = in_r_arr.view(np.int8)
+        # actions whose successors are all in U
+        cdef char[:] stays = np.zeros(max(self.rowcount,1), dtype=np.int8)
+        cdef long[:] queue = np.zeros(max(n,1), dtype=np.int_)
+        cdef long head, tail, v, w, u, e, row
+        cdef char changed = 1
+        while changed:
+            stays[:] = 1
+            for v in range(n):
+                for e in range(self.succ_offsets[v], self.succ_offsets[v+1]):
+                    w,_,_ = self.succs[e]
+                    if not in_u[w]:
+                        stays[self.succ_rows[e]] = 0
+            head, tail = 0, 0
+            in_r[:] = 0
+            for v in range(n):
+                if target[v] and in_u[v]:
+                    in_r[v] = 1
+                    queue[tail] = v
+                    tail += 1
+            while head < tail:
+                v = queue[head]
+                head += 1
+                for e in range(self.pred_offsets[v], self.pred_offsets[v+1]):
+                    u,_,_ = self.preds[e]
+                    if in_u[u] and not in_r[u] and stays[self.pred_rows[e]]:
+                        in_r[u] = 1
+                        queue[tail] = u
+                        tail += 1
+            changed = 0
+            for v in range(n):
+                if in_u[v] and not in_r[v]:
+                    changed = 1
+                in_u[v] = in_r[v]
+        return u_arr
+
     cdef void __free_nodes(self):
-        for i in range(self.nodecount):
-            free(self.nodes[i].predecessors)
-            free(self.nodes[i].successors)
-        free(self.nodes)
+        free(self.succ_offsets)
+        free(self.pred_offsets)
+        free(self.succs)
+        free(self.preds)
+        free(self.succ_rows)
+        free(self.pred_rows)
+        free(self.row_nodes)
+        self.succ_rows = NULL
+        self.pred_rows = NULL
+        self.row_nodes = NULL
+        self.succ_offsets = NULL
+        self.pred_offsets = NULL
+        self.succs = NULL
+        self.preds = NULL
 
     def __dealloc__(self):
         self.__free_nodes()
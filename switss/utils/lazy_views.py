@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from scipy.sparse import issparse
+
+def _view_nbytes(view):
+    # scipy's sparse matrices have no `nbytes`, so the sizes of their (compressed) arrays are added up
+    if issparse(view):
+        return sum(getattr(view, name).nbytes for name in ["data", "indices", "indptr"] if hasattr(view, name))
+    return getattr(view, "nbytes", 0)
+
+class LazyViewCache:
+    """Stores derived representations ("views") of some data that are built lazily, i.e. only when they are
+    needed for the first time. If a memory budget is given, the least recently used views are freed as soon as the
+    views together use more memory than the budget allows. A freed view is simply rebuilt the next time it is needed.
+
+    .. code-block::
+
+        cache = LazyViewCache(budget=10**9)
+        P_csc = cache.get("csc", lambda: P.tocsc())
+    """
+    def __init__(self, budget=None):
+        """
+        :param budget: Maximal amount of bytes that all views together may use. If None, views are never freed, defaults to None
+        :type budget: int, optional
+        """
+        self.budget = budget
+        self.__views = OrderedDict()
+
+    def get(self, name, builder):
+        """Returns the view with the given name. If it doesn't exist, it is built by calling `builder`.
+
+        :param name: Name of the view.
+        :type name: str
+        :param builder: Function that builds the view.
+        :type builder: () -> Any
+        :return: The view.
+        :rtype: Any
+        """
+        if name in self.__views:
+            self.__views.move_to_end(name)
+            return self.__views[name]
+        view = builder()
+        self.__views[name] = view
+        self.__enforce_budget()
+        return view
+
+    def __enforce_budget(self):
+        if self.budget is None:
+            return
+        # always keep the most recently used view
+        while len(self.__views) > 1 and self.nbytes > self.budget:
+            self.__views.popitem(last=False)
+
+    @property
+    def nbytes(self):
+        """Amount of memory (in bytes) that is used by all views."""
+        return sum(_view_nbytes(view) for view in self.__views.values())
+
+    def release(self, name=None):
+        """Frees a view or all views if no name is given.
+
+        :param name: Name of the view, defaults to None
+        :type name: str, optional
+        """
+        if name is None:
+            self.__views.clear()
+        else:
+            self.__views.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self.__views
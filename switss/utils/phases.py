@@ -0,0 +1,156 @@
+from contextlib import contextmanager
+import time
+import tracemalloc
+
+try:
+    import resource
+except:
+    resource = None
+
+# timers that are currently recording
+_active_timers = []
+# phases that are currently running, innermost last
+_running_phases = []
+
+class _RunningPhase:
+    def __init__(self, name):
+        self.name = name
+        self.wall_start = time.perf_counter()
+        self.proc_start = time.process_time()
+        self.children_wall = 0.
+        self.children_proc = 0.
+        self.memory_start = None
+        self.memory_peak = None
+
+def _max_rss():
+    # peak resident set size of this process (in bytes)
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+@contextmanager
+def phase(name):
+    """Marks a phase of a computation (e.g. the construction of a MILP) whose time and memory usage is recorded
+    by all active `PhaseTimer` instances. If no timer is active, this does nothing. Phases may be nested.
+    Can also be used as a decorator.
+
+    .. code-block::
+
+        with phase("construct_MILP"):
+            ...
+
+        @phase("compute_upper_bound")
+        def compute_upper_bound(...):
+            ...
+
+    :param name: Name of the phase.
+    :type name: str
+    """
+    if len(_active_timers) == 0:
+        yield
+        return
+
+    running = _RunningPhase(name)
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        # the peak is reset for every phase, so the peak of the enclosing phase is saved first
+        if len(_running_phases) > 0 and _running_phases[-1].memory_peak is not None:
+            _running_phases[-1].memory_peak = max(_running_phases[-1].memory_peak, peak)
+        tracemalloc.reset_peak()
+        running.memory_start, running.memory_peak = current, current
+    _running_phases.append(running)
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - running.wall_start
+        proc_time = time.process_time() - running.proc_start
+        _running_phases.pop()
+        peak_memory = None
+        if running.memory_peak is not None and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            running.memory_peak = max(running.memory_peak, peak)
+            peak_memory = running.memory_peak - running.memory_start
+            if len(_running_phases) > 0 and _running_phases[-1].memory_peak is not None:
+                _running_phases[-1].memory_peak = max(_running_phases[-1].memory_peak, running.memory_peak)
+            tracemalloc.reset_peak()
+        if len(_running_phases) > 0:
+            _running_phases[-1].children_wall += wall_time
+            _running_phases[-1].children_proc += proc_time
+        for timer in _active_timers:
+            timer._record(name, wall_time, proc_time,
+                          wall_time - running.children_wall, proc_time - running.children_proc, peak_memory)
+
+class PhaseTimer:
+    """Records the wall time, process time and (optionally) memory usage of all phases (see `phase`) that run while
+    the timer is active, i.e. inside of its `with`-block. The phases of the solve pipeline are "reduce" (see
+    `model.ReachabilityForm.reduce`), "construct_MILP", "construct_RMP" (see `problem.construct_RMP`),
+    "compute_upper_bound", "solve" (see `solver.MILP.solve`) with its subphases "export" (conversion of the
+    problem to the solver's format), "solver" and "parse",
+    "solveiter" (computation of a result in `problem.ProblemFormulation.solveiter`), "subsystem"
+    (see `problem.Subsystem.subsys`) and "bisimulation" (see `model.bisimulation_quotient`).
+
+    .. code-block::
+
+        with PhaseTimer(memory=True) as timer:
+            QSHeur().solve(rf, 0.5, "min")
+        timer.results["solver"]["wall_time"]
+
+    """
+    def __init__(self, memory=False):
+        """
+        :param memory: If True, the peak memory usage of every phase is traced via `tracemalloc`, which slows down
+            all allocations of Python objects, defaults to False
+        :type memory: bool, optional
+        """
+        self.memory = memory
+        self.__results = {}
+        self.__stop_tracing = False
+
+    def __enter__(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__stop_tracing = True
+        _active_timers.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _active_timers.remove(self)
+        if self.__stop_tracing:
+            tracemalloc.stop()
+            self.__stop_tracing = False
+
+    def _record(self, name, wall_time, proc_time, self_wall_time, self_proc_time, peak_memory):
+        if name not in self.__results:
+            self.__results[name] = { "calls" : 0, "wall_time" : 0., "proc_time" : 0.,
+                                     "self_wall_time" : 0., "self_proc_time" : 0. }
+        results = self.__results[name]
+        results["calls"] += 1
+        results["wall_time"] += wall_time
+        results["proc_time"] += proc_time
+        results["self_wall_time"] += self_wall_time
+        results["self_proc_time"] += self_proc_time
+        if peak_memory is not None:
+            results["peak_memory"] = max(results.get("peak_memory", 0), peak_memory)
+        max_rss = _max_rss()
+        if max_rss is not None:
+            results["max_rss"] = max_rss
+
+    @property
+    def results(self):
+        """A dictionary that maps the names of all recorded phases to dictionaries containing
+
+        - "calls": how often the phase was run,
+        - "wall_time", "proc_time": the total wall and process time (in seconds),
+        - "self_wall_time", "self_proc_time": the same without the time spent in nested phases,
+        - "peak_memory": the maximal amount of memory (in bytes) that was allocated during the phase
+          (only if `memory` is True),
+        - "max_rss": the peak resident set size of the process (in bytes) at the end of the phase
+          (if the platform supports it).
+
+        :rtype: Dict[str, Dict[str, float]]
+        """
+        return { name : dict(results) for name, results in self.__results.items() }
+
+    def reset(self):
+        """Removes all recorded results."""
+        self.__results.clear()
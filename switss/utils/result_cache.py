@@ -0,0 +1,109 @@
+import os.path
+import hashlib
+import numpy as np
+
+def content_hash(*arrays):
+    """Computes a hash (as hex string) of the contents, shapes and types of the given arrays.
+
+    :param arrays: Arrays (or anything that can be cast to an array, i.e. numbers).
+    :type arrays: np.ndarray
+    :return: The hash.
+    :rtype: str
+    """
+    sha = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        sha.update(("%s%s" % (array.dtype.str, array.shape)).encode())
+        sha.update(array.tobytes())
+    return sha.hexdigest()
+
+def _is_missing(result):
+    if isinstance(result, tuple):
+        return any(item is None for item in result)
+    return result is None
+
+class ResultCache:
+    """Memoizes the results of (expensive) analyses, e.g. solutions of LPs. Results are arrays, numbers or tuples
+    of both and are stored under a key, i.e. a tuple of strings (e.g. the name of the analysis and the solver that
+    was used). Results that are None (or tuples containing None) are neither kept nor persisted.
+
+    If a directory and a hash of the analysed data are given, results are additionally persisted as .npy/.npz-files
+    in `directory/hash`. The cache then also contains all results that were computed by earlier runs on the same data.
+
+    .. code-block::
+
+        cache = ResultCache(directory="cache", hash=content_hash(P.data, P.indices, P.indptr))
+        x = cache.get(("pr_min", "cbc"), lambda: compute_pr_min(P, "cbc"))
+    """
+    def __init__(self, directory=None, hash=None):
+        """
+        :param directory: Directory where results are persisted. If None, results are only kept in memory, defaults to None
+        :type directory: str, optional
+        :param hash: Hash of the data the results belong to. Required if a directory is given, defaults to None
+        :type hash: str, optional
+        """
+        assert directory is None or hash is not None, "results can only be persisted if a hash is given."
+        self.directory = None if directory is None else os.path.join(directory, hash)
+        self.__results = {}
+
+    def __path(self, key):
+        return os.path.join(self.directory, "-".join(str(part) for part in key))
+
+    def __load(self, key):
+        path = self.__path(key)
+        if os.path.isfile(path + ".npy"):
+            result = np.load(path + ".npy")
+            return result.item() if result.ndim == 0 else result
+        if os.path.isfile(path + ".npz"):
+            with np.load(path + ".npz") as arrays:
+                items = [arrays["arr_%d" % i] for i in range(len(arrays.files))]
+            return tuple(item.item() if item.ndim == 0 else item for item in items)
+        return None
+
+    def __store(self, key, result):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.__path(key)
+        if isinstance(result, tuple):
+            np.savez(path + ".npz", *result)
+        else:
+            np.save(path + ".npy", result)
+
+    def get(self, key, compute):
+        """Returns the result that is stored under the given key. If there is none, it is computed by calling `compute`.
+
+        :param key: The key.
+        :type key: Tuple[str]
+        :param compute: Function that computes the result.
+        :type compute: () -> Any
+        :return: The result.
+        :rtype: Any
+        """
+        if key not in self.__results:
+            result = None if self.directory is None else self.__load(key)
+            if result is None:
+                result = compute()
+                # missing results (e.g. of LPs that couldn't be solved) are computed again next time
+                if _is_missing(result):
+                    return result
+                if self.directory is not None:
+                    self.__store(key, result)
+            self.__results[key] = result
+        return self.__results[key]
+
+    def clear(self, persisted=False):
+        """Removes all results from memory.
+
+        :param persisted: If True, also removes all persisted results, defaults to False
+        :type persisted: bool, optional
+        """
+        self.__results.clear()
+        if persisted and self.directory is not None and os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename.endswith(".npy") or filename.endswith(".npz"):
+                    os.remove(os.path.join(self.directory, filename))
+
+    def __contains__(self, key):
+        return key in self.__results
+
+    def __len__(self):
+        return len(self.__results)
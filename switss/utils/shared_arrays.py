@@ -0,0 +1,105 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+# offsets of arrays in a block are multiples of this (in bytes)
+ALIGNMENT = 64
+
+class SharedArrays:
+    """A set of named NumPy arrays that are stored in one block of shared memory (see `multiprocessing.shared_memory`).
+    Pickling a SharedArrays instance only pickles the name of the block and the layout of the arrays, so
+    unpickling it in another process (e.g. a `multiprocessing` worker) attaches to the same memory instead of
+    copying the arrays. The arrays are read-only.
+
+    The process that created the block owns it and has to free it via `unlink` (or by using the instance as a
+    context manager) as soon as no process needs it anymore.
+
+    .. code-block::
+
+        with SharedArrays({ "data" : P.data, "indices" : P.indices }) as shared:
+            pool.map(work, [shared]*10) # every worker calls shared["data"] etc.
+    """
+    def __init__(self, arrays):
+        """Copies the given arrays into a new block of shared memory.
+
+        :param arrays: Mapping from names to arrays.
+        :type arrays: Dict[str, np.ndarray]
+        """
+        layout, size = [], 0
+        for name, array in arrays.items():
+            array = np.asarray(array)
+            layout.append((name, array.dtype.str, array.shape, size))
+            size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        self.__shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.__layout = layout
+        self.owner = True
+        for (_, dtype, shape, offset), array in zip(layout, arrays.values()):
+            target = np.frombuffer(self.__shm.buf, dtype=dtype, count=int(np.prod(shape)), offset=offset)
+            target[...] = np.asarray(array).ravel()
+
+    @classmethod
+    def _attach(cls, name, layout):
+        shared = cls.__new__(cls)
+        shared.__shm = shared_memory.SharedMemory(name=name)
+        shared.__layout = layout
+        shared.owner = False
+        return shared
+
+    def __reduce__(self):
+        return (SharedArrays._attach, (self.name, self.__layout))
+
+    def __view(self, name):
+        for arrname, dtype, shape, offset in self.__layout:
+            if arrname == name:
+                count = int(np.prod(shape))
+                view = np.frombuffer(self.__shm.buf, dtype=dtype, count=count, offset=offset).reshape(shape)
+                view.flags.writeable = False
+                # the view keeps this instance (and thereby the block) alive
+                return np.asarray(_SharedView(self, view))
+        raise KeyError(name)
+
+    @property
+    def name(self):
+        """The name of the shared memory block."""
+        return self.__shm.name
+
+    @property
+    def nbytes(self):
+        """The size of the shared memory block (in bytes)."""
+        return self.__shm.size
+
+    def keys(self):
+        """Returns the names of all arrays.
+
+        :rtype: List[str]
+        """
+        return [name for name, _, _, _ in self.__layout]
+
+    def __getitem__(self, name):
+        """Returns a (read-only) array that is backed by the shared memory block.
+
+        :param name: Name of the array.
+        :type name: str
+        :rtype: np.ndarray
+        """
+        return self.__view(name)
+
+    def __contains__(self, name):
+        return name in self.keys()
+
+    def unlink(self):
+        """Frees the shared memory block. Arrays that were obtained from it remain valid in every process that
+        still uses them, but no process can attach to the block anymore. Should only be called by the owner."""
+        self.__shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.owner:
+            self.unlink()
+
+class _SharedView:
+    # exposes an array via the array interface, so that arrays created from it reference the SharedArrays instance
+    def __init__(self, shared, array):
+        self.shared = shared
+        self.__array_interface__ = array.__array_interface__
@@ -0,0 +1,229 @@
+import numpy as np
+from collections.abc import Mapping
+
+class StateActionIndex(Mapping):
+    """A bijection between state-action pairs :math:`(s,a)` and row indices :math:`i=0,\\dots,C-1` of a transition
+    matrix that is backed by NumPy arrays:
+
+    - `row_state[i]` and `row_action[i]` contain the state and action of row :math:`i`,
+    - `state_rows[state_row_offsets[s]:state_row_offsets[s+1]]` contains all rows of state :math:`s` (ordered by action).
+
+    Hot loops should use these arrays directly. For compatibility with existing code, a StateActionIndex can also be 
+    used like a `bidict.bidict`: `index[(s,a)]` returns the row of a state-action pair and `index.inv[i]` the 
+    state-action pair of a row.
+
+    .. code-block::
+
+        index = StateActionIndex.from_dict({ (0,0) : 0, (0,1) : 1, (1,0) : 2 })
+        index[(0,1)]            # 1
+        index.inv[2]            # (1,0)
+        index.rows_of_state(0)  # array([0, 1])
+    """
+    def __init__(self, row_state, row_action):
+        """
+        :param row_state: :math:`C`-dimensional vector containing the state of every row.
+        :type row_state: np.ndarray[int]
+        :param row_action: :math:`C`-dimensional vector containing the action of every row.
+        :type row_action: np.ndarray[int]
+        """
+        self.row_state = np.asarray(row_state, dtype=np.int64).reshape(-1)
+        self.row_action = np.asarray(row_action, dtype=np.int64).reshape(-1)
+        assert self.row_state.shape == self.row_action.shape, "row_state and row_action must have the same length."
+        self.__state_rows = None
+        self.__state_row_offsets = None
+
+    @classmethod
+    def from_dict(cls, index_by_state_action):
+        """Creates a StateActionIndex from a mapping of state-action pairs to row indices, which
+        need to be exactly :math:`0,\\dots,C-1`.
+
+        :param index_by_state_action: The mapping, e.g. a dict or a bidict.
+        :type index_by_state_action: Dict[Tuple[int,int],int]
+        :rtype: utils.StateActionIndex
+        """
+        if isinstance(index_by_state_action, StateActionIndex):
+            return index_by_state_action
+        C = len(index_by_state_action)
+        rows = np.fromiter(index_by_state_action.values(), dtype=np.int64, count=C)
+        keys = np.array(list(index_by_state_action.keys()), dtype=np.int64).reshape(C,2)
+        assert (np.sort(rows) == np.arange(C)).all(), "Indices of state-action pairs must be 0,...,%d." % (C-1)
+        row_state, row_action = np.zeros(C, dtype=np.int64), np.zeros(C, dtype=np.int64)
+        row_state[rows], row_action[rows] = keys[:,0], keys[:,1]
+        return cls(row_state, row_action)
+
+    @classmethod
+    def identity(cls, N):
+        """Creates a StateActionIndex where state :math:`s` has a single action 0 at row :math:`s` (like in DTMCs).
+
+        :param N: Number of states.
+        :type N: int
+        :rtype: utils.StateActionIndex
+        """
+        return cls(np.arange(N), np.zeros(N, dtype=np.int64))
+
+    def __compute_state_rows(self):
+        # group rows by state and order rows of the same state by action
+        self.__state_rows = np.lexsort((self.row_action, self.row_state))
+        counts = np.bincount(self.row_state, minlength=self.state_count)
+        self.__state_row_offsets = np.zeros(len(counts)+1, dtype=np.int64)
+        np.cumsum(counts, out=self.__state_row_offsets[1:])
+
+    @property
+    def state_count(self):
+        """Number of states that have at least one row, plus all states with lower index."""
+        return int(self.row_state.max()) + 1 if len(self.row_state) > 0 else 0
+
+    @property
+    def state_rows(self):
+        """Permutation of the rows such that rows of the same state are consecutive."""
+        if self.__state_rows is None:
+            self.__compute_state_rows()
+        return self.__state_rows
+
+    @property
+    def state_row_offsets(self):
+        """CSR-style offsets into `state_rows`: the rows of state :math:`s` are `state_rows[state_row_offsets[s]:state_row_offsets[s+1]]`."""
+        if self.__state_row_offsets is None:
+            self.__compute_state_rows()
+        return self.__state_row_offsets
+
+    def rows_of_state(self, state):
+        """Returns all rows of a state (ordered by action).
+
+        :param state: The state.
+        :type state: int
+        :rtype: np.ndarray[int]
+        """
+        offsets = self.state_row_offsets
+        if state < 0 or state >= len(offsets)-1:
+            return np.zeros(0, dtype=np.int64)
+        return self.state_rows[offsets[state]:offsets[state+1]]
+
+    def actions_of_state(self, state):
+        """Returns all actions of a state (in ascending order).
+
+        :param state: The state.
+        :type state: int
+        :rtype: np.ndarray[int]
+        """
+        return self.row_action[self.rows_of_state(state)]
+
+    def lookup(self, states, actions):
+        """Vectorized lookup of rows of state-action pairs.
+
+        :param states: Vector of states.
+        :type states: np.ndarray[int]
+        :param actions: Vector of actions (same length as `states`).
+        :type actions: np.ndarray[int]
+        :return: Vector of rows. Contains -1 for every state-action pair that is not indexed.
+        :rtype: np.ndarray[int]
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        # pairs (state, action) are sorted lexicographically in state_rows, so binary search over the keys is possible
+        max_action = max(int(self.row_action.max(initial=0)), int(actions.max(initial=0))) + 1
+        sorted_keys = self.row_state[self.state_rows] * max_action + self.row_action[self.state_rows]
+        keys = states * max_action + actions
+        pos = np.searchsorted(sorted_keys, keys)
+        pos_in_range = np.minimum(pos, max(len(sorted_keys)-1, 0))
+        found = (pos < len(sorted_keys)) & (sorted_keys[pos_in_range] == keys) if len(sorted_keys) > 0 else np.zeros(len(keys), dtype=bool)
+        ret = np.full(len(keys), -1, dtype=np.int64)
+        ret[found] = self.state_rows[pos_in_range[found]]
+        return ret
+
+    def restrict(self, C):
+        """Returns a new StateActionIndex that only contains the first :math:`C` rows.
+
+        :param C: Number of rows.
+        :type C: int
+        :rtype: utils.StateActionIndex
+        """
+        return StateActionIndex(self.row_state[:C], self.row_action[:C])
+
+    def __getitem__(self, state_action):
+        state, action = state_action
+        rows = self.rows_of_state(state)
+        pos = np.searchsorted(self.row_action[rows], action)
+        if pos < len(rows) and self.row_action[rows[pos]] == action:
+            return int(rows[pos])
+        raise KeyError(state_action)
+
+    def __setitem__(self, state_action, row):
+        # only appending a new state-action pair at the end is possible
+        state, action = state_action
+        if state_action in self and self[state_action] == row:
+            return
+        assert row == len(self), "New state-action pairs can only be appended (at index %d)." % len(self)
+        assert state_action not in self, "State-action pair %s is already indexed." % (state_action,)
+        self.row_state = np.append(self.row_state, state)
+        self.row_action = np.append(self.row_action, action)
+        self.__state_rows = None
+        self.__state_row_offsets = None
+
+    def __delitem__(self, state_action):
+        # only removing the state-action pair at the end is possible
+        row = self[state_action]
+        assert row == len(self)-1, "Only the last state-action pair (at index %d) can be removed." % (len(self)-1)
+        self.row_state = self.row_state[:-1]
+        self.row_action = self.row_action[:-1]
+        self.__state_rows = None
+        self.__state_row_offsets = None
+
+    def __contains__(self, state_action):
+        try:
+            self[state_action]
+            return True
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        return zip(self.row_state.tolist(), self.row_action.tolist())
+
+    def __len__(self):
+        return len(self.row_state)
+
+    def keys(self):
+        """State-action pairs, ordered by their rows."""
+        return list(iter(self))
+
+    def values(self):
+        """Rows, i.e. :math:`0,\\dots,C-1`."""
+        return range(len(self))
+
+    def items(self):
+        """Pairs of state-action pairs and their rows, ordered by rows."""
+        return zip(iter(self), range(len(self)))
+
+    def copy(self):
+        return StateActionIndex(self.row_state.copy(), self.row_action.copy())
+
+    @property
+    def inv(self):
+        """Inverse mapping from rows to state-action pairs."""
+        return _InverseStateActionIndex(self)
+
+    def __repr__(self):
+        return "StateActionIndex(C=%d)" % len(self)
+
+
+class _InverseStateActionIndex(Mapping):
+    def __init__(self, index):
+        self.__index = index
+
+    def __getitem__(self, row):
+        if not (0 <= row < len(self.__index)):
+            raise KeyError(row)
+        return int(self.__index.row_state[row]), int(self.__index.row_action[row])
+
+    def __delitem__(self, row):
+        del self.__index[self[row]]
+
+    def __iter__(self):
+        return iter(range(len(self.__index)))
+
+    def __len__(self):
+        return len(self.__index)
+
+    @property
+    def inv(self):
+        return self.__index
@@ -0,0 +1,44 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from .casting import cast_csr_matrix
+
+class TransitionMatrix(csr_matrix):
+    """A read-only `scipy.sparse.csr_matrix`. It is used by models in order to expose their transition matrix
+    without handing out a mutable copy. For compatibility with `scipy.sparse.dok_matrix`, it also supports
+    iterating over all non-zero entries via `.items()`. If the matrix is instantiated from a `csr_matrix`
+    in canonical format, the underlying arrays are shared (and set to be non-writeable).
+
+    .. code-block::
+
+        P = TransitionMatrix([[0.5, 0.5], [0.0, 1.0]])
+        for (row, col), p in P.items():
+            print(row, col, p)
+    """
+    def __init__(self, arg1, shape=None, dtype=None, copy=False):
+        if isinstance(arg1, tuple):
+            # matrix is given as a (data, indices, indptr) or (data, (row, col)) tuple,
+            # which is also how scipy instantiates results of slicing and arithmetic operations
+            super().__init__(arg1, shape=shape, dtype=dtype, copy=copy)
+        else:
+            matrix = cast_csr_matrix(arg1)
+            super().__init__((matrix.data, matrix.indices, matrix.indptr), shape=matrix.shape, dtype=dtype, copy=copy)
+            for arr in [self.data, self.indices, self.indptr]:
+                arr.flags.writeable = False
+
+    def items(self):
+        """Iterates over all non-zero entries of this matrix (in row-major order).
+
+        :yield: Pairs of indices and values, i.e. ((i,j), P[i,j])
+        :rtype: Iterator[Tuple[Tuple[int,int],float]]
+        """
+        rows = np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+        return zip(zip(rows.tolist(), self.indices.tolist()), self.data.tolist())
+
+    def __setitem__(self, key, value):
+        raise TypeError("%s is read-only." % type(self).__name__)
+
+    @property
+    def nbytes(self):
+        """The amount of memory (in bytes) that is used by the underlying arrays."""
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes